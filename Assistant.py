@@ -1,253 +1,258 @@
 import PySimpleGUI as sg
-import pyperclip, os
-from dotenv import load_dotenv
-
-from assistant_scripts.read_data.read_components_data import ComponentsDataReader
-from assistant_scripts.read_data.read_products_data import ProductsDataReader
-from assistant_scripts.read_data.read_factory_data import FactoryDataReader
-from assistant_scripts.read_data.read_supply_data import SupplyDataReader
-
-from assistant_scripts.reports.report_components_balances import ComponentsBalances
-from assistant_scripts.reports.report_groups_statuses import GroupsStatuses
-from assistant_scripts.reports.report_supply_info import CreateSupplyInfo
-
-from assistant_scripts.other_functions.create_pos import create_csv_pos
-from assistant_scripts.other_functions.sort_my_data import sort_my_data
-
-load_dotenv()
-
-paths = {
-    "po_template": os.getenv("PATH_PO_TEMPLATE"),
-    "groups": os.getenv("PATH_GROUPS"),
-    "db": os.getenv("PATH_DB"),
-    "my_data": os.getenv("PATH_MY_DATA"),
-    "products_files": os.getenv("PATH_PRODUCTS"),
-    "components_info": os.getenv("PATH_COMPONENTS"),
-}
-
-po_data = {
-    "ccn": os.getenv("PO_CCN"),
-    "mas_loc": os.getenv("PO_MAS_LOC"),
-    "request_div": os.getenv("PO_REQUEST_DIV"),
-    "pur_loc": os.getenv("PO_PUR_LOC"),
-    "delivery": os.getenv("PO_DELIVERY"),
-    "inspection": os.getenv("PO_INSPECTION"),
-}
-
-supply_data = {
-    "supplier_1": os.getenv("SUPPLIER_1"),
-    "supplier_2": os.getenv("SUPPLIER_2"),
-    "supplier_3": os.getenv("SUPPLIER_3"),
-    "incoterms": os.getenv("SUPPLY_INCOTERMS"),
-    "t_mode": os.getenv("SUPPLY_T_MODE"),
-}
-
+import pyperclip, os, multiprocessing, threading
+
+from assistant_scripts.other_functions.handlers import (
+    report_handlers,
+    registry_groups,
+    warm_up_imports,
+)
+from assistant_scripts.other_functions.settings import paths
+from assistant_scripts.other_functions.stage_tracer import trace_stages, trace_settings
+from assistant_scripts.other_functions.watch_folder import WatchFolder
+from assistant_scripts.other_functions.pipeline_stages import (
+    StageCancel,
+    StageCancelled,
+    StageListener,
+    listen_stages,
+)
+
+# the window and the passwords are created in the __main__ block only, the
+# products workers re-import this module and must not open a window
+window = None
 passwords = {}
-for i in range(1, 6):
-    passwords[f"name_{i}"] = os.getenv(f"PASSWORD_{i}").split(", ")[0]
-    passwords[f"pass_{i}"] = os.getenv(f"PASSWORD_{i}").split(", ")[1]
-
-sg.theme("GreenTan")
-
-
-def handle_report_components_data(values):
-    data_handler = ComponentsDataReader(
-        file_path=values["components_data_path"],
-        fix_weeks=True,
-        add_forecast=True,
-        to_excel=True,
-    )
-    data_handler()
+event_handlers = {}
+password_handlers = {}
 
 
-def handle_report_products_data(values):
-    data_handler = ProductsDataReader(
-        file_path=None, folder_path=paths["products_files"], to_excel=True
-    )
-    data_handler()
-
-
-def handle_report_factory_data(values):
-    data_handler = FactoryDataReader(
-        factory_data_path=values["factory_path"], db_path=paths["db"]
-    )
-    data_handler()
-
-
-def handle_create_pos(values):
-    create_csv_pos(
-        path_excel_dat=paths["po_template"],
-        ccn=po_data["ccn"],
-        mas_loc=po_data["mas_loc"],
-        request_div=po_data["request_div"],
-        pur_loc=po_data["pur_loc"],
-        delivery=po_data["delivery"],
-        inspection=po_data["inspection"],
-    )
-
-
-def handle_sort_my_data(values):
-    sort_my_data(directory=paths["my_data"])
+def read_passwords():
+    # PASSWORD_n is "name, password", a missing or malformed one gets no button
+    passwords = {}
+    for i in range(1, 6):
+        value = (os.getenv(f"PASSWORD_{i}") or "").split(", ")
+        if len(value) < 2:
+            print(f"PASSWORD_{i} is not set as 'name, password', button skipped")
+            continue
+        passwords[value[0]] = value[1]
+    return passwords
 
 
 def handle_get_password(values, password):
     pyperclip.copy(password)
 
 
-def handle_groups_statuses(values):
-    report = GroupsStatuses(
-        path_components=values["components_data_path"],
-        path_products=paths["products_files"],
-        path_groups=paths["groups"],
-        path_supply=values["supply_path"],
-        path_db=paths["db"],
-    )
-    report()
-
-
-def handle_components_balances(values):
-    report = ComponentsBalances(
-        path_groups=paths["groups"],
-        path_components=values["components_data_path"],
-        path_supply=values["supply_path"],
+def registry_column(group, element_justification):
+    buttons = [[sg.Button(event, size=(20, 1))] for event in registry_groups()[group]]
+    return sg.Column(
+        [[sg.Text(group, font=20)]] + buttons,
+        element_justification=element_justification,
+        vertical_alignment="top",
     )
-    report()
-
-
-def handle_report_supply_info(values):
-    report = CreateSupplyInfo(
-        path_supply=values["supply_path"],
-        path_components=paths["components_info"],
-        supplier1=supply_data["supplier_1"],
-        supplier2=supply_data["supplier_2"],
-        supplier3=supply_data["supplier_3"],
-        incoterms=supply_data["incoterms"],
-        t_mode=supply_data["t_mode"],
-    )
-    report()
-
-
-def handle_new_supply_info(values):
-    supply = SupplyDataReader(
-        path_supply=values["supply_path"], path_groups=paths["groups"]
-    )
-    supply()
 
 
-main_functions_layout = [
-    [
-        sg.Column(
-            [
-                [sg.Text("Files browser", font=20)],
-                [
-                    sg.Text("Components_data_path:", size=(20, 1)),
-                    sg.InputText(key="components_data_path", size=(20, 1)),
-                    sg.FileBrowse(),
-                ],
-                [
-                    sg.Text("Products_data_path:", size=(20, 1)),
-                    sg.InputText(key="products_data_path", size=(20, 1)),
-                    sg.FileBrowse(),
-                ],
+def create_window(passwords):
+    sg.theme("GreenTan")
+    main_functions_layout = [
+        [
+            sg.Column(
                 [
-                    sg.Text("Supply_file_path:", size=(20, 1)),
-                    sg.InputText(key="supply_path", size=(20, 1)),
-                    sg.FileBrowse(),
+                    [sg.Text("Files browser", font=20)],
+                    [
+                        sg.Text("Components_data_path:", size=(20, 1)),
+                        sg.InputText(key="components_data_path", size=(20, 1)),
+                        sg.FileBrowse(),
+                    ],
+                    [
+                        sg.Text("Products_data_path:", size=(20, 1)),
+                        sg.InputText(key="products_data_path", size=(20, 1)),
+                        sg.FileBrowse(),
+                    ],
+                    [
+                        sg.Text("Supply_file_path:", size=(20, 1)),
+                        sg.InputText(key="supply_path", size=(20, 1)),
+                        sg.FileBrowse(),
+                    ],
+                    [
+                        sg.Text("Factory_data_path:", size=(20, 1)),
+                        sg.InputText(key="factory_path", size=(20, 1)),
+                        sg.FileBrowse(),
+                    ],
+                    [
+                        sg.Checkbox(
+                            "Watch My_Data folder",
+                            key="watch_my_data",
+                            enable_events=True,
+                        )
+                    ],
                 ],
+                element_justification="left",
+                vertical_alignment="top",
+            ),
+            registry_column("Reports", element_justification="left"),
+            registry_column("Others", element_justification="top"),
+            sg.Column(
                 [
-                    sg.Text("Factory_data_path:", size=(20, 1)),
-                    sg.InputText(key="factory_path", size=(20, 1)),
-                    sg.FileBrowse(),
-                ],
-            ],
-            element_justification="left",
-            vertical_alignment="top",
-        ),
-        sg.Column(
-            [
-                [sg.Text("Reports", font=20)],
-                [sg.Button("Groups_statuses", size=(20, 1))],
-                [sg.Button("Groups_balances", size=(20, 1))],
-                [sg.Button("Components_data", size=(20, 1))],
-                [sg.Button("Products_data", size=(20, 1))],
-                [sg.Button("Factory_data", size=(20, 1))],
-                [sg.Button("Supply_info", size=(20, 1))],
-            ],
-            element_justification="left",
-            vertical_alignment="top",
-        ),
-        sg.Column(
-            [
-                [sg.Text("Others", font=20)],
-                [sg.Button("Create_POs", size=(20, 1))],
-                [sg.Button("Sort_My_Data", size=(20, 1))],
-                [sg.Button("New_supply_info", size=(20, 1))],
-            ],
-            element_justification="top",
-            vertical_alignment="top",
-        ),
-        sg.Column(
-            [
-                [sg.Text("Password manager", font=20)],
-                [sg.Button(passwords["name_1"], size=(20, 1))],
-                [sg.Button(passwords["name_2"], size=(20, 1))],
-                [sg.Button(passwords["name_3"], size=(20, 1))],
-                [sg.Button(passwords["name_4"], size=(20, 1))],
-                [sg.Button(passwords["name_5"], size=(20, 1))],
-            ],
-            element_justification="top",
-            vertical_alignment="top",
-        ),
+                    [sg.Text("Password manager", font=20)],
+                ]
+                + [[sg.Button(name, size=(20, 1))] for name in passwords],
+                element_justification="top",
+                vertical_alignment="top",
+            ),
+        ]
     ]
-]
 
-minor_functions_layout = [[]]
+    minor_functions_layout = [[]]
 
-layout = [
-    [
-        sg.TabGroup(
-            [
+    layout = [
+        [
+            sg.TabGroup(
                 [
-                    sg.Tab("Tab I", main_functions_layout),
-                    sg.Tab("Tab II", minor_functions_layout),
-                ],
-            ]
-        )
-    ]
-]
-window = sg.Window("Assistant", layout, default_element_size=(12, 1))
-
-
-event_handlers = {
-    "Components_data": handle_report_components_data,
-    "Products_data": handle_report_products_data,
-    "Factory_data": handle_report_factory_data,
-    "Groups_statuses": handle_groups_statuses,
-    "Groups_balances": handle_components_balances,
-    "Create_POs": handle_create_pos,
-    "Sort_My_Data": handle_sort_my_data,
-    "Supply_info": handle_report_supply_info,
-    "New_supply_info": handle_new_supply_info,
-    passwords["name_1"]: lambda x: handle_get_password(x, passwords["pass_1"]),
-    passwords["name_2"]: lambda x: handle_get_password(x, passwords["pass_2"]),
-    passwords["name_3"]: lambda x: handle_get_password(x, passwords["pass_3"]),
-    passwords["name_4"]: lambda x: handle_get_password(x, passwords["pass_4"]),
-    passwords["name_5"]: lambda x: handle_get_password(x, passwords["pass_5"]),
-}
-
-while True:
-    event, values = window.read()
-
-    if event == sg.WIN_CLOSED or event == "Exit":
-        break
-    if event in event_handlers:
-        # event_handlers[event](values)
-        try:
-            event_handlers[event](values)
-        except Exception as e:
-            error_message = (
-                f"An error occurred while processing the '{event}' event:\n{str(e)}"
+                    [
+                        sg.Tab("Tab I", main_functions_layout),
+                        sg.Tab("Tab II", minor_functions_layout),
+                    ],
+                ]
             )
-            sg.popup_error(error_message)
-
-window.close()
+        ],
+        [
+            sg.ProgressBar(max_value=1, size=(40, 15), key="progress"),
+            sg.Button("Cancel", size=(10, 1), disabled=True),
+        ],
+        [sg.Text("", key="stage", size=(70, 1))],
+    ]
+    return sg.Window("Assistant", layout, default_element_size=(12, 1), finalize=True)
+
+
+def create_password_handlers(passwords):
+    # copied on the GUI thread, also while a report is running
+    return {
+        name: lambda x, password=password: handle_get_password(x, password)
+        for name, password in passwords.items()
+    }
+
+
+class WindowStageProgress(StageListener):
+    def stage_started(self, name, depth, owner):
+        window.write_event_value("-STAGE-", f"{'  ' * depth}{name}")
+
+
+def run_event_handler(event, values, stage_cancel):
+    trace_enabled, trace_dir, trace_chrome = trace_settings()
+    try:
+        with listen_stages(stage_cancel), listen_stages(WindowStageProgress()):
+            if trace_enabled:
+                with trace_stages(
+                    event.replace(" ", "_"), trace_dir=trace_dir, chrome=trace_chrome
+                ):
+                    message = event_handlers[event](values)
+            else:
+                message = event_handlers[event](values)
+    except StageCancelled:
+        window.write_event_value("-HANDLER-CANCELLED-", event)
+    except Exception as e:
+        error_message = (
+            f"An error occurred while processing the '{event}' event:\n{str(e)}"
+        )
+        window.write_event_value("-HANDLER-ERROR-", error_message)
+    else:
+        if message:
+            window.write_event_value("-HANDLER-MESSAGE-", message)
+        window.write_event_value("-HANDLER-DONE-", event)
+
+
+def watched_file(file_name, new_path, error, action):
+    if action == "duplicate":
+        message = f"{file_name} already sorted as {new_path}, removed"
+    elif error is None:
+        message = f"{file_name} moved and parsed"
+    else:
+        message = f"{file_name} moved, parsing failed: {error}"
+    window.write_event_value("-WATCHED-", message)
+
+
+def toggle_watch_folder(watcher, enabled):
+    # new downloads are moved by the Sort_My_Data rules and parsed in the
+    # background, so the reports find them in the cache
+    if watcher is not None:
+        watcher.stop()
+        watcher = None
+    if enabled:
+        if not paths["my_data"] or not os.path.isdir(paths["my_data"]):
+            sg.popup_error(f"My_Data folder not found: {paths['my_data']}")
+            window["watch_my_data"].update(False)
+            return None
+        watcher = WatchFolder(paths["my_data"], on_file=watched_file)
+        watcher.start()
+    return watcher
+
+
+def set_running(running_event):
+    window["Cancel"].update(disabled=running_event is None)
+    window["progress"].update(current_count=0, max=1)
+    window["stage"].update(f"Running: {running_event}" if running_event else "")
+
+
+if __name__ == "__main__":
+    # products files are parsed in worker processes, which re-import this module
+    multiprocessing.freeze_support()
+    passwords = read_passwords()
+    window = create_window(passwords)
+    event_handlers = report_handlers
+    password_handlers = create_password_handlers(passwords)
+    # reports import pandas on first use, load it while the window is idle
+    if os.getenv("WARM_UP_IMPORTS", "1") == "1":
+        threading.Thread(target=warm_up_imports, daemon=True).start()
+    running_event = None
+    stage_cancel = None
+    watcher = None
+    stages_done = 0
+    # stage count of the last run of each event, used as progress bar length
+    stages_expected = {}
+    while True:
+        event, values = window.read()
+
+        if event == sg.WIN_CLOSED or event == "Exit":
+            if stage_cancel:
+                stage_cancel.cancel()
+            if watcher:
+                watcher.stop()
+            break
+        if event == "Cancel" and stage_cancel:
+            stage_cancel.cancel()
+            window["stage"].update(f"Cancelling: {running_event}")
+        elif event == "-STAGE-":
+            stages_done += 1
+            expected = max(stages_expected.get(running_event, 0), stages_done + 1)
+            window["progress"].update(current_count=stages_done, max=expected)
+            window["stage"].update(values[event])
+        elif event == "watch_my_data":
+            watcher = toggle_watch_folder(watcher, values["watch_my_data"])
+        elif event == "-HANDLER-MESSAGE-":
+            sg.popup(values[event])
+        elif event == "-WATCHED-":
+            if not running_event:
+                window["stage"].update(values[event])
+        elif event in ("-HANDLER-DONE-", "-HANDLER-CANCELLED-", "-HANDLER-ERROR-"):
+            if event == "-HANDLER-DONE-":
+                stages_expected[running_event] = stages_done
+            running_event = None
+            stage_cancel = None
+            set_running(None)
+            if event == "-HANDLER-ERROR-":
+                sg.popup_error(values[event])
+        elif event in password_handlers:
+            password_handlers[event](values)
+        elif event in event_handlers:
+            if running_event:
+                sg.popup(f"Wait until '{running_event}' is finished or cancel it.")
+                continue
+            running_event = event
+            stage_cancel = StageCancel()
+            stages_done = 0
+            set_running(event)
+            threading.Thread(
+                target=run_event_handler,
+                args=(event, values, stage_cancel),
+                daemon=True,
+            ).start()
+
+    window.close()
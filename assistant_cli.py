@@ -0,0 +1,171 @@
+import os, sys, time, argparse, multiprocessing
+
+from assistant_scripts.other_functions.settings import input_files, paths
+from assistant_scripts.other_functions.handlers import handler_inputs, report_handlers
+from assistant_scripts.other_functions.stage_tracer import trace_stages, trace_settings
+from assistant_scripts.other_functions.watch_folder import WatchFolder
+from assistant_scripts.other_functions.sort_my_data import latest_file
+from assistant_scripts.other_functions.pipeline_stages import (
+    StageListener,
+    listen_stages,
+)
+
+# run the GUI reports without a display, for example from the task scheduler:
+# python assistant_cli.py groups-statuses --components C711.xlsx --supply supply.xlsx
+# or keep sorting and parsing new downloads until Ctrl+C:
+# python assistant_cli.py watch-folder --my-data D:\My_Data
+
+input_options = {
+    "components_data_path": ("--components", "C711 components export"),
+    "supply_path": ("--supply", "supply workbook"),
+    "factory_path": ("--factory", "zpp066 factory export"),
+}
+
+# inputs taken from the newest sorted download when no path is given
+latest_file_types = {
+    "components_data_path": "C711_PartsSupplyPlanDisp",
+    "factory_path": "zpp066_",
+}
+
+settings_options = {
+    "groups": ("--groups", "groups workbook"),
+    "db": ("--db", "companion database"),
+    "products_files": ("--products-folder", "folder with C502 exports"),
+    "components_info": ("--components-info", "components info workbook"),
+    "po_template": ("--po-template", "PO template workbook"),
+    "my_data": ("--my-data", "folder sorted by Sort_My_Data"),
+}
+
+
+class PrintStageProgress(StageListener):
+    def stage_started(self, name, depth, owner):
+        print(f"{'  ' * depth}{name}", flush=True)
+
+
+def command_name(event: str):
+    return event.lower().replace("_", "-")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run Assistant reports without the GUI. Paths not given "
+        "as options are taken from the environment or the .env file."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for event, inputs in handler_inputs.items():
+        subparser = subparsers.add_parser(command_name(event), help=event)
+        subparser.set_defaults(event=event)
+        for key in inputs:
+            option, help_text = input_options[key]
+            subparser.add_argument(option, dest=key, help=help_text)
+        for key, (option, help_text) in settings_options.items():
+            subparser.add_argument(option, dest=f"setting_{key}", help=help_text)
+        subparser.add_argument(
+            "--trace", action="store_true", help="save a per-stage timing trace"
+        )
+        subparser.add_argument("--trace-dir", help="folder for the trace")
+        subparser.add_argument(
+            "--chrome-trace", action="store_true", help="add a Chrome trace file"
+        )
+        subparser.add_argument(
+            "-q", "--quiet", action="store_true", help="do not print stages"
+        )
+
+    watch_parser = subparsers.add_parser(
+        "watch-folder", help="move and parse new downloads as they arrive"
+    )
+    watch_parser.set_defaults(event=None)
+    watch_parser.add_argument(
+        "--my-data", dest="my_data", help=settings_options["my_data"][1]
+    )
+    watch_parser.add_argument(
+        "--no-preparse", action="store_true", help="only move the files"
+    )
+    return parser.parse_args(argv)
+
+
+def get_values(args):
+    values = {}
+    missing = []
+    for key in handler_inputs[args.event]:
+        values[key] = getattr(args, key) or input_files[key]
+        if not values[key] and key in latest_file_types and paths["my_data"]:
+            values[key] = latest_file(paths["my_data"], latest_file_types[key])
+        if not values[key]:
+            missing.append(input_options[key][0])
+    return values, missing
+
+
+def run(args, values):
+    trace_enabled, trace_dir, trace_chrome = trace_settings()
+    trace_enabled = trace_enabled or args.trace
+    trace_dir = args.trace_dir or trace_dir
+    trace_chrome = trace_chrome or args.chrome_trace
+
+    listener = StageListener() if args.quiet else PrintStageProgress()
+    with listen_stages(listener):
+        if trace_enabled:
+            with trace_stages(args.event, trace_dir=trace_dir, chrome=trace_chrome):
+                message = report_handlers[args.event](values)
+        else:
+            message = report_handlers[args.event](values)
+    if message:
+        print(message)
+
+
+def print_watched_file(file_name, new_path, error, action):
+    if action == "duplicate":
+        print(f"{file_name} already sorted as {new_path}, removed", flush=True)
+    elif error is None:
+        print(f"{file_name} -> {new_path}", flush=True)
+    else:
+        print(f"{file_name} -> {new_path}, not parsed: {error}", flush=True)
+
+
+def watch_folder(args):
+    directory = args.my_data or paths["my_data"]
+    if not directory or not os.path.isdir(directory):
+        print(f"Folder to watch not found: {directory}")
+        return 2
+    watcher = WatchFolder(
+        directory, preparse=not args.no_preparse, on_file=print_watched_file
+    )
+    watcher.start()
+    print(f"Watching {directory}, press Ctrl+C to stop", flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "watch-folder":
+        return watch_folder(args)
+    for key in settings_options:
+        if getattr(args, f"setting_{key}"):
+            paths[key] = os.path.abspath(getattr(args, f"setting_{key}"))
+
+    values, missing = get_values(args)
+    if missing:
+        print(f"Missing input files for {args.event}: {', '.join(missing)}")
+        return 2
+    try:
+        run(args, values)
+    except KeyboardInterrupt:
+        print(f"{args.event} cancelled")
+        return 130
+    except Exception as e:
+        print(f"An error occurred while processing the '{args.event}' event:\n{e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # products files are parsed in worker processes
+    multiprocessing.freeze_support()
+    sys.exit(main())
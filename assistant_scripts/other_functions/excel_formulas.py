@@ -0,0 +1,52 @@
+import re
+import numpy as np
+import pandas as pd
+
+from xlsxwriter.utility import xl_col_to_name
+
+
+def column_letter(position: int):
+    return xl_col_to_name(position)
+
+
+def excel_rows(n_rows: int, first_row: int = 2):
+    # Excel row numbers of a frame written under a header row
+    return np.arange(first_row, first_row + n_rows)
+
+
+def render_formulas(template: str, rows: np.ndarray, **values):
+    # values are put in once, "{row}" becomes the row number of every formula
+    for key, value in values.items():
+        template = template.replace(f"{{{key}}}", str(value))
+    row_numbers = np.asarray(rows).astype(str).astype(object)
+    parts = template.split("{row}")
+    formulas = np.full(len(row_numbers), parts[0], dtype=object)
+    for part in parts[1:]:
+        formulas = formulas + row_numbers + part
+    return formulas
+
+
+class FormulaSheet:
+    # references to the columns of a frame written to a sheet, bounded to its
+    # rows, so Excel does not scan whole columns
+    def __init__(self, sheet_name: str, data: pd.DataFrame, first_row: int = 2):
+        self.sheet_name = sheet_name
+        self.columns = list(data.columns)
+        self.first_row = first_row
+        # an empty sheet still gets a valid one-cell range
+        self.last_row = first_row + max(len(data), 1) - 1
+
+    def range_at(self, position: int, absolute_column: bool = True):
+        letter = column_letter(position)
+        column = f"${letter}" if absolute_column else letter
+        return f"{self.sheet_name}!{column}${self.first_row}:{column}${self.last_row}"
+
+    def range(self, column, absolute_column: bool = True):
+        return self.range_at(self.columns.index(column), absolute_column)
+
+    def name(self, column):
+        return re.sub(r"\W", "_", f"{self.sheet_name}_{column}")
+
+    def define_names(self, writer, columns: list):
+        for column in columns:
+            writer.define_name(self.name(column), f"={self.range(column)}")
@@ -0,0 +1,128 @@
+import datetime, math
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+
+class StreamingExcelWriter:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        # rows are flushed to disk as soon as the next row is started
+        self.workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+        self.sheets = {}
+        self.next_rows = {}
+        self.all_sheets_formatting = []
+        self.header_format = self.workbook.add_format(
+            {"bold": True, "border": 1, "align": "center", "valign": "top"}
+        )
+        self.datetime_format = self.workbook.add_format(
+            {"num_format": "yyyy-mm-dd hh:mm:ss"}
+        )
+        self.date_format = self.workbook.add_format({"num_format": "yyyy-mm-dd"})
+        self.date_header_format = self.header_format
+
+    def add_format(self, properties: dict):
+        return self.workbook.add_format(properties)
+
+    def get_sheet(self, sheet_name: str):
+        if sheet_name not in self.sheets:
+            self.sheets[sheet_name] = self.workbook.add_worksheet(sheet_name)
+            self.next_rows[sheet_name] = 0
+        return self.sheets[sheet_name]
+
+    def _write_value(self, sheet, row, column, value, cell_format=None):
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None or value is pd.NaT:
+            if cell_format is not None:
+                sheet.write_blank(row, column, None, cell_format)
+            return
+        if isinstance(value, float) and math.isnan(value):
+            if cell_format is not None:
+                sheet.write_blank(row, column, None, cell_format)
+            return
+        if isinstance(value, float) and math.isinf(value):
+            value = "inf" if value > 0 else "-inf"
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        if isinstance(value, datetime.datetime):
+            sheet.write_datetime(
+                row, column, value, cell_format or self.datetime_format
+            )
+        elif isinstance(value, datetime.date):
+            sheet.write_datetime(row, column, value, cell_format or self.date_format)
+        else:
+            sheet.write(row, column, value, cell_format)
+
+    def write_frame(
+        self,
+        sheet_name: str,
+        frame: pd.DataFrame,
+        startrow: int = 0,
+        index: bool = False,
+    ):
+        sheet = self.get_sheet(sheet_name)
+        if startrow < self.next_rows[sheet_name]:
+            raise ValueError(
+                f"Rows of sheet {sheet_name} must be written in order, "
+                f"row {startrow} is already written"
+            )
+        first_column = 1 if index else 0
+
+        if index and frame.index.name is not None:
+            self._write_value(sheet, startrow, 0, frame.index.name, self.header_format)
+        for column, name in enumerate(frame.columns, start=first_column):
+            header_format = self.header_format
+            if isinstance(name, datetime.date):
+                header_format = self.date_header_format
+            self._write_value(sheet, startrow, column, name, header_format)
+
+        row = startrow + 1
+        for values in frame.itertuples(index=index, name=None):
+            if index:
+                self._write_value(sheet, row, 0, values[0], self.header_format)
+                values = values[1:]
+            for column, value in enumerate(values, start=first_column):
+                self._write_value(sheet, row, column, value)
+            row += 1
+        self.next_rows[sheet_name] = row
+
+    def add_conditional_format(
+        self, cell_range: str, options: dict, sheet_name: str = None
+    ):
+        if sheet_name is None:
+            self.all_sheets_formatting.append(
+                ("conditional_format", (cell_range, options))
+            )
+        else:
+            self.get_sheet(sheet_name).conditional_format(cell_range, options)
+
+    def set_column_width(
+        self, first_column: int, last_column: int, width: float, sheet_name=None
+    ):
+        if sheet_name is None:
+            self.all_sheets_formatting.append(
+                ("set_column", (first_column, last_column, width))
+            )
+        else:
+            self.get_sheet(sheet_name).set_column(first_column, last_column, width)
+
+    def add_list_validation(self, sheet_name: str, cell_range: str, choices: list):
+        self.get_sheet(sheet_name).data_validation(
+            cell_range, {"validate": "list", "source": choices, "ignore_blank": True}
+        )
+
+    def pin_formats(self):
+        # style indexes are given in the order the formats are first used, here
+        # they are fixed, so sheets of two workbooks point to the same styles
+        for cell_format in [self.header_format, self.datetime_format, self.date_format]:
+            cell_format._get_xf_index()
+
+    def define_name(self, name: str, formula: str):
+        self.workbook.define_name(name, formula)
+
+    def close(self):
+        for sheet in self.sheets.values():
+            for method, args in self.all_sheets_formatting:
+                getattr(sheet, method)(*args)
+        self.workbook.close()
@@ -0,0 +1,210 @@
+import importlib
+
+from assistant_scripts.other_functions.settings import (
+    paths,
+    po_data,
+    supply_data,
+    products_workers,
+    factory_chunksize,
+    use_formulas,
+    groups_statuses_incremental,
+)
+
+
+class ReportEntry:
+    def __init__(
+        self,
+        event: str,
+        group: str,
+        module: str,
+        attribute: str,
+        build_kwargs,
+        inputs: list = (),
+    ):
+        self.event = event
+        self.group = group
+        self.module = module
+        self.attribute = attribute
+        self.build_kwargs = build_kwargs
+        self.inputs = list(inputs)
+        self.target = None
+
+    def load(self):
+        # the module, and pandas with it, is imported on the first use
+        if self.target is None:
+            module = importlib.import_module(self.module)
+            self.target = getattr(module, self.attribute)
+        return self.target
+
+    def __call__(self, values):
+        # returns a message for the user from the functions, None otherwise
+        target = self.load()
+        result = target(**self.build_kwargs(values))
+        # readers and reports are classes, the pipeline runs on call
+        if isinstance(target, type):
+            result()
+            return None
+        return result if isinstance(result, str) else None
+
+
+report_registry = {}
+
+
+def register(entry: ReportEntry):
+    report_registry[entry.event] = entry
+
+
+register(
+    ReportEntry(
+        event="Groups_statuses",
+        group="Reports",
+        module="assistant_scripts.reports.report_groups_statuses",
+        attribute="GroupsStatuses",
+        build_kwargs=lambda values: dict(
+            path_components=values["components_data_path"],
+            path_products=paths["products_files"],
+            path_groups=paths["groups"],
+            path_supply=values["supply_path"],
+            path_db=paths["db"],
+            products_workers=products_workers,
+            incremental=groups_statuses_incremental,
+        ),
+        inputs=["components_data_path", "supply_path"],
+    )
+)
+register(
+    ReportEntry(
+        event="Groups_balances",
+        group="Reports",
+        module="assistant_scripts.reports.report_components_balances",
+        attribute="ComponentsBalances",
+        build_kwargs=lambda values: dict(
+            path_groups=paths["groups"],
+            path_components=values["components_data_path"],
+            path_supply=values["supply_path"],
+            use_formulas=use_formulas,
+        ),
+        inputs=["components_data_path", "supply_path"],
+    )
+)
+register(
+    ReportEntry(
+        event="Components_data",
+        group="Reports",
+        module="assistant_scripts.read_data.read_components_data",
+        attribute="ComponentsDataReader",
+        build_kwargs=lambda values: dict(
+            file_path=values["components_data_path"],
+            fix_weeks=True,
+            add_forecast=True,
+            to_excel=True,
+        ),
+        inputs=["components_data_path"],
+    )
+)
+register(
+    ReportEntry(
+        event="Products_data",
+        group="Reports",
+        module="assistant_scripts.read_data.read_products_data",
+        attribute="ProductsDataReader",
+        build_kwargs=lambda values: dict(
+            file_path=None,
+            folder_path=paths["products_files"],
+            to_excel=True,
+            workers=products_workers,
+        ),
+    )
+)
+register(
+    ReportEntry(
+        event="Factory_data",
+        group="Reports",
+        module="assistant_scripts.read_data.read_factory_data",
+        attribute="FactoryDataReader",
+        build_kwargs=lambda values: dict(
+            factory_data_path=values["factory_path"],
+            db_path=paths["db"],
+            chunksize=factory_chunksize,
+        ),
+        inputs=["factory_path"],
+    )
+)
+register(
+    ReportEntry(
+        event="Supply_info",
+        group="Reports",
+        module="assistant_scripts.reports.report_supply_info",
+        attribute="CreateSupplyInfo",
+        build_kwargs=lambda values: dict(
+            path_supply=values["supply_path"],
+            path_components=paths["components_info"],
+            supplier1=supply_data["supplier_1"],
+            supplier2=supply_data["supplier_2"],
+            supplier3=supply_data["supplier_3"],
+            incoterms=supply_data["incoterms"],
+            t_mode=supply_data["t_mode"],
+        ),
+        inputs=["supply_path"],
+    )
+)
+register(
+    ReportEntry(
+        event="Create_POs",
+        group="Others",
+        module="assistant_scripts.other_functions.create_pos",
+        attribute="create_csv_pos",
+        build_kwargs=lambda values: dict(
+            path_excel_dat=paths["po_template"],
+            ccn=po_data["ccn"],
+            mas_loc=po_data["mas_loc"],
+            request_div=po_data["request_div"],
+            pur_loc=po_data["pur_loc"],
+            delivery=po_data["delivery"],
+            inspection=po_data["inspection"],
+        ),
+    )
+)
+register(
+    ReportEntry(
+        event="Sort_My_Data",
+        group="Others",
+        module="assistant_scripts.other_functions.sort_my_data",
+        attribute="sort_my_data",
+        build_kwargs=lambda values: dict(directory=paths["my_data"]),
+    )
+)
+register(
+    ReportEntry(
+        event="New_supply_info",
+        group="Others",
+        module="assistant_scripts.read_data.read_supply_data",
+        attribute="SupplyDataReader",
+        build_kwargs=lambda values: dict(
+            path_supply=values["supply_path"], path_groups=paths["groups"]
+        ),
+        inputs=["supply_path"],
+    )
+)
+
+report_handlers = dict(report_registry)
+
+# files every handler takes from the GUI inputs
+handler_inputs = {event: entry.inputs for event, entry in report_registry.items()}
+
+
+def registry_groups():
+    groups = {}
+    for entry in report_registry.values():
+        groups.setdefault(entry.group, []).append(entry.event)
+    return groups
+
+
+def warm_up_imports(modules=("numpy", "pandas", "openpyxl")):
+    # run in a background thread once the window is shown, so the first report
+    # does not wait for the heavy imports
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"Error importing {module}: {e}")
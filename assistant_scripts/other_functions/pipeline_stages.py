@@ -0,0 +1,79 @@
+import threading
+from contextlib import contextmanager
+
+
+class StageCancelled(Exception):
+    pass
+
+
+class StageListener:
+    def stage_started(self, name: str, depth: int, owner):
+        pass
+
+    def stage_finished(self, name: str, depth: int, owner):
+        pass
+
+    def report_saved(self, path: str):
+        pass
+
+
+class StageCancel(StageListener):
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def stage_started(self, name, depth, owner):
+        if self.cancelled.is_set():
+            raise StageCancelled(f"Cancelled before stage {name}")
+
+
+# listeners are registered per thread, so a report running in a worker thread
+# only reports its own stages
+_state = threading.local()
+
+
+def _get_state():
+    if not hasattr(_state, "listeners"):
+        _state.listeners = []
+        _state.depth = 0
+    return _state
+
+
+@contextmanager
+def listen_stages(listener: StageListener):
+    state = _get_state()
+    state.listeners.append(listener)
+    try:
+        yield listener
+    finally:
+        state.listeners.remove(listener)
+
+
+def run_stage(stage, *args, **kwargs):
+    state = _get_state()
+    if not state.listeners:
+        return stage(*args, **kwargs)
+
+    owner = getattr(stage, "__self__", None)
+    name = stage.__name__
+    if owner is not None:
+        name = f"{type(owner).__name__}.{name}"
+    depth = state.depth
+    listeners = list(state.listeners)
+
+    for listener in listeners:
+        listener.stage_started(name, depth, owner)
+    state.depth += 1
+    try:
+        return stage(*args, **kwargs)
+    finally:
+        state.depth -= 1
+        for listener in reversed(listeners):
+            listener.stage_finished(name, depth, owner)
+
+
+def report_saved(path: str):
+    for listener in list(_get_state().listeners):
+        listener.report_saved(path)
@@ -0,0 +1,167 @@
+import os, glob, json, hashlib, shutil, tempfile, zipfile
+import xml.etree.ElementTree as ET
+import pandas as pd
+
+MAIN_NAMESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIPS_NAMESPACE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+)
+
+
+def _header(data: pd.DataFrame):
+    columns = [str(column) for column in data.columns]
+    dtypes = [str(dtype) for dtype in data.dtypes]
+    return json.dumps([columns, dtypes]).encode()
+
+
+def frame_fingerprint(data: pd.DataFrame, index: bool = True):
+    digest = hashlib.sha256(_header(data))
+    digest.update(pd.util.hash_pandas_object(data, index=index).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def partition_fingerprints(data: pd.DataFrame, key: str):
+    # the rows are hashed once for the whole frame, every value of the key
+    # gets the hash of its own rows
+    header = _header(data)
+    row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    fingerprints = {}
+    for value, positions in data.groupby(
+        key, sort=False, observed=True
+    ).indices.items():
+        digest = hashlib.sha256(header)
+        digest.update(row_hashes[positions].tobytes())
+        fingerprints[value] = digest.hexdigest()
+    return fingerprints
+
+
+def combine_fingerprints(fingerprints: dict):
+    digest = hashlib.sha256()
+    for name in sorted(fingerprints):
+        digest.update(f"{name}:{fingerprints[name]};".encode())
+    return digest.hexdigest()
+
+
+def _file_stamp(path: str):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ReportManifest:
+    # sidecar of a saved report, with the fingerprint of the data of every sheet
+    # and the layout version of the report that wrote them, sheets of another
+    # layout are never reused
+    version = 1
+
+    def __init__(self, report_path: str, layout_version: int = 1):
+        self.report_path = report_path
+        self.layout_version = layout_version
+        self.manifest_path = f"{os.path.splitext(report_path)[0]}.manifest.json"
+        self.sheets = {}
+
+    def save(self, sheets: dict):
+        self.sheets = sheets
+        manifest = {
+            "version": self.version,
+            "report": os.path.basename(self.report_path),
+            "report_stamp": _file_stamp(self.report_path),
+            "layout_version": self.layout_version,
+            "sheets": sheets,
+        }
+        with open(f"{self.manifest_path}.tmp", "w") as file:
+            json.dump(manifest, file)
+        os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+
+    @classmethod
+    def load(cls, manifest_path: str, layout_version: int = 1):
+        # a report opened and saved in Excel is not the one the manifest
+        # describes, its sheets can't be reused
+        try:
+            with open(manifest_path) as file:
+                data = json.load(file)
+            report_path = os.path.join(os.path.dirname(manifest_path), data["report"])
+            if data["version"] != cls.version or not os.path.exists(report_path):
+                return None
+            if data.get("layout_version") != layout_version:
+                return None
+            if _file_stamp(report_path) != data["report_stamp"]:
+                return None
+        except Exception as e:
+            print(f"Error loading report manifest {manifest_path}: {e}")
+            return None
+        manifest = cls(report_path, layout_version)
+        manifest.sheets = data["sheets"]
+        return manifest
+
+    @classmethod
+    def latest(cls, directory: str, prefix: str, layout_version: int = 1):
+        manifest_paths = glob.glob(
+            os.path.join(glob.escape(directory), f"{prefix}*.manifest.json")
+        )
+        for manifest_path in sorted(manifest_paths, key=os.path.getmtime, reverse=True):
+            manifest = cls.load(manifest_path, layout_version)
+            if manifest is not None:
+                return manifest
+        return None
+
+    def unchanged_sheets(self, sheets: dict):
+        return {
+            name
+            for name, fingerprint in sheets.items()
+            if self.sheets.get(name) == fingerprint
+        }
+
+
+def sheet_parts(archive: zipfile.ZipFile):
+    # the worksheet part of every sheet name, from the workbook relationships
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    relationships = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        relationship.get("Id"): relationship.get("Target")
+        for relationship in relationships
+    }
+    parts = {}
+    for sheet in workbook.iter(f"{{{MAIN_NAMESPACE}}}sheet"):
+        target = targets[sheet.get(f"{{{RELATIONSHIPS_NAMESPACE}}}id")]
+        if target.startswith("/"):
+            parts[sheet.get("name")] = target[1:]
+        else:
+            parts[sheet.get("name")] = f"xl/{target}"
+    return parts
+
+
+def copy_sheets(source_path: str, target_path: str, sheet_names: set):
+    # sheets written with inline strings (xlsxwriter constant_memory) and the
+    # same formats hold no references to other parts, so the worksheet xml of
+    # the previous report is copied over the empty sheet of the new one
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        raise ValueError(f"Can't copy sheets of {source_path} into itself")
+    directory = os.path.dirname(os.path.abspath(target_path))
+    with tempfile.NamedTemporaryFile(
+        dir=directory, suffix=".xlsx", delete=False
+    ) as temp_file:
+        temp_path = temp_file.name
+    try:
+        with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(
+            target_path
+        ) as target, zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as output:
+            source_parts = sheet_parts(source)
+            replaced = {
+                part: source_parts[name]
+                for name, part in sheet_parts(target).items()
+                if name in sheet_names and name in source_parts
+            }
+            for item in target.infolist():
+                if item.filename in replaced:
+                    with source.open(replaced[item.filename]) as data, output.open(
+                        item.filename, "w"
+                    ) as part:
+                        shutil.copyfileobj(data, part, 1024 * 1024)
+                else:
+                    output.writestr(item, target.read(item.filename))
+        shutil.copymode(target_path, temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return len(replaced)
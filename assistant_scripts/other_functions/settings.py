@@ -0,0 +1,46 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+paths = {
+    "po_template": os.getenv("PATH_PO_TEMPLATE"),
+    "groups": os.getenv("PATH_GROUPS"),
+    "db": os.getenv("PATH_DB"),
+    "my_data": os.getenv("PATH_MY_DATA"),
+    "products_files": os.getenv("PATH_PRODUCTS"),
+    "components_info": os.getenv("PATH_COMPONENTS"),
+}
+
+po_data = {
+    "ccn": os.getenv("PO_CCN"),
+    "mas_loc": os.getenv("PO_MAS_LOC"),
+    "request_div": os.getenv("PO_REQUEST_DIV"),
+    "pur_loc": os.getenv("PO_PUR_LOC"),
+    "delivery": os.getenv("PO_DELIVERY"),
+    "inspection": os.getenv("PO_INSPECTION"),
+}
+
+supply_data = {
+    "supplier_1": os.getenv("SUPPLIER_1"),
+    "supplier_2": os.getenv("SUPPLIER_2"),
+    "supplier_3": os.getenv("SUPPLIER_3"),
+    "incoterms": os.getenv("SUPPLY_INCOTERMS"),
+    "t_mode": os.getenv("SUPPLY_T_MODE"),
+}
+
+# files picked in the GUI, used by the command line when no path is given
+input_files = {
+    "components_data_path": os.getenv("PATH_COMPONENTS_DATA"),
+    "supply_path": os.getenv("PATH_SUPPLY"),
+    "factory_path": os.getenv("PATH_FACTORY_DATA"),
+}
+
+products_workers = int(os.getenv("PRODUCTS_WORKERS", os.cpu_count() or 1))
+# zpp066 text dumps are read in chunks of this many lines when set, the report
+# then has no Factory_data sheet with the whole dump
+factory_chunksize = int(os.getenv("FACTORY_CHUNKSIZE", 0)) or None
+# reports write Excel formulas instead of computed values
+use_formulas = os.getenv("REPORTS_USE_FORMULAS", "0") == "1"
+# Groups_statuses rebuilds only the sheets whose data changed since the last report
+groups_statuses_incremental = os.getenv("GROUPS_STATUSES_INCREMENTAL", "0") == "1"
@@ -1,31 +1,208 @@
-import os, shutil
+import os, re, json, shutil, hashlib, datetime, threading
+
+dir_mapping = {
+    "C502_ProductsSupplyPlanDisp": os.path.join("DOWNLOADS", "Products_data"),
+    "C711_PartsSupplyPlanDisp": os.path.join("DOWNLOADS", "Components_data"),
+    "zpp066_": os.path.join("DOWNLOADS", "Factory_data"),
+    "AttachRatePlanning-": os.path.join("DOWNLOADS", "AR_downloads"),
+    "EMS_Forecast_": os.path.join("RESULTS", "EMS_Forecast"),
+    "Report_components_data_": os.path.join("RESULTS", "Component_report"),
+    "Report_factory_inventory_": os.path.join("RESULTS", "Factory_inventory"),
+    "Results_AR_check_": os.path.join("RESULTS", "AR_check"),
+    "Report_products_data_": os.path.join("RESULTS", "Product_report"),
+    "Report_groups_statuses_": os.path.join("RESULTS", "Groups_statuses"),
+    "Report_groups_balances_": os.path.join("RESULTS", "Groups_balances"),
+}
+
+# all file types in one pattern, every type is a group of its own
+file_types = list(dir_mapping)
+file_types_pattern = re.compile("|".join(f"({re.escape(x)})" for x in file_types))
+
+manifest_name = "sort_my_data_manifest.json"
+
+
+def file_type_of(file_name: str):
+    match = file_types_pattern.search(file_name)
+    if match is None:
+        return None
+    return file_types[match.lastindex - 1]
+
+
+def file_sha256(file_path: str):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DataRouter:
+    # the manifest is shared by the Sort_My_Data button and the watch folder
+    _lock = threading.Lock()
+    version = 1
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, manifest_name)
+        self.files = None
+        self.hashes = None
+
+    def load_manifest(self):
+        self.files = {}
+        try:
+            with open(self.manifest_path) as file:
+                manifest = json.load(file)
+            if manifest["version"] == self.version:
+                self.files = manifest["files"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading {self.manifest_path}: {e}")
+        self.hashes = {}
+        for relative_path, record in self.files.items():
+            self.hashes.setdefault(record["sha256"], []).append(relative_path)
+
+    def save_manifest(self):
+        manifest = {"version": self.version, "files": self.files}
+        with open(f"{self.manifest_path}.tmp", "w") as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+
+    def _add_record(self, file_path: str, file_type: str, sha256: str):
+        stat = os.stat(file_path)
+        relative_path = os.path.relpath(file_path, self.directory)
+        self.files[relative_path] = {
+            "file_type": file_type,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "moved": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        self.hashes.setdefault(sha256, []).append(relative_path)
+
+    def _has_content(self, relative_path: str, sha256: str):
+        # the hash of the manifest holds while the file keeps its size and time
+        file_path = os.path.join(self.directory, relative_path)
+        record = self.files.get(relative_path)
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return False
+        if record and [stat.st_size, stat.st_mtime_ns] == [
+            record["size"],
+            record["mtime_ns"],
+        ]:
+            return record["sha256"] == sha256
+        return file_sha256(file_path) == sha256
+
+    def _find_copy(self, sha256: str, file_type: str):
+        for relative_path in self.hashes.get(sha256, []):
+            record = self.files[relative_path]
+            if record["file_type"] == file_type and self._has_content(
+                relative_path, sha256
+            ):
+                return os.path.join(self.directory, relative_path)
+        return None
+
+    def _free_path(self, file_path: str):
+        name, extension = os.path.splitext(file_path)
+        number = 1
+        while os.path.exists(file_path):
+            file_path = f"{name} ({number}){extension}"
+            number += 1
+        return file_path
+
+    def route(self, source_path: str, file_type: str = None):
+        # returns what was done and where the file is now: "moved", "renamed"
+        # when the name was taken by another file, or "duplicate" when the same
+        # bytes were already sorted and the new copy was removed
+        file_type = file_type or file_type_of(os.path.basename(source_path))
+        if file_type is None:
+            return None, None
+        destination_directory = os.path.join(self.directory, dir_mapping[file_type])
+        os.makedirs(destination_directory, exist_ok=True)
+        sha256 = file_sha256(source_path)
+
+        with self._lock:
+            self.load_manifest()
+            copy_path = self._find_copy(sha256, file_type)
+            destination = os.path.join(
+                destination_directory, os.path.basename(source_path)
+            )
+            if copy_path is None and os.path.exists(destination):
+                if self._has_content(
+                    os.path.relpath(destination, self.directory), sha256
+                ):
+                    copy_path = destination
+                    self._add_record(destination, file_type, sha256)
+            if copy_path is not None:
+                os.remove(source_path)
+                action, destination = "duplicate", copy_path
+            else:
+                action = "moved"
+                if os.path.exists(destination):
+                    action, destination = "renamed", self._free_path(destination)
+                shutil.move(source_path, destination)
+                self._add_record(destination, file_type, sha256)
+            self.save_manifest()
+        return action, destination
+
+    def latest_file(self, file_type: str):
+        # newest sorted file of the type, without listing the folders
+        with self._lock:
+            self.load_manifest()
+        latest_path, latest_mtime = None, None
+        for relative_path, record in self.files.items():
+            if record["file_type"] != file_type:
+                continue
+            file_path = os.path.join(self.directory, relative_path)
+            if (latest_mtime is None or record["mtime_ns"] > latest_mtime) and (
+                os.path.exists(file_path)
+            ):
+                latest_path, latest_mtime = file_path, record["mtime_ns"]
+        return latest_path
+
+
+def move_file(directory: str, file_name: str):
+    # returns the path of the sorted file, or None when no rule matches
+    return DataRouter(directory).route(os.path.join(directory, file_name))[1]
+
+
+def latest_file(directory: str, file_type: str):
+    return DataRouter(directory).latest_file(file_type)
+
+
+def duplicates_message(duplicates: list):
+    lines = [
+        f"{os.path.basename(source_path)}: same as {copy_path}"
+        for source_path, copy_path in duplicates
+    ]
+    return "\n".join(
+        [f"{len(duplicates)} files were already sorted and were removed:"] + lines
+    )
 
 
 def sort_my_data(directory):
-    dir_mapping = {
-        "C502_ProductsSupplyPlanDisp": "DOWNLOADS\Products_data",
-        "C711_PartsSupplyPlanDisp": "DOWNLOADS\Components_data",
-        "zpp066_": "DOWNLOADS\Factory_data",
-        "AttachRatePlanning-": "DOWNLOADS\AR_downloads",
-        "EMS_Forecast_": "RESULTS\EMS_Forecast",
-        "Report_components_data_": "RESULTS\Component_report",
-        "Report_factory_inventory_": "RESULTS\Factory_inventory",
-        "Results_AR_check_": "RESULTS\AR_check",
-        "Report_products_data_": "RESULTS\Product_report",
-        "Report_groups_statuses_": "RESULTS\Groups_statuses",
-        "Report_groups_balances_": "RESULTS\Groups_balances",
-    }
-    files = os.listdir(directory)
-    for file in files:
-        for file_type in dir_mapping:
-            if file_type in file:
-                destination_directory = os.path.join(directory, dir_mapping[file_type])
-                source_file_path = os.path.join(directory, file)
-                shutil.move(source_file_path, destination_directory)
+    # returns a message listing the removed duplicates, None when there were none
+    router = DataRouter(directory)
+    duplicates = []
+
+    def route(file_path, file_type=None):
+        action, destination = router.route(file_path, file_type=file_type)
+        if action == "duplicate":
+            duplicates.append((file_path, destination))
+
+    for file in os.listdir(directory):
+        file_path = os.path.join(directory, file)
+        if os.path.isfile(file_path):
+            route(file_path)
     directory2 = os.path.join(directory, "products_files_to_report")
-    files2 = os.listdir(directory2)
-    new_directory = os.path.join(directory, "DOWNLOADS\Products_data")
-    for file in files2:
-        destination_directory = os.path.join(new_directory, file)
-        source_file_path = os.path.join(directory2, file)
-        shutil.move(source_file_path, destination_directory)
+    if os.path.isdir(directory2):
+        for file in os.listdir(directory2):
+            route(
+                os.path.join(directory2, file),
+                file_type="C502_ProductsSupplyPlanDisp",
+            )
+    if duplicates:
+        return duplicates_message(duplicates)
+    return None
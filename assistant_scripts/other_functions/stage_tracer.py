@@ -0,0 +1,165 @@
+import os, json, time, datetime, threading, tracemalloc
+
+from contextlib import contextmanager
+from assistant_scripts.other_functions.pipeline_stages import (
+    StageListener,
+    listen_stages,
+)
+
+
+class StageTracer(StageListener):
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.started_tracemalloc = False
+        self.stages = []
+        self.open_stages = []
+        self.report_paths = []
+        self.trace_start = None
+
+    def start(self):
+        self.trace_start = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+
+    def stop(self):
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def _memory(self):
+        if not tracemalloc.is_tracing():
+            return None, None
+        return tracemalloc.get_traced_memory()
+
+    def stage_started(self, name, depth, owner):
+        current, peak = self._memory()
+        if current is not None:
+            # the peak is reset for every stage, the parent keeps its own peak
+            if self.open_stages:
+                parent = self.open_stages[-1]
+                parent["peak"] = max(parent["peak"], peak)
+            tracemalloc.reset_peak()
+        self.open_stages.append(
+            {
+                "name": name,
+                "depth": depth,
+                "start": time.perf_counter(),
+                "cpu_start": time.process_time(),
+                "memory_start": current,
+                "peak": current or 0,
+            }
+        )
+
+    def stage_finished(self, name, depth, owner):
+        stage = self.open_stages.pop()
+        end, cpu_end = time.perf_counter(), time.process_time()
+        record = {
+            "name": name,
+            "depth": depth,
+            "start_s": round(stage["start"] - self.trace_start, 6),
+            "wall_s": round(end - stage["start"], 6),
+            "cpu_s": round(cpu_end - stage["cpu_start"], 6),
+            "frames": self._frame_shapes(owner),
+        }
+        current, peak = self._memory()
+        if current is not None:
+            peak = max(stage["peak"], peak)
+            record["peak_alloc_mb"] = round((peak - stage["memory_start"]) / 2**20, 3)
+            if self.open_stages:
+                parent = self.open_stages[-1]
+                parent["peak"] = max(parent["peak"], peak)
+        self.stages.append(record)
+
+    def report_saved(self, path):
+        self.report_paths.append(path)
+
+    def _frame_shapes(self, owner):
+        # imported here, so the GUI does not load pandas before the first report
+        import pandas as pd
+
+        if owner is None:
+            return {}
+        return {
+            name: list(value.shape)
+            for name, value in vars(owner).items()
+            if isinstance(value, (pd.DataFrame, pd.Series))
+        }
+
+    def to_dict(self, name: str):
+        # stages are recorded when they finish, the trace lists them by start
+        return {
+            "name": name,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "reports": self.report_paths,
+            "stages": sorted(self.stages, key=lambda stage: stage["start_s"]),
+        }
+
+    def to_chrome_trace(self, name: str):
+        # complete events of the Trace Event Format, opens in chrome://tracing
+        # and Perfetto
+        events = [
+            {
+                "name": stage["name"],
+                "cat": name,
+                "ph": "X",
+                "ts": round(stage["start_s"] * 1e6),
+                "dur": round(stage["wall_s"] * 1e6),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    key: stage[key]
+                    for key in ["cpu_s", "peak_alloc_mb", "frames"]
+                    if key in stage
+                },
+            }
+            for stage in self.stages
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, name: str, trace_dir: str = None, chrome: bool = False):
+        # next to the last saved report, unless a folder is given
+        if trace_dir is None and self.report_paths:
+            trace_dir = os.path.dirname(self.report_paths[-1])
+        trace_dir = trace_dir or os.getcwd()
+        os.makedirs(trace_dir, exist_ok=True)
+
+        now = datetime.datetime.now().strftime("%d%m%Y_%H%M%S")
+        trace_path = os.path.join(trace_dir, f"Trace_{name}_{now}.json")
+        with open(trace_path, "w") as file:
+            json.dump(self.to_dict(name), file, indent=2)
+        paths = [trace_path]
+        if chrome:
+            chrome_path = os.path.join(trace_dir, f"Trace_{name}_{now}.chrome.json")
+            with open(chrome_path, "w") as file:
+                json.dump(self.to_chrome_trace(name), file)
+            paths.append(chrome_path)
+        return paths
+
+
+@contextmanager
+def trace_stages(
+    name: str,
+    trace_dir: str = None,
+    chrome: bool = False,
+    trace_memory: bool = True,
+):
+    tracer = StageTracer(trace_memory=trace_memory)
+    tracer.start()
+    try:
+        with listen_stages(tracer):
+            yield tracer
+    finally:
+        tracer.stop()
+        try:
+            tracer.save(name, trace_dir=trace_dir, chrome=chrome)
+        except Exception as e:
+            print(f"Error saving stage trace: {e}")
+
+
+def trace_settings():
+    # tracing is off unless TRACE_STAGES or PATH_TRACES is set
+    trace_dir = os.getenv("PATH_TRACES")
+    enabled = bool(trace_dir) or os.getenv("TRACE_STAGES", "0") == "1"
+    chrome = os.getenv("TRACE_CHROME", "0") == "1"
+    return enabled, trace_dir or None, chrome
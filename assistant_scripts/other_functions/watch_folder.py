@@ -0,0 +1,145 @@
+import os, time, queue, threading
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from assistant_scripts.other_functions.sort_my_data import DataRouter, file_type_of
+
+# browsers write the download under a temporary name and rename it at the end
+partial_suffixes = (".crdownload", ".part", ".partial", ".tmp", ".download")
+
+
+def preparse_components(file_path: str):
+    # imported here, so watching does not load pandas before the first file
+    from assistant_scripts.read_data.read_components_data import ComponentsDataReader
+
+    # the same options as the reports, so they hit the same cache entry
+    ComponentsDataReader(
+        file_path=file_path, fix_weeks=True, add_forecast=False, to_excel=False
+    )()
+
+
+def preparse_products(file_path: str):
+    from assistant_scripts.read_data.read_products_data import read_products_file
+
+    read_products_file(file_path)
+
+
+def preparse_factory(file_path: str):
+    from assistant_scripts.read_data.read_factory_data import FactoryDataReader
+
+    FactoryDataReader(factory_data_path=file_path, db_path=None).preparse()
+
+
+preparse_functions = {
+    "C711_PartsSupplyPlanDisp": preparse_components,
+    "C502_ProductsSupplyPlanDisp": preparse_products,
+    "zpp066_": preparse_factory,
+}
+
+
+class WatchFolder(FileSystemEventHandler):
+    def __init__(
+        self,
+        directory: str,
+        preparse: bool = True,
+        settle_seconds: float = 2.0,
+        on_file=None,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.preparse = preparse
+        self.settle_seconds = settle_seconds
+        # called with the file name, the new path, an error or None and the
+        # action of the router, "duplicate" when the download was removed as a
+        # copy of an already sorted file
+        self.on_file = on_file
+        self.files = queue.Queue()
+        self.stopped = threading.Event()
+        self.observer = None
+        self.worker = None
+
+    def _is_download(self, path: str):
+        file_name = os.path.basename(path)
+        return (
+            os.path.dirname(os.path.abspath(path)) == self.directory
+            and not file_name.startswith("~$")
+            and not file_name.lower().endswith(partial_suffixes)
+            and file_type_of(file_name) is not None
+        )
+
+    def on_created(self, event):
+        if not event.is_directory and self._is_download(event.src_path):
+            self.files.put(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory and self._is_download(event.dest_path):
+            self.files.put(event.dest_path)
+
+    def _wait_until_written(self, path: str):
+        # the file is taken once its size and time stop changing and it can
+        # be opened, Excel and browsers keep it locked while writing
+        last_stamp = None
+        while not self.stopped.is_set():
+            try:
+                stat = os.stat(path)
+                stamp = (stat.st_size, stat.st_mtime_ns)
+                if stamp == last_stamp:
+                    with open(path, "rb"):
+                        return True
+                last_stamp = stamp
+            except FileNotFoundError:
+                return False
+            except OSError:
+                last_stamp = None
+            self.stopped.wait(self.settle_seconds)
+        return False
+
+    def process_file(self, path: str):
+        file_name = os.path.basename(path)
+        action, new_path, error = None, None, None
+        try:
+            if self._wait_until_written(path):
+                action, new_path = DataRouter(self.directory).route(path)
+                preparse = preparse_functions.get(file_type_of(file_name))
+                if self.preparse and new_path and preparse:
+                    preparse(new_path)
+        except Exception as e:
+            error = e
+            print(f"Error processing {file_name}: {e}")
+        if self.on_file and new_path:
+            self.on_file(file_name, new_path, error, action)
+
+    def _process_files(self):
+        # one file at a time, parsing is heavy and the reports may be running
+        while not self.stopped.is_set():
+            try:
+                path = self.files.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if os.path.exists(path):
+                self.process_file(path)
+
+    def start(self):
+        self.stopped.clear()
+        # files downloaded while nothing was watching
+        for file_name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, file_name)
+            if os.path.isfile(path) and self._is_download(path):
+                self.files.put(path)
+        self.worker = threading.Thread(target=self._process_files, daemon=True)
+        self.worker.start()
+        self.observer = Observer()
+        self.observer.schedule(self, self.directory, recursive=False)
+        self.observer.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def is_running(self):
+        return self.observer is not None
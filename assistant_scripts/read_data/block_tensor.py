@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from assistant_scripts.read_data.sap_cleaning import parse_integers
+
+
+class BlockTensor:
+    def __init__(
+        self,
+        values: np.ndarray,
+        meta: np.ndarray,
+        meta_columns: list,
+        weeks: list,
+        rows: list,
+    ):
+        # values: (blocks, rows, weeks) of the row numbers in rows only,
+        # meta: (blocks, rows_per_block, meta)
+        self.values = values
+        self.meta = meta
+        self.meta_columns = meta_columns
+        self.weeks = weeks
+        self.rows = rows
+        self.index = None
+
+    @classmethod
+    def from_frame(
+        cls,
+        data: pd.DataFrame,
+        rows_per_block: int,
+        meta_columns: list,
+        week_columns: list,
+        rows: list,
+    ):
+        # only the week cells of the row numbers in rows are parsed, as SAP
+        # text with parse_integers, the other rows are never read
+        blocks = len(data) // rows_per_block
+        partial_block = data.iloc[blocks * rows_per_block :]
+        if partial_block.notna().any(axis=None):
+            print(
+                f"Warning: last {len(partial_block)} rows are not a whole block "
+                f"of {rows_per_block} rows and were skipped"
+            )
+        data = data.iloc[: blocks * rows_per_block]
+        row_numbers = np.arange(len(data)) % rows_per_block + 1
+        selected = data.loc[np.isin(row_numbers, rows), week_columns]
+        values = parse_integers(selected)
+        values = values.reshape(blocks, len(rows), len(week_columns))
+        meta = data[meta_columns].to_numpy(dtype=object)
+        meta = meta.reshape(blocks, rows_per_block, len(meta_columns))
+        return cls(values, meta, list(meta_columns), list(week_columns), sorted(rows))
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def set_index(self, row_number: int, column: str, name: str):
+        self.index = pd.Index(self.meta_row(row_number, column), name=name)
+        return self.index
+
+    def row(self, row_number: int):
+        return self.values[:, self.rows.index(row_number), :]
+
+    def meta_row(self, row_number: int, column: str):
+        return self.meta[:, row_number - 1, self.meta_columns.index(column)]
+
+    def row_frame(self, row_number: int):
+        frame = pd.DataFrame(self.row(row_number), columns=self.weeks, copy=False)
+        frame.insert(0, self.index.name, self.index)
+        return frame
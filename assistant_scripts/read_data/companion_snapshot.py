@@ -0,0 +1,135 @@
+import os, hashlib, sqlite3
+import pandas as pd
+
+from assistant_scripts.read_data.data_cache import default_cache_dir
+
+
+def latest_comments(comments: pd.DataFrame):
+    # the readers take the comment of the newest timestamp (groups) or the last
+    # text and timestamp by rowid (products and components), these rows are
+    # enough for both, in rowid order
+    comments = comments.sort_values("comment_rowid")
+    keep = []
+    for column in ["text", "timestamp"]:
+        rows = comments.dropna(subset=[column])
+        keep.append(rows.groupby("product_id", dropna=False).tail(1))
+    newest = comments.dropna(subset=["timestamp"]).sort_values(
+        ["timestamp", "comment_rowid"], ascending=[False, True]
+    )
+    keep.append(newest.groupby("product_id", dropna=False).head(1))
+    rowids = pd.concat([x["comment_rowid"] for x in keep])
+    return comments[comments["comment_rowid"].isin(rowids)]
+
+
+class CompanionDbSnapshot:
+    # one connection per database for this session, PRAGMA data_version only
+    # changes when another connection commits to the database
+    _sessions = {}
+    # snapshots of another version kept other comments, they are read again
+    version = 2
+
+    def __init__(self, path_db: str, cache_dir: str = None):
+        self.path_db = os.path.abspath(path_db)
+        name = hashlib.sha256(self.path_db.encode()).hexdigest()[:16]
+        cache_dir = cache_dir or default_cache_dir()
+        self.snapshot_path = os.path.join(cache_dir, "companion", f"{name}.pkl")
+        self.data = None
+        self.data_version = None
+        self.file_stamp = None
+        self.comments = {}
+        self.watermarks = {}
+
+    def _file_stamp(self):
+        # in WAL mode commits land in the -wal file until the next checkpoint
+        stamp = []
+        for path in [self.path_db, f"{self.path_db}-wal"]:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stamp.append((stat.st_size, stat.st_mtime_ns))
+        return stamp
+
+    def _session(self):
+        if self.path_db not in self._sessions:
+            self._sessions[self.path_db] = {
+                "conn": sqlite3.connect(self.path_db, check_same_thread=False),
+                "data_version": None,
+                "data": None,
+            }
+        return self._sessions[self.path_db]
+
+    def _data_version(self, session):
+        return session["conn"].execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_data(self):
+        try:
+            return pd.read_pickle(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading companion snapshot: {e}")
+            return None
+
+    def load(self):
+        # versions are taken before the sync, so commits made during it are
+        # picked up by the next run
+        self.file_stamp = self._file_stamp()
+        try:
+            session = self._session()
+            self.data_version = self._data_version(session)
+        except sqlite3.Error as e:
+            print(f"Error checking companion DB version: {e}")
+            session = None
+
+        if session is not None and session["data"] is not None:
+            self.data = session["data"]
+            if session["data_version"] == self.data_version:
+                return True
+        if self.data is None:
+            self.data = self._load_data()
+        if self.data is None or self.data.get("version") != self.version:
+            self.data = None
+            return False
+        if self.data["stamp"] != self.file_stamp:
+            return False
+        if session is not None:
+            session["data"] = self.data
+            session["data_version"] = self.data_version
+        return True
+
+    def views(self):
+        return {name: view.copy() for name, view in self.data["views"].items()}
+
+    def get_watermark(self, table: str, max_rowid: int):
+        if self.data is None or table not in self.data["comments"]:
+            return 0
+        watermark = self.data["watermarks"][table]
+        # comments were deleted or the DB was rebuilt, sync the table again
+        return 0 if max_rowid < watermark else watermark
+
+    def merge_comments(self, table: str, new_comments, watermark: int, max_rowid: int):
+        comments = new_comments
+        if watermark > 0:
+            comments = pd.concat([self.data["comments"][table], new_comments])
+            comments = latest_comments(comments)
+        self.comments[table] = comments.reset_index(drop=True)
+        self.watermarks[table] = max_rowid
+        return self.comments[table]
+
+    def save(self, views: dict):
+        self.data = {
+            "version": self.version,
+            "stamp": self.file_stamp,
+            "watermarks": self.watermarks,
+            "comments": self.comments,
+            "views": {name: view.copy() for name, view in views.items()},
+        }
+        if self.data_version is not None:
+            session = self._session()
+            session["data"] = self.data
+            session["data_version"] = self.data_version
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            pd.to_pickle(self.data, f"{self.snapshot_path}.tmp")
+            os.replace(f"{self.snapshot_path}.tmp", self.snapshot_path)
+        except Exception as e:
+            print(f"Error saving companion snapshot: {e}")
@@ -0,0 +1,135 @@
+import os, hashlib, json, shutil
+import pandas as pd
+
+from assistant_scripts.read_data.week_axis import week_monday
+
+
+def default_cache_dir():
+    return os.getenv("PATH_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".assistant_cache"
+    )
+
+
+def current_week_start():
+    return week_monday().isoformat()
+
+
+class ParsedDataCache:
+    # content hashes already computed in this session, keyed by path/size/mtime
+    _file_hashes = {}
+
+    def __init__(
+        self,
+        source_path: str,
+        reader: str,
+        version: int,
+        params: dict = None,
+        cache_dir: str = None,
+    ):
+        self.source_path = source_path
+        self.reader = reader
+        self.version = version
+        self.params = params or {}
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.entry_path = None
+
+    def _file_hash(self):
+        stat = os.stat(self.source_path)
+        stamp = (os.path.abspath(self.source_path), stat.st_size, stat.st_mtime_ns)
+        if stamp not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(self.source_path, "rb") as file:
+                for block in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(block)
+            self._file_hashes[stamp] = digest.hexdigest()
+        return self._file_hashes[stamp]
+
+    def _get_entry_path(self):
+        if self.entry_path is None:
+            params = json.dumps(self.params, sort_keys=True, default=str)
+            key = f"{self._file_hash()}|{self.reader}|{self.version}|{params}"
+            key = hashlib.sha256(key.encode()).hexdigest()[:32]
+            self.entry_path = os.path.join(self.cache_dir, self.reader, key)
+        return self.entry_path
+
+    def load(self, names: list):
+        try:
+            entry_path = self._get_entry_path()
+            return {
+                name: pd.read_pickle(os.path.join(entry_path, f"{name}.pkl"))
+                for name in names
+            }
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading cache: {e}")
+            return None
+
+    def save(self, frames: dict):
+        try:
+            entry_path = self._get_entry_path()
+            os.makedirs(entry_path, exist_ok=True)
+            for name, frame in frames.items():
+                file_path = os.path.join(entry_path, f"{name}.pkl")
+                frame.to_pickle(f"{file_path}.tmp")
+                os.replace(f"{file_path}.tmp", file_path)
+        except Exception as e:
+            print(f"Error saving cache: {e}")
+
+    def load_chunks(self, name: str):
+        # chunks are read back one at a time, None when they were never saved
+        try:
+            chunks_path = os.path.join(self._get_entry_path(), name)
+            file_names = sorted(os.listdir(chunks_path))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading cache: {e}")
+            return None
+        return (
+            pd.read_pickle(os.path.join(chunks_path, file_name))
+            for file_name in file_names
+        )
+
+    def save_chunks(self, name: str, chunks):
+        # every chunk is written and passed on before the next one is read, the
+        # folder gets its final name only when all chunks are written
+        chunks_path = os.path.join(self._get_entry_path(), name)
+        temp_path = f"{chunks_path}.tmp{os.getpid()}"
+        saving = True
+        try:
+            os.makedirs(temp_path, exist_ok=True)
+        except Exception as e:
+            print(f"Error saving cache: {e}")
+            saving = False
+        try:
+            for i, chunk in enumerate(chunks):
+                if saving:
+                    try:
+                        chunk.to_pickle(os.path.join(temp_path, f"{i:06d}.pkl"))
+                    except Exception as e:
+                        print(f"Error saving cache: {e}")
+                        saving = False
+                yield chunk
+            if saving:
+                try:
+                    os.replace(temp_path, chunks_path)
+                except OSError:
+                    # saved by another reader in the meantime
+                    pass
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def read_excel_cached(path: str, sheet_name: str, use_cache: bool = True):
+    if not use_cache:
+        return pd.read_excel(path, sheet_name=sheet_name)
+    cache = ParsedDataCache(
+        source_path=path, reader="excel", version=1, params={"sheet": sheet_name}
+    )
+    cached = cache.load(["data"])
+    if cached is not None:
+        return cached["data"]
+    data = pd.read_excel(path, sheet_name=sheet_name)
+    cache.save({"data": data})
+    return data
@@ -0,0 +1,112 @@
+import threading
+import numpy as np
+import pandas as pd
+
+key_domains = ["COMPONENT", "SOI", "GROUP", "CODENUMBER"]
+
+
+class KeyRegistry:
+    # every key value seen in the session gets one code per domain, new values
+    # are added at the end, so codes and dtypes given before stay valid
+    # past max_values keys the registry starts over, so a long GUI session or
+    # watcher does not keep every key it ever saw
+    max_values = 2000000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.categories = {}
+        self.dtypes = {}
+
+    def size(self):
+        return sum(len(x) for x in self.categories.values())
+
+    def reset(self):
+        # dtypes given before are still valid categoricals, they are no longer
+        # registered, so their values are looked up again
+        with self._lock:
+            self.categories = {}
+            self.dtypes = {}
+
+    def reset_if_full(self):
+        with self._lock:
+            if self.size() > self.max_values:
+                self.reset()
+
+    def register(self, domain: str, values):
+        values = pd.Index(values, dtype=object).dropna().unique()
+        with self._lock:
+            categories = self.categories.get(domain, pd.Index([], dtype=object))
+            new_values = values.difference(categories, sort=False)
+            if len(new_values) or domain not in self.dtypes:
+                categories = categories.append(new_values)
+                self.categories[domain] = categories
+                self.dtypes[domain] = pd.CategoricalDtype(categories)
+            return self.dtypes[domain]
+
+    def dtype(self, domain: str):
+        return self.register(domain, [])
+
+    def is_registered(self, domain: str, dtype):
+        # dtypes given before are a prefix of the categories of the domain
+        categories = self.categories.get(domain)
+        if not isinstance(dtype, pd.CategoricalDtype) or categories is None:
+            return False
+        size = len(dtype.categories)
+        return size <= len(categories) and categories[:size].equals(dtype.categories)
+
+    def _codes(self, domain: str, values):
+        # the values are hashed once, only their distinct values are looked up
+        # in the registry, missing values get -1
+        if self.is_registered(domain, getattr(values, "dtype", None)):
+            codes = getattr(values, "cat", values).codes
+            return np.asarray(codes), self.dtype(domain)
+        local_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        dtype = self.register(domain, uniques)
+        lookup = dtype.categories.get_indexer(uniques)
+        codes = np.where(local_codes >= 0, lookup[local_codes], -1)
+        return codes, dtype
+
+    def codes(self, domain: str, values):
+        return self._codes(domain, values)[0]
+
+    def shared_codes(self, domain: str, *values):
+        # codes of several columns from the same registry, none is reset between
+        with self._lock:
+            self.reset_if_full()
+            return [self.codes(domain, x) for x in values]
+
+    def encode(self, domain: str, values):
+        # values as the shared categorical of the domain
+        codes, dtype = self._codes(domain, values)
+        categorical = pd.Categorical.from_codes(codes, dtype=dtype)
+        if isinstance(values, pd.Series):
+            return pd.Series(categorical, index=values.index, name=values.name)
+        return categorical
+
+    def encode_frame(self, data: pd.DataFrame):
+        self.reset_if_full()
+        data = data.copy()
+        for column in data.columns:
+            if column in key_domains:
+                data[column] = self.encode(column, data[column])
+        return data
+
+
+key_registry = KeyRegistry()
+
+
+def merge_on_key(left: pd.DataFrame, right: pd.DataFrame, on: str, how="left"):
+    # pd.merge(left, right, on=on, how=how) joined on the registry codes of
+    # both sides, the key column keeps the values of the left frame, so rows
+    # only in the right frame (how="right" or "outer") would lose their key
+    if how not in ("left", "inner"):
+        raise ValueError(f"merge_on_key supports how='left' or 'inner', not {how!r}")
+    left_codes, right_codes = key_registry.shared_codes(on, left[on], right[on])
+    merged = pd.merge(
+        left,
+        right.drop(columns=on),
+        left_on=left_codes,
+        right_on=right_codes,
+        how=how,
+    )
+    return merged.drop(columns="key_0")
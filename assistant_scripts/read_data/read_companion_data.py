@@ -1,10 +1,28 @@
 import os, sqlite3
 import pandas as pd
+from assistant_scripts.other_functions.pipeline_stages import run_stage
+from assistant_scripts.read_data.companion_snapshot import (
+    CompanionDbSnapshot,
+    latest_comments,
+)
 
 
 class CompanionDbReader:
-    def __init__(self, path_db):
+    comment_tables = ["my_group_comment", "soi_comment", "component_comment"]
+
+    def __init__(
+        self,
+        path_db,
+        sql_pushdown: bool = False,
+        snapshot: bool = False,
+        create_indexes: bool = False,
+    ):
         self.path_db = path_db
+        self.sql_pushdown = sql_pushdown
+        self.snapshot = snapshot
+        # indexes are added to the companion DB only when asked for
+        self.create_indexes = create_indexes
+        self.db_snapshot = None
         self.db_conn = None
         self.components = None
         self.products = None
@@ -26,15 +44,98 @@ class CompanionDbReader:
     def _unconnect_db(self):
         self.db_conn.close()
 
+    def _create_comments_indexes(self):
+        print(f"Adding comments indexes to {self.path_db}")
+        try:
+            for table in self.comment_tables:
+                self.db_conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_latest "
+                    f"ON {table} (product_id, timestamp)"
+                )
+            self.db_conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error creating indexes: {e}")
+
+    def _latest_comments_query(self, table, where=""):
+        # only the comments the readers take from, see latest_comments: the
+        # last text, the last timestamp and the first newest timestamp of
+        # every group, product or component
+        where = f"{where} AND" if where else "WHERE"
+        return f"""
+            SELECT *, rowid AS comment_rowid FROM {table}
+            WHERE rowid IN (
+                SELECT MAX(rowid) FROM {table}
+                {where} text IS NOT NULL
+                GROUP BY product_id
+                UNION
+                SELECT MAX(rowid) FROM {table}
+                {where} timestamp IS NOT NULL
+                GROUP BY product_id
+                UNION
+                SELECT comment_rowid FROM (
+                    SELECT rowid AS comment_rowid, ROW_NUMBER() OVER (
+                        PARTITION BY product_id ORDER BY timestamp DESC, rowid
+                    ) AS comment_rank
+                    FROM {table}
+                    {where} timestamp IS NOT NULL
+                )
+                WHERE comment_rank = 1
+            )
+            ORDER BY rowid
+        """
+
+    def _read_comments(self, table):
+        if self.db_snapshot is not None:
+            return self._sync_comments(table)
+        if not self.sql_pushdown:
+            return pd.read_sql(f"SELECT * FROM {table}", self.db_conn)
+        comments = pd.read_sql(self._latest_comments_query(table), self.db_conn)
+        return comments.drop(columns="comment_rowid")
+
+    def _sync_comments(self, table):
+        # fetch only the comments added since the last sync
+        max_rowid = self.db_conn.execute(f"SELECT MAX(rowid) FROM {table}")
+        max_rowid = max_rowid.fetchone()[0] or 0
+        watermark = self.db_snapshot.get_watermark(table, max_rowid)
+        new_comments = pd.read_sql(
+            self._latest_comments_query(
+                table, "WHERE rowid > :watermark AND rowid <= :max_rowid"
+            ),
+            self.db_conn,
+            params={"watermark": watermark, "max_rowid": max_rowid},
+        )
+        comments = self.db_snapshot.merge_comments(
+            table, new_comments, watermark, max_rowid
+        )
+        return comments.drop(columns="comment_rowid")
+
+    def _load_snapshot(self):
+        self.db_snapshot = CompanionDbSnapshot(self.path_db)
+        if not self.db_snapshot.load():
+            return False
+        views = self.db_snapshot.views()
+        self.groups = views["groups"]
+        self.components = views["components"]
+        self.products = views["products"]
+        return True
+
+    def _save_snapshot(self):
+        self.db_snapshot.save(
+            {
+                "groups": self.groups,
+                "components": self.components,
+                "products": self.products,
+            }
+        )
+
     def get_groups(self):
         query_group = "SELECT * FROM my_group"
-        query_group_comments = "SELECT * FROM my_group_comment"
         query_group_products = "SELECT * FROM my_group_product"
 
         groups = pd.read_sql(query_group, self.db_conn)
         groups = groups.rename(columns={"id": "my_group_id"})
 
-        groups_comments = pd.read_sql(query_group_comments, self.db_conn)
+        groups_comments = self._read_comments("my_group_comment")
         groups_comments = groups_comments.rename(columns={"product_id": "my_group_id"})
 
         group_products = pd.read_sql(query_group_products, self.db_conn)
@@ -63,12 +164,11 @@ class CompanionDbReader:
 
     def get_products(self):
         query_soi = "SELECT * FROM soi"
-        query_soi_comments = "SELECT * FROM soi_comment"
 
         products = pd.read_sql(query_soi, self.db_conn)
         products = products.rename(columns={"id": "product_id"})
 
-        products_comments = pd.read_sql(query_soi_comments, self.db_conn)
+        products_comments = self._read_comments("soi_comment")
         products = products.rename(columns={"id": "comment_id"})
 
         merged_data = pd.merge(
@@ -107,12 +207,11 @@ class CompanionDbReader:
 
     def get_components(self):
         query_comps = "SELECT * FROM component"
-        query_comps_comments = "SELECT * FROM component_comment"
 
         components = pd.read_sql(query_comps, self.db_conn)
         components = components.rename(columns={"id": "product_id"})
 
-        components_comments = pd.read_sql(query_comps_comments, self.db_conn)
+        components_comments = self._read_comments("component_comment")
         components_comments = components_comments.rename(columns={"id": "comment_id"})
 
         merged_data = pd.merge(
@@ -162,11 +261,17 @@ class CompanionDbReader:
 
     def __call__(self):
         if self._check_data_type():
-            self._connect_db()
-            self.get_groups()
-            self.get_components()
-            self.get_products()
-            self._clear_data()
-            self._unconnect_db()
+            if self.snapshot and run_stage(self._load_snapshot):
+                return
+            run_stage(self._connect_db)
+            if self.create_indexes:
+                run_stage(self._create_comments_indexes)
+            run_stage(self.get_groups)
+            run_stage(self.get_components)
+            run_stage(self.get_products)
+            run_stage(self._clear_data)
+            if self.snapshot:
+                run_stage(self._save_snapshot)
+            run_stage(self._unconnect_db)
         else:
-            self.get_excel_data()
+            run_stage(self.get_excel_data)
@@ -1,16 +1,49 @@
 import os, datetime
+import numpy as np
 import pandas as pd
-from datetime import timedelta
+from openpyxl import load_workbook
+from assistant_scripts.read_data.data_cache import ParsedDataCache, current_week_start
+from assistant_scripts.read_data.block_tensor import BlockTensor
+from assistant_scripts.read_data.sap_cleaning import parse_integers, parse_suffix_stock
+from assistant_scripts.read_data.snapshot_store import (
+    append_snapshot,
+    default_snapshot_dir,
+    snapshot_week,
+    weeks_to_rows,
+)
+from assistant_scripts.read_data.week_axis import WeekAxis, header_label
+from assistant_scripts.read_data.week_folding import fold_weeks
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
 
 
 class ComponentsDataReader:
+    cache_version = 3
+    cached_frames = ["components", "components_stock", "orders", "demand_plan"]
+    # position of the C711 layout in the sheet, 1-based like openpyxl
+    header_excel_row = 9
+    first_excel_column = 12
+    rows_after_header = 5
+    rows_per_comp = 24
+
     def __init__(
-        self, file_path: str, fix_weeks: bool, add_forecast: bool, to_excel: bool
+        self,
+        file_path: str,
+        fix_weeks: bool,
+        add_forecast: bool,
+        to_excel: bool,
+        use_cache: bool = True,
+        streaming: bool = False,
+        snapshot_dir: str = None,
     ):
         self.file_path = file_path
         self.fix_weeks = fix_weeks
         self.to_excel = to_excel
         self.add_forecast = add_forecast
+        self.use_cache = use_cache
+        self.streaming = streaming
+        self.snapshot_dir = snapshot_dir or default_snapshot_dir()
+        self.week_columns = None
+        self.blocks = None
         self.data = None
         self.raw_data = None
         self.components = None
@@ -40,60 +73,129 @@ class ComponentsDataReader:
         self.data = self.data.iloc[5:, :]
 
     def separate_components_row(self):
-        column_len = len(self.data["COLUMN_8"])
-        rows_per_comp = 24
-        self.data["COLUMN_8"] = [
-            "ROW_" + str(((i - 1) % rows_per_comp) + 1)
-            for i in range(1, column_len + 1)
-        ]
+        row_numbers = np.arange(len(self.data)) % self.rows_per_comp + 1
+        self.data["COLUMN_8"] = np.char.add("ROW_", row_numbers.astype(str))
 
-    def select_weeks_data_only(self):
-        all_weeks_data = [col for col in self.data.columns if "W Total" in col]
+    def _select_weeks_columns(self, columns):
+        week_axis = WeekAxis(weeks=1)
+        weeks_data = week_axis.select_headers(columns)
+        if not weeks_data:
+            raise ValueError(
+                f"No 'W Total' column of the week {week_axis.labels[0]} "
+                f"in {self.file_path}"
+            )
+        return weeks_data
 
-        today = datetime.datetime.today()
-        start_of_week = today - timedelta(days=today.weekday())
-        start_of_week_str = start_of_week.strftime("%#m/%#d")
+    def _rename_weeks_columns(self, columns):
+        return [header_label(x) or x for x in columns]
 
-        for i, x in enumerate(all_weeks_data):
-            if start_of_week_str in x:
-                weeks_data = all_weeks_data[i:]
-                break
+    def select_weeks_data_only(self):
+        weeks_data = self._select_weeks_columns(self.data.columns)
 
         non_date_columns = self.data.columns[:10].to_list()
 
         self.data = self.data[non_date_columns + weeks_data]
 
-        new_weeks_dates = [
-            x.split(" ")[2][:-1] if "/" in x else x for x in self.data.columns
-        ]
-
-        self.data.columns = new_weeks_dates
+        self.data.columns = self._rename_weeks_columns(self.data.columns)
         self.raw_data = self.data.copy()
 
-    def get_components(self):
-        self.components = pd.DataFrame(self.data[self.data["COLUMN_8"] == "ROW_12"])
-        self.components = self.components[["COLUMN_1"]]
-        self.components.rename(columns={"COLUMN_1": "COMPONENT"}, inplace=True)
+    def build_blocks(self):
+        self.blocks = BlockTensor.from_frame(
+            self.data,
+            rows_per_block=self.rows_per_comp,
+            meta_columns=["COLUMN_1", "COLUMN_2"],
+            week_columns=self.data.columns[10:].to_list(),
+            rows=[1, 2],
+        )
+        self.blocks.set_index(12, "COLUMN_1", "COMPONENT")
+        self.blocks.index = self.blocks.index.str.replace(" ", "")
+
+    def iter_component_blocks(self):
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(
+                min_row=self.header_excel_row,
+                min_col=self.first_excel_column,
+                values_only=True,
+            )
+            header_rows = zip(next(rows), next(rows))
+            new_header = [
+                " ".join(" " if x is None else str(x) for x in pair)
+                for pair in header_rows
+            ]
+            weeks_data = self._select_weeks_columns(new_header[10:])
+            weeks_positions = [new_header.index(x) for x in weeks_data]
+            self.week_columns = self._rename_weeks_columns(weeks_data)
+            # COLUMN_1 and COLUMN_2 hold the component name and the stock values
+            positions = [0, 1] + weeks_positions
+
+            for _ in range(self.rows_after_header):
+                next(rows)
+
+            block = []
+            for row in rows:
+                block.append(tuple(row[i] if i < len(row) else None for i in positions))
+                if len(block) == self.rows_per_comp:
+                    if any(x is not None for block_row in block for x in block_row):
+                        yield block
+                    block = []
+            if any(x is not None for block_row in block for x in block_row):
+                print(
+                    f"Warning: last {len(block)} rows are not a whole block "
+                    f"of {self.rows_per_comp} rows and were skipped"
+                )
+        finally:
+            workbook.close()
+
+    def read_data_streaming(self):
+        components = []
+        warehouse_stock = []
+        factory_stock = []
+        orders = []
+        demand_plan = []
+        for block in self.iter_component_blocks():
+            components.append(block[11][0])
+            warehouse_stock.append(block[5][1])
+            factory_stock.append(block[7][1])
+            orders.append(block[1][2:])
+            demand_plan.append(block[0][2:])
+
+        self.components = pd.DataFrame({"COMPONENT": components})
         self.components["COMPONENT"] = self.components["COMPONENT"].str.replace(" ", "")
-        self.components.reset_index(drop=True, inplace=True)
+        self._set_components_stock(
+            pd.DataFrame({"WAREHOUSE_STOCK": warehouse_stock}),
+            pd.DataFrame({"FACTORY_STOCK": factory_stock}),
+        )
 
-    def get_components_stock(self):
-        warehouse_stock = pd.DataFrame(self.data[self.data["COLUMN_8"] == "ROW_6"])
-        warehouse_stock = warehouse_stock[["COLUMN_2"]].rename(
-            columns={"COLUMN_2": "WAREHOUSE_STOCK"}
+        weeks = len(self.week_columns)
+        orders = np.array(orders, dtype=object).reshape(-1, weeks)
+        orders = pd.DataFrame(parse_integers(orders), columns=self.week_columns)
+        self.orders = pd.concat([self.components, orders], axis=1)
+        demand_plan = np.array(demand_plan, dtype=object).reshape(-1, weeks)
+        demand_plan = pd.DataFrame(
+            parse_integers(demand_plan), columns=self.week_columns
         )
-        warehouse_stock.reset_index(drop=True, inplace=True)
-        warehouse_stock = warehouse_stock.astype(int)
+        self.demand_plan = pd.concat([self.components, demand_plan], axis=1)
+
+    def get_components(self):
+        self.components = pd.DataFrame({"COMPONENT": self.blocks.index})
 
-        factory_stock = pd.DataFrame(self.data[self.data["COLUMN_8"] == "ROW_8"])
-        factory_stock = factory_stock[["COLUMN_2"]].rename(
-            columns={"COLUMN_2": "FACTORY_STOCK"}
+    def get_components_stock(self):
+        warehouse_stock = pd.DataFrame(
+            {"WAREHOUSE_STOCK": self.blocks.meta_row(6, "COLUMN_2")}
+        )
+        factory_stock = pd.DataFrame(
+            {"FACTORY_STOCK": self.blocks.meta_row(8, "COLUMN_2")}
         )
+        self._set_components_stock(warehouse_stock, factory_stock)
 
-        factory_stock["FACTORY_STOCK"] = factory_stock["FACTORY_STOCK"].apply(
-            lambda x: int(str(x)[str(x).find("s") + 1 :]) if "s" in str(x) else 0
+    def _set_components_stock(self, warehouse_stock, factory_stock):
+        warehouse_stock["WAREHOUSE_STOCK"] = parse_integers(
+            warehouse_stock["WAREHOUSE_STOCK"]
+        )
+        factory_stock["FACTORY_STOCK"] = parse_suffix_stock(
+            factory_stock["FACTORY_STOCK"]
         )
-        factory_stock.reset_index(drop=True, inplace=True)
 
         self.components_stock = pd.concat(
             [self.components, warehouse_stock, factory_stock], axis=1
@@ -104,18 +206,10 @@ class ComponentsDataReader:
         )
 
     def get_orders(self):
-        self.orders = pd.DataFrame(self.data[self.data["COLUMN_8"] == "ROW_2"])
-        self.orders = self.orders.iloc[:, 10:]
-        self.orders.reset_index(drop=True, inplace=True)
-        self.orders.fillna(0, inplace=True)
-        self.orders = pd.concat([self.components, self.orders], axis=1)
+        self.orders = self.blocks.row_frame(2)
 
     def get_demand_plan(self):
-        self.demand_plan = pd.DataFrame(self.data[self.data["COLUMN_8"] == "ROW_1"])
-        self.demand_plan = self.demand_plan.iloc[:, 10:]
-        self.demand_plan.reset_index(drop=True, inplace=True)
-        self.demand_plan.fillna(0, inplace=True)
-        self.demand_plan = pd.concat([self.components, self.demand_plan], axis=1)
+        self.demand_plan = self.blocks.row_frame(1)
 
     def join_orders_demand_plan(self):
         self.orders["DATA"] = "ORDERS"
@@ -138,11 +232,7 @@ class ComponentsDataReader:
 
     def fix_no_valid_weeks(self):
         # get first days of next X weeks
-        current_date = datetime.datetime.now()
-        cw_first_day = current_date - timedelta(days=current_date.weekday())
-        weeks = 20
-        next_weeks_dates = [cw_first_day + timedelta(weeks=i) for i in range(weeks)]
-        next_weeks = [date.strftime("%#m/%#d") for date in next_weeks_dates]
+        next_weeks = WeekAxis(weeks=20).labels
         # get only weeks from given data
         weeks_data = self.orders_demand_plan.iloc[:, 2:]
         weeks_data_columns = weeks_data.columns.to_list()
@@ -152,19 +242,46 @@ class ComponentsDataReader:
         # select only choosen weeks
         weeks_data = weeks_data[new_weeks_data_columns]
         # add no valid week to previoous week and then remove them
-        columns_to_drop = []
-        for i, column_name in enumerate(weeks_data.columns):
-            if column_name not in next_weeks:
-                previous_column = weeks_data.columns[i - 1]
-                weeks_data[previous_column] = (
-                    weeks_data[previous_column] + weeks_data[column_name]
-                )
-                columns_to_drop.append(column_name)
-        weeks_data.drop(columns=columns_to_drop, inplace=True)
+        weeks_data = fold_weeks(weeks_data, valid_weeks=next_weeks)
         self.orders_demand_plan = pd.concat(
             [self.orders_demand_plan.iloc[:, :2], weeks_data], axis=1, join="inner"
         )
 
+    def _get_cache(self):
+        return ParsedDataCache(
+            source_path=self.file_path,
+            reader="components_data",
+            version=self.cache_version,
+            params={"fix_weeks": self.fix_weeks, "week": current_week_start()},
+        )
+
+    def load_from_cache(self):
+        if not self.use_cache:
+            return False
+        cached = self._get_cache().load(self.cached_frames)
+        if cached is None:
+            return False
+        for name, frame in cached.items():
+            setattr(self, name, frame)
+        return True
+
+    def save_to_cache(self):
+        if self.use_cache:
+            self._get_cache().save(
+                {name: getattr(self, name) for name in self.cached_frames}
+            )
+
+    def save_snapshot(self):
+        snapshot = snapshot_week()
+        frames = {
+            "orders": weeks_to_rows(self.orders, "COMPONENT", snapshot),
+            "demand_plan": weeks_to_rows(self.demand_plan, "COMPONENT", snapshot),
+            "components_stock": self.components_stock,
+        }
+        append_snapshot(
+            self.snapshot_dir, "components", frames, self.file_path, snapshot=snapshot
+        )
+
     def prepare_forecast(self):
         self.final_demand = self.demand_plan.copy()
         self.final_demand.iloc[:, 1] = self.orders.iloc[:, 1].values
@@ -192,22 +309,32 @@ class ComponentsDataReader:
         info_df.to_excel(writer, sheet_name="INFO", index=False)
 
         writer._save()
+        report_saved(report_file_path)
 
     def __call__(self):
-        self.read_data()
-        self.apply_new_headers()
-        self.separate_components_row()
-        self.select_weeks_data_only()
-        self.get_components()
-        self.get_components_stock()
-        self.get_orders()
-        self.get_demand_plan()
-        self.join_orders_demand_plan()
-        if self.fix_weeks:
-            self.fix_no_valid_weeks()
-        self.split_orders_demand_plan()
+        if not run_stage(self.load_from_cache):
+            if self.streaming:
+                run_stage(self.read_data_streaming)
+            else:
+                run_stage(self.read_data)
+                run_stage(self.apply_new_headers)
+                run_stage(self.separate_components_row)
+                run_stage(self.select_weeks_data_only)
+                run_stage(self.build_blocks)
+                run_stage(self.get_components)
+                run_stage(self.get_components_stock)
+                run_stage(self.get_orders)
+                run_stage(self.get_demand_plan)
+            run_stage(self.join_orders_demand_plan)
+            if self.fix_weeks:
+                run_stage(self.fix_no_valid_weeks)
+            run_stage(self.split_orders_demand_plan)
+            run_stage(self.save_to_cache)
+            # a file found in the cache was already stored this week
+            if self.snapshot_dir:
+                run_stage(self.save_snapshot)
         if self.add_forecast:
-            self.prepare_forecast()
+            run_stage(self.prepare_forecast)
         if self.to_excel:
-            self.save_to_excel()
+            run_stage(self.save_to_excel)
         return self
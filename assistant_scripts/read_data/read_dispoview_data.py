@@ -1,4 +1,6 @@
 import pandas as pd
+from assistant_scripts.read_data.sap_cleaning import parse_integers, strip_apostrophes
+from assistant_scripts.other_functions.pipeline_stages import run_stage
 
 
 class DispoviewDataReader:
@@ -34,9 +36,16 @@ class DispoviewDataReader:
         )
         self.ready_dispoview.dropna(how="all", inplace=True)
         self.ready_dispoview.fillna(0, inplace=True)
-        self.ready_dispoview = self.ready_dispoview.replace("'", "", regex=True)
-        self.ready_dispoview.iloc[:, 2:] = self.ready_dispoview.iloc[:, 2:].astype(int)
+        for column in self.ready_dispoview.columns[:2]:
+            self.ready_dispoview[column] = strip_apostrophes(
+                self.ready_dispoview[column]
+            )
+        # all week cells in one pass, "'68" to 68
+        weeks = self.ready_dispoview.columns[2:]
+        self.ready_dispoview[weeks] = parse_integers(
+            self.ready_dispoview[weeks], compact=True
+        )
 
     def __call__(self):
-        self._read_dispoview()
-        self._select_dispoview()
+        run_stage(self._read_dispoview)
+        run_stage(self._select_dispoview)
@@ -1,19 +1,52 @@
 import os, datetime
 import pandas as pd
 from assistant_scripts.read_data.read_companion_data import CompanionDbReader
+from assistant_scripts.read_data.data_cache import ParsedDataCache
+from assistant_scripts.read_data.sap_cleaning import parse_integers
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
 
 
 class FactoryDataReader:
-    def __init__(self, factory_data_path, db_path):
+    cache_version = 2
+    default_chunksize = 200000
+    factory_columns = ["FJJ P/N", "SLoc", "Available Qty"]
+    # what are desired good parts sloc
+    list_good_codes = [
+        "W101",
+        "W10A",
+        "W191",
+        "W1LA",
+        "W1PA",
+        "W104",
+        "W2Y3",
+        "WIP",
+        "W1L0",
+    ]
+
+    def __init__(
+        self,
+        factory_data_path,
+        db_path,
+        chunksize: int = None,
+        use_cache: bool = True,
+    ):
         self.factory_data_path = factory_data_path
         self.db_path = db_path
+        self.chunksize = chunksize
+        self.use_cache = use_cache
         self.active_components = None
         self.factory_data = None
         self.active_components_data = None
+        self.grouped_components = None
         self.final_data = None
 
+    def _is_text_file(self):
+        return self.factory_data_path.split(".")[-1].lower() == "txt"
+
     def get_companion_info(self):
-        companion_info = CompanionDbReader(path_db=self.db_path)
+        companion_info = CompanionDbReader(
+            path_db=self.db_path, sql_pushdown=True, snapshot=True
+        )
         companion_info()
         self.active_components = pd.DataFrame(
             companion_info.components[companion_info.components["STATUS"] == "Active"]
@@ -21,20 +54,79 @@ class FactoryDataReader:
         self.active_components = self.active_components[["COMPONENT"]]
 
     def get_factroy_data(self):
-        extension = self.factory_data_path.split(".")[-1].lower()
         # check what extension file have
-        if extension == "txt":
+        if self._is_text_file():
             self.factory_data = pd.read_csv(self.factory_data_path, delimiter="\t")
-            self.factory_data["Available Qty"] = self.factory_data[
-                "Available Qty"
-            ].str.replace(",", "")
         else:
             self.factory_data = pd.read_excel(self.factory_data_path)
-        # qty to int type
-        self.factory_data["Available Qty"] = self.factory_data["Available Qty"].astype(
-            int
+        # qty to int type, "2,067" in the text export
+        self.factory_data["Available Qty"] = parse_integers(
+            self.factory_data["Available Qty"]
+        )
+
+    def _read_csv_chunks(self):
+        return pd.read_csv(
+            self.factory_data_path,
+            delimiter="\t",
+            usecols=self.factory_columns,
+            thousands=",",
+            dtype={"FJJ P/N": str, "SLoc": str, "Available Qty": "int64"},
+            chunksize=self.chunksize or self.default_chunksize,
+        )
+
+    def _compact_chunk(self, chunk):
+        # part numbers and slocs repeat a lot, as categories the parsed dump is
+        # small enough to cache
+        return chunk[self.factory_columns].astype(
+            {"FJJ P/N": "category", "SLoc": "category"}
+        )
+
+    def _get_cache(self):
+        return ParsedDataCache(
+            source_path=self.factory_data_path,
+            reader="factory_data",
+            version=self.cache_version,
+            params={"columns": self.factory_columns},
         )
 
+    def _cached_chunks(self):
+        # the parsed chunks are written to and read from the cache one at a
+        # time, like the dump itself
+        cache = self._get_cache()
+        chunks = cache.load_chunks("parsed_factory_data")
+        if chunks is None:
+            parsed = (self._compact_chunk(x) for x in self._read_csv_chunks())
+            chunks = cache.save_chunks("parsed_factory_data", parsed)
+        return chunks
+
+    def read_factory_chunks(self):
+        # the full dump never sits in memory, every chunk is filtered to active
+        # components and only their rows are kept, the good / not good sums are
+        # made from them as in the whole-file read
+        active_set = set(self.active_components["COMPONENT"])
+        active_chunks = []
+        if self.use_cache:
+            chunks = self._cached_chunks()
+        else:
+            chunks = self._read_csv_chunks()
+        for chunk in chunks:
+            chunk = chunk[chunk["FJJ P/N"].isin(active_set)]
+            chunk = chunk[self.factory_columns].astype({"FJJ P/N": str, "SLoc": str})
+            chunk = chunk.rename(columns={"FJJ P/N": "COMPONENT"})
+            chunk["SLoc"] = chunk["SLoc"].isin(self.list_good_codes)
+            active_chunks.append(chunk)
+
+        self.active_components_data = pd.concat(active_chunks, ignore_index=True)
+
+    def preparse(self):
+        # fills the parsed-data cache ahead of the report, without the
+        # companion DB, the report filters the active components later
+        if not self._is_text_file() or not self.use_cache:
+            return
+        if self._get_cache().load_chunks("parsed_factory_data") is None:
+            for _ in self._cached_chunks():
+                pass
+
     def get_active_components_data(self):
         # get active components
         self.active_components_data = self.factory_data[
@@ -48,30 +140,17 @@ class FactoryDataReader:
         self.active_components_data = self.active_components_data.rename(
             columns={"FJJ P/N": "COMPONENT"}
         )
-        # what are desired good parts sloc
-        list_good_codes = [
-            "W101",
-            "W10A",
-            "W191",
-            "W1LA",
-            "W1PA",
-            "W104",
-            "W2Y3",
-            "WIP",
-            "W1L0",
-        ]
         # get bool from sloc codes
         self.active_components_data["SLoc"] = (
-            self.active_components_data["SLoc"].isin(list_good_codes).astype(bool)
+            self.active_components_data["SLoc"].isin(self.list_good_codes).astype(bool)
         )
 
     def group_active_components(self):
         # group components on false and true
-        grouped_mem = (
-            self.active_components_data.groupby(["COMPONENT", "SLoc"])["Available Qty"]
-            .sum()
-            .reset_index()
-        )
+        self.grouped_components = self.active_components_data.groupby(
+            ["COMPONENT", "SLoc"]
+        )["Available Qty"].sum()
+        grouped_mem = self.grouped_components.reset_index()
         # make pivot
         pivot_mem = grouped_mem.pivot_table(
             index="COMPONENT", columns="SLoc", values="Available Qty", fill_value=0
@@ -97,13 +176,18 @@ class FactoryDataReader:
         self.active_components_data.to_excel(
             writer, sheet_name=f"Active_components_data", index=False
         )
-        self.factory_data.to_excel(writer, sheet_name=f"Factory_data", index=False)
+        if self.factory_data is not None:
+            self.factory_data.to_excel(writer, sheet_name=f"Factory_data", index=False)
 
         writer._save()
+        report_saved(report_file_path)
 
     def __call__(self):
-        self.get_companion_info()
-        self.get_factroy_data()
-        self.get_active_components_data()
-        self.group_active_components()
-        self.save_to_excel()
+        run_stage(self.get_companion_info)
+        if self.chunksize and self._is_text_file():
+            run_stage(self.read_factory_chunks)
+        else:
+            run_stage(self.get_factroy_data)
+            run_stage(self.get_active_components_data)
+        run_stage(self.group_active_components)
+        run_stage(self.save_to_excel)
@@ -1,20 +1,45 @@
-from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
 import os, datetime
+import numpy as np
 import pandas as pd
+from assistant_scripts.read_data.data_cache import ParsedDataCache, current_week_start
+from assistant_scripts.read_data.block_tensor import BlockTensor
+from assistant_scripts.read_data.snapshot_store import (
+    append_snapshot,
+    default_snapshot_dir,
+    snapshot_week,
+    weeks_to_rows,
+)
+from assistant_scripts.read_data.week_axis import WeekAxis, header_label
+from assistant_scripts.read_data.week_folding import fold_weeks
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
 
 
 class ProductsDataReader:
+    cache_version = 2
+    cached_frames = ["products", "supply", "orders", "balances"]
+    rows_per_product = 26
+
     def __init__(
         self,
         file_path: str = None,
         folder_path: str = None,
         to_excel: bool = False,
+        use_cache: bool = True,
+        workers: int = None,
+        fix_weeks: bool = False,
+        snapshot_dir: str = None,
     ):
         self.file_path = file_path
         self.folder_path = folder_path
         self.to_excel = to_excel
+        self.use_cache = use_cache
+        self.workers = workers
+        self.fix_weeks = fix_weeks
+        self.snapshot_dir = snapshot_dir or default_snapshot_dir()
         self.data = None
         self.raw_data = None
+        self.blocks = None
         self.products = None
         self.orders = None
         self.supply = None
@@ -41,84 +66,156 @@ class ProductsDataReader:
         self.raw_data = self.data.copy()
 
     def separate_components_row(self):
-        column_len = len(self.data["COLUMN_5"])
-        rows_per_comp = 26
-        self.data["COLUMN_5"] = [
-            "ROW_" + str(((i - 1) % rows_per_comp) + 1)
-            for i in range(1, column_len + 1)
-        ]
+        row_numbers = np.arange(len(self.data)) % self.rows_per_product + 1
+        self.data["COLUMN_5"] = np.char.add("ROW_", row_numbers.astype(str))
 
     def select_weeks_data_only(self):
         penultimate_column = self.data.columns[-2]
         non_date_columns = self.data.columns[:5].to_list()
 
-        all_weeks_data = [col for col in self.data.columns if "W Total" in col]
-        today = datetime.datetime.today()
-        start_of_week = (today - timedelta(days=today.weekday())).strftime("%#m/%#d")
-        weeks_data = []
-        for i, x in enumerate(all_weeks_data):
-            if start_of_week in x:
-                weeks_data = weeks_data + all_weeks_data[i:]
-                break
+        weeks_data = WeekAxis(weeks=1).select_headers(self.data.columns)
         self.data = self.data[non_date_columns + weeks_data + [penultimate_column]]
 
-        new_weeks_dates = [
-            x.split(" ")[2][:-1] if "/" in x else x for x in self.data.columns
-        ]
-        self.data.columns = new_weeks_dates
+        self.data.columns = [header_label(x) or x for x in self.data.columns]
         self.data = self.data.rename(
             columns={self.data.columns[-1]: f"After {self.data.columns[-2]}"}
         )
 
+    def build_blocks(self):
+        self.blocks = BlockTensor.from_frame(
+            self.data,
+            rows_per_block=self.rows_per_product,
+            meta_columns=["COLUMN_1"],
+            week_columns=self.data.columns[5:].to_list(),
+            rows=[5, 13, 24],
+        )
+        self.blocks.set_index(3, "COLUMN_1", "SOI")
+
     def get_products(self):
-        self.products = pd.DataFrame(self.data[self.data["COLUMN_5"] == "ROW_3"])
-        self.products = self.products[["COLUMN_1"]]
-        self.products.rename(columns={"COLUMN_1": "SOI"}, inplace=True)
-        self.products.reset_index(drop=True, inplace=True)
-
-    def _get_data(self, row_value):
-        result = pd.DataFrame(self.data[self.data["COLUMN_5"] == row_value])
-        result = result.drop(columns=self.non_date_columns)
-        result = result.reset_index(drop=True)
-        result = result.fillna(0)
-        result = pd.concat([self.products, result], axis=1)
-        return result
+        self.products = pd.DataFrame({"SOI": self.blocks.index})
 
     def get_supply(self):
-        self.supply = self._get_data("ROW_5")
+        self.supply = self.blocks.row_frame(5)
 
     def get_orders(self):
-        self.orders = self._get_data("ROW_13")
+        self.orders = self.blocks.row_frame(13)
 
     def get_balances(self):
-        self.balances = self._get_data("ROW_24")
+        self.balances = self.blocks.row_frame(24)
+
+    def fix_no_valid_weeks(self):
+        # weeks split by the end of a month are added back to their week
+        next_weeks = WeekAxis(weeks=len(self.blocks.weeks)).labels
+        after_column = self.blocks.weeks[-1]
+
+        def fold(data, how):
+            weeks_data = fold_weeks(
+                data.iloc[:, 1:],
+                valid_weeks=next_weeks,
+                how=how,
+                keep_columns=[after_column],
+            )
+            return pd.concat([data.iloc[:, :1], weeks_data], axis=1)
+
+        self.supply = fold(self.supply, "sum")
+        self.orders = fold(self.orders, "sum")
+        self.balances = fold(self.balances, "last")
+
+    def get_workbook_paths(self):
+        workbook_extensions = (".xlsx", ".xlsm", ".xls")
+        return [
+            os.path.join(self.folder_path, file_name)
+            for file_name in os.listdir(self.folder_path)
+            if not file_name.startswith("~$")
+            and file_name.lower().endswith(workbook_extensions)
+        ]
 
     def read_multiple_files(self):
-        supply_to_concat = []
-        balance_to_concat = []
-        orders_to_concat = []
-        for file_path in os.listdir(self.folder_path):
-            full_file_path = os.path.join(self.folder_path, file_path)
-            self.file_path = full_file_path
-            self.read_one_file()
-
-            supply_to_concat.append(self.supply)
-            balance_to_concat.append(self.balances)
-            orders_to_concat.append(self.orders)
-
-            self.supply = pd.concat(supply_to_concat, ignore_index=True)
-            self.balances = pd.concat(balance_to_concat, ignore_index=True)
-            self.orders = pd.concat(orders_to_concat, ignore_index=True)
+        file_paths = self.get_workbook_paths()
+        if not file_paths:
+            print(f"No products files found in: {self.folder_path}")
+            return
+        if self.workers and self.workers > 1 and len(file_paths) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(
+                    executor.map(
+                        read_products_file,
+                        file_paths,
+                        [self.use_cache] * len(file_paths),
+                        [self.fix_weeks] * len(file_paths),
+                        [self.snapshot_dir] * len(file_paths),
+                    )
+                )
+        else:
+            results = [
+                read_products_file(
+                    file_path, self.use_cache, self.fix_weeks, self.snapshot_dir
+                )
+                for file_path in file_paths
+            ]
+
+        self.file_path = file_paths[-1]
+        self.supply = pd.concat([x[0] for x in results], ignore_index=True)
+        self.orders = pd.concat([x[1] for x in results], ignore_index=True)
+        self.balances = pd.concat([x[2] for x in results], ignore_index=True)
+
+    def _get_cache(self):
+        return ParsedDataCache(
+            source_path=self.file_path,
+            reader="products_data",
+            version=self.cache_version,
+            params={"fix_weeks": self.fix_weeks, "week": current_week_start()},
+        )
+
+    def load_from_cache(self):
+        if not self.use_cache:
+            return False
+        cached = self._get_cache().load(self.cached_frames)
+        if cached is None:
+            return False
+        for name, frame in cached.items():
+            setattr(self, name, frame)
+        return True
+
+    def save_to_cache(self):
+        if self.use_cache:
+            self._get_cache().save(
+                {name: getattr(self, name) for name in self.cached_frames}
+            )
+
+    def save_snapshot(self):
+        # every C502 file is a part of the week, only its own rows are replaced
+        snapshot = snapshot_week()
+        frames = {
+            f"products_{name}": weeks_to_rows(getattr(self, name), "SOI", snapshot)
+            for name in ["supply", "orders", "balances"]
+        }
+        append_snapshot(
+            self.snapshot_dir,
+            "products",
+            frames,
+            self.file_path,
+            snapshot=snapshot,
+            replace_partition=False,
+        )
 
     def read_one_file(self):
-        self.read_data()
-        self.apply_new_headers()
-        self.separate_components_row()
-        self.select_weeks_data_only()
-        self.get_products()
-        self.get_supply()
-        self.get_orders()
-        self.get_balances()
+        if run_stage(self.load_from_cache):
+            return
+        run_stage(self.read_data)
+        run_stage(self.apply_new_headers)
+        run_stage(self.separate_components_row)
+        run_stage(self.select_weeks_data_only)
+        run_stage(self.build_blocks)
+        run_stage(self.get_products)
+        run_stage(self.get_supply)
+        run_stage(self.get_orders)
+        run_stage(self.get_balances)
+        if self.fix_weeks:
+            run_stage(self.fix_no_valid_weeks)
+        run_stage(self.save_to_cache)
+        if self.snapshot_dir:
+            run_stage(self.save_snapshot)
 
     def save_to_excel(self):
         now = datetime.datetime.now()
@@ -142,12 +239,29 @@ class ProductsDataReader:
         info_df.to_excel(writer, sheet_name="INFO", index=False)
 
         writer._save()
+        report_saved(report_file_path)
 
     def __call__(self):
         # if os.path.isdir(self.file_path):
         if self.folder_path:
-            self.read_multiple_files()
+            run_stage(self.read_multiple_files)
         else:
-            self.read_one_file()
+            run_stage(self.read_one_file)
         if self.to_excel:
-            self.save_to_excel()
+            run_stage(self.save_to_excel)
+
+
+def read_products_file(
+    file_path: str,
+    use_cache: bool = True,
+    fix_weeks: bool = False,
+    snapshot_dir: str = None,
+):
+    products = ProductsDataReader(
+        file_path=file_path,
+        use_cache=use_cache,
+        fix_weeks=fix_weeks,
+        snapshot_dir=snapshot_dir,
+    )
+    products.read_one_file()
+    return products.supply, products.orders, products.balances
@@ -1,27 +1,40 @@
 import pandas as pd
-import datetime, os, openpyxl
+import datetime, os
 
-from datetime import timedelta
-from openpyxl.worksheet.datavalidation import DataValidation
+from assistant_scripts.read_data.data_cache import read_excel_cached
+from assistant_scripts.read_data.snapshot_store import (
+    append_snapshot,
+    default_snapshot_dir,
+)
+from assistant_scripts.read_data.key_registry import merge_on_key
+from assistant_scripts.read_data.week_axis import WeekAxis
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
+from assistant_scripts.other_functions.excel_writer import StreamingExcelWriter
 
 
 class SupplyDataReader:
-    def __init__(self, path_supply: str = None, path_groups: str = None):
+    def __init__(
+        self,
+        path_supply: str = None,
+        path_groups: str = None,
+        snapshot_dir: str = None,
+    ):
         self.path_supply = path_supply
         self.path_groups = path_groups
+        self.snapshot_dir = snapshot_dir or default_snapshot_dir()
         self.data = None
         self.groups = None
         self.supply_info = None
 
     def read_data(self):
         try:
-            self.data = pd.read_excel(self.path_supply, sheet_name="SUPPLY")
+            self.data = read_excel_cached(self.path_supply, sheet_name="SUPPLY")
         except Exception as e:
             print(f"Error loading data: {e}")
 
     def read_groups(self):
         try:
-            self.groups = pd.read_excel(self.path_groups, sheet_name="groups")
+            self.groups = read_excel_cached(self.path_groups, sheet_name="groups")
         except Exception as e:
             print(f"Error loading data: {e}")
 
@@ -39,11 +52,12 @@ class SupplyDataReader:
         date_columns = [
             x for x in self.data.columns if isinstance(x, datetime.datetime)
         ]
-        today = datetime.datetime.today()
-        today = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        start_of_week = today - timedelta(days=today.weekday())
-
-        date_columns = date_columns[date_columns.index(start_of_week) :]
+        week_axis = WeekAxis(weeks=1)
+        date_columns = week_axis.select_dates(date_columns)
+        if not date_columns:
+            raise ValueError(
+                f"No column of the week {week_axis.mondays[0]} in {self.path_supply}"
+            )
         self.data = self.data[ready_columns + date_columns]
 
     def filter_data(self):
@@ -60,7 +74,9 @@ class SupplyDataReader:
     def add_groups(self):
         self.groups = self.groups[["COMPONENT", "GROUP"]].drop_duplicates()
         self.groups.reset_index(inplace=True, drop=True)
-        self.supply_info = pd.merge(self.data, self.groups, on="COMPONENT", how="inner")
+        self.supply_info = merge_on_key(
+            self.data, self.groups, on="COMPONENT", how="inner"
+        )
         self.supply_info.insert(1, "GROUP", self.supply_info.pop("GROUP"))
 
     def melt_supply_data(self):
@@ -73,6 +89,15 @@ class SupplyDataReader:
         self.supply_info.reset_index(inplace=True, drop=True)
         self.supply_info[["STATUS", "SHIPMENT_ID", "COMMENT"]] = None
 
+    def save_snapshot(self):
+        supply = self.supply_info.copy()
+        supply["ETD_DATE_WEEK"] = pd.to_datetime(supply["ETD_DATE_WEEK"]).dt.strftime(
+            "%Y-%m-%d"
+        )
+        append_snapshot(
+            self.snapshot_dir, "supply", {"supply": supply}, self.path_supply
+        )
+
     def save_to_excel(self):
         current_datetime = datetime.datetime.now()
 
@@ -83,40 +108,35 @@ class SupplyDataReader:
         report_file_path = os.path.join(directory_path, filename)
         source_file = os.path.basename(self.path_supply)
 
-        writer = pd.ExcelWriter(report_file_path)
-
-        self.supply_info.to_excel(writer, sheet_name=f"supply_confirmed", index=False)
-
-        info_df = pd.DataFrame({"Source_file": [source_file]})
-        info_df.to_excel(writer, sheet_name="INFO", index=False)
+        writer = StreamingExcelWriter(report_file_path)
 
-        writer._save()
+        writer.write_frame("supply_confirmed", self.supply_info)
         add_dropdown_statuses(
-            excel_filename=report_file_path, sheet_name="supply_confirmed"
+            writer=writer,
+            sheet_name="supply_confirmed",
+            last_row=len(self.supply_info) + 1,
         )
 
-    def __call__(self):
-        self.read_data()
-        self.read_groups()
-        self.prepare_data()
-        self.select_data()
-        self.filter_data()
-        self.add_groups()
-        self.melt_supply_data()
-        self.save_to_excel()
-
+        info_df = pd.DataFrame({"Source_file": [source_file]})
+        writer.write_frame("INFO", info_df)
 
-def add_dropdown_statuses(excel_filename: str, sheet_name: str):
-    workbook = openpyxl.load_workbook(excel_filename)
-    sheet = workbook[sheet_name]
+        writer.close()
+        report_saved(report_file_path)
 
+    def __call__(self):
+        run_stage(self.read_data)
+        run_stage(self.read_groups)
+        run_stage(self.prepare_data)
+        run_stage(self.select_data)
+        run_stage(self.filter_data)
+        run_stage(self.add_groups)
+        run_stage(self.melt_supply_data)
+        if self.snapshot_dir:
+            run_stage(self.save_snapshot)
+        run_stage(self.save_to_excel)
+
+
+def add_dropdown_statuses(writer: StreamingExcelWriter, sheet_name: str, last_row: int):
     choices = ["Shipped", "Open_WH", "Delivered", "Other"]
-    choices_ready = '"' + ",".join(choices) + '"'
-
-    data_val = DataValidation(type="list", formula1=choices_ready, allow_blank=True)
-
-    sheet.add_data_validation(data_val)
-    data_val_range = "F2:F" + str(sheet.max_row)
-    data_val.add(data_val_range)
-
-    workbook.save(excel_filename)
+    data_val_range = "F2:F" + str(last_row)
+    writer.add_list_validation(sheet_name, data_val_range, choices)
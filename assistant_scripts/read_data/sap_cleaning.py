@@ -0,0 +1,160 @@
+import numbers
+import numpy as np
+import pandas as pd
+
+# SAP exports keep numbers as text: "'1234" with the apostrophe of Excel,
+# "1,234" with thousands separators, factory stock as "<plant>s1234"
+# a cell is read when it matches ^'?-?[\d, ]+(\.\d*)?$ with spaces only around
+# the number, anything else that is not empty raises as astype(int) did
+int32_limits = np.iinfo(np.int32)
+int64_limits = np.iinfo(np.int64)
+# more integer digits could overflow int64
+max_digits = 18
+apostrophe_code, minus_code, point_code = ord("'"), ord("-"), ord(".")
+comma_code, space_code = ord(","), ord(" ")
+
+
+def _cells(values):
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        values = values.to_numpy()
+    return np.asarray(values)
+
+
+def _parse_text(cells: np.ndarray):
+    # the cells as one fixed width unicode array, read character by character
+    # for all cells at once, decimals are cut off as astype(int) did
+    text = cells.astype(str)
+    width = text.dtype.itemsize // 4
+    codes = text.view(np.uint32).reshape(len(text), width)
+    size = len(text)
+    integers = np.zeros(size, dtype=np.int64)
+    # integer digits from the first non zero one, "007" has one
+    digits = np.zeros(size, dtype=np.int64)
+    has_digits = np.zeros(size, dtype=bool)
+    negative = np.zeros(size, dtype=bool)
+    started = np.zeros(size, dtype=bool)
+    decimals = np.zeros(size, dtype=bool)
+    trailing = np.zeros(size, dtype=bool)
+    parsed = np.ones(size, dtype=bool)
+    for position in range(width):
+        code = codes[:, position]
+        digit = code - 48
+        is_digit = digit <= 9
+        is_space = code == space_code
+        is_comma = code == comma_code
+        is_minus = code == minus_code
+        is_point = code == point_code
+        # "'" only first, "-" only before the number, spaces only around it,
+        # one "." and only digits after it, the padding of shorter cells last
+        valid = (
+            (code == 0)
+            | is_space
+            | ((code == apostrophe_code) & (position == 0))
+            | (is_minus & ~started & ~negative)
+            | ((is_digit | is_point) & ~trailing)
+            | (is_comma & ~decimals & ~trailing)
+        )
+        parsed &= valid & ~(is_point & decimals)
+        used = is_digit & ~decimals
+        integers = np.where(
+            used & (digits < max_digits), integers * 10 + digit, integers
+        )
+        digits += used & ((digits > 0) | (digit > 0))
+        has_digits |= used
+        negative |= is_minus
+        trailing |= is_space & started
+        started |= is_digit | is_comma | is_point
+        decimals |= is_point
+    parsed &= has_digits & (digits <= max_digits)
+    return np.where(negative, -integers, integers), parsed
+
+
+def _is_empty(cell):
+    if isinstance(cell, str):
+        return not cell.strip()
+    if cell is None or cell is pd.NA or cell is pd.NaT:
+        return True
+    return isinstance(cell, numbers.Real) and np.isnan(cell)
+
+
+def _parse_others(cells: np.ndarray):
+    # cells the text pass did not read: empty cells are 0, numbers not written
+    # as plain digits (1e+20) are taken as they are, the rest raises
+    integers = np.zeros(len(cells), dtype=np.int64)
+    failed = []
+    for i, cell in enumerate(cells):
+        if _is_empty(cell):
+            continue
+        if (
+            isinstance(cell, numbers.Real)
+            and not isinstance(cell, (bool, np.bool_))
+            and np.isfinite(cell)
+            and int64_limits.min <= cell <= int64_limits.max
+        ):
+            integers[i] = int(cell)
+        else:
+            failed.append(cell)
+    if failed:
+        raise ValueError(
+            f"Can't read {len(failed)} cells as integers, for example {failed[:5]}"
+        )
+    return integers
+
+
+def _parse_numbers(cells: np.ndarray):
+    # empty float cells are 0, values out of the int64 range raise
+    values = np.nan_to_num(cells.astype(np.float64), nan=0.0)
+    if np.issubdtype(cells.dtype, np.floating) and not (
+        np.isfinite(values).all()
+        and (values >= int64_limits.min).all()
+        and (values <= int64_limits.max).all()
+    ):
+        raise ValueError("Can't read numbers out of the int64 range as integers")
+    if np.issubdtype(cells.dtype, np.integer):
+        return cells.astype(np.int64)
+    return values.astype(np.int64)
+
+
+def compact_integers(integers: np.ndarray):
+    # int32 when every value fits, pandas and numpy sums still go to int64
+    if integers.size and (
+        integers.min() < int32_limits.min or integers.max() > int32_limits.max
+    ):
+        return integers
+    return integers.astype(np.int32)
+
+
+def parse_integers(values, compact: bool = False):
+    # a column or a whole block of cells in one pass, empty cells are 0
+    cells = _cells(values)
+    shape = cells.shape
+    cells = cells.ravel()
+    if np.issubdtype(cells.dtype, np.number):
+        integers = _parse_numbers(cells)
+    else:
+        integers, parsed = _parse_text(cells)
+        if not parsed.all():
+            integers[~parsed] = _parse_others(cells[~parsed])
+    if compact:
+        integers = compact_integers(integers)
+    return integers.reshape(shape)
+
+
+def parse_suffix_stock(values, compact: bool = False):
+    # the quantity follows the first "s", cells without it hold no stock
+    text = pd.Series(_cells(values).ravel(), dtype=object).astype(str)
+    parts = text.str.partition("s")
+    has_stock = parts[1] == "s"
+    missing = has_stock & (parts[2].str.strip() == "")
+    if missing.any():
+        raise ValueError(
+            f"Can't read the stock of {missing.sum()} cells, for example "
+            f"{text[missing].head().tolist()}"
+        )
+    quantity = parts[2].where(has_stock, "0")
+    return parse_integers(quantity, compact=compact).reshape(np.shape(values))
+
+
+def strip_apostrophes(values: pd.Series):
+    # text cells only, numbers are left as they are
+    return values.replace("'", "", regex=True)
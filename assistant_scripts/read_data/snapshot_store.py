@@ -0,0 +1,165 @@
+import os, glob, sqlite3, datetime
+import pandas as pd
+
+from contextlib import closing
+from assistant_scripts.read_data.week_axis import key_monday, label_date, week_key
+
+# one SQLite file per source and ISO week of the run:
+# <snapshot_dir>/<source>/<year>-W<week>.sqlite
+
+
+def default_snapshot_dir():
+    # snapshots are kept only when a folder is set
+    return os.getenv("PATH_SNAPSHOTS") or None
+
+
+def snapshot_week(date: datetime.date = None):
+    key = week_key(date or datetime.date.today())
+    return f"{key // 100}-W{key % 100:02d}"
+
+
+def week_start(snapshot: str):
+    return key_monday(int(snapshot[:4]) * 100 + int(snapshot[6:]))
+
+
+def weeks_to_rows(data: pd.DataFrame, key: str, snapshot: str):
+    # wide week columns to one row per key and week
+    start = week_start(snapshot)
+    rows = data.melt(id_vars=[key], var_name="WEEK", value_name="QTY")
+    labels = pd.Series(rows["WEEK"].unique())
+    dates = {label: label_date(label, start) for label in labels}
+    dates = {label: date and date.isoformat() for label, date in dates.items()}
+    rows["WEEK"] = rows["WEEK"].astype(str)
+    rows.insert(2, "WEEK_DATE", rows["WEEK"].map(lambda x: dates.get(x)))
+    return rows
+
+
+class SnapshotStore:
+    key_columns = {
+        "orders": "COMPONENT",
+        "demand_plan": "COMPONENT",
+        "components_stock": "COMPONENT",
+        "supply": "COMPONENT",
+        "products_supply": "SOI",
+        "products_orders": "SOI",
+        "products_balances": "SOI",
+    }
+
+    def __init__(self, snapshot_dir: str = None):
+        self.snapshot_dir = snapshot_dir or default_snapshot_dir()
+
+    def partition_path(self, source: str, snapshot: str):
+        return os.path.join(self.snapshot_dir, source, f"{snapshot}.sqlite")
+
+    def partitions(self, source: str):
+        paths = glob.glob(os.path.join(self.snapshot_dir, source, "*-W*.sqlite"))
+        return sorted(os.path.basename(path)[: -len(".sqlite")] for path in paths)
+
+    def append(
+        self,
+        source: str,
+        frames: dict,
+        source_file: str,
+        snapshot: str = None,
+        replace_partition: bool = True,
+    ):
+        # a source read again in the same week replaces its snapshot, sources
+        # read from many files (C502) replace only the rows of the same file
+        snapshot = snapshot or snapshot_week()
+        path = self.partition_path(source, snapshot)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        source_file = os.path.basename(source_file)
+        saved = datetime.datetime.now().isoformat(timespec="seconds")
+        with closing(sqlite3.connect(path, timeout=60)) as connection, connection:
+            tables = {
+                row[0]
+                for row in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+            for table in frames:
+                if table not in tables:
+                    continue
+                if replace_partition:
+                    connection.execute(f'DELETE FROM "{table}"')
+                else:
+                    connection.execute(
+                        f'DELETE FROM "{table}" WHERE SOURCE_FILE = ?', (source_file,)
+                    )
+            for table, data in frames.items():
+                data = data.copy()
+                data["SOURCE_FILE"] = source_file
+                data.to_sql(table, connection, if_exists="append", index=False)
+                key = self.key_columns.get(table)
+                if key in data.columns:
+                    connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{table}_{key}" '
+                        f'ON "{table}" ("{key}")'
+                    )
+            pd.DataFrame({"SOURCE_FILE": [source_file], "SAVED": [saved]}).to_sql(
+                "snapshot_info", connection, if_exists="append", index=False
+            )
+
+    def history(
+        self,
+        source: str,
+        table: str,
+        last: int = 26,
+        where: dict = None,
+        columns: list = None,
+    ):
+        # only the files of the last snapshots are opened, the filter runs in
+        # SQLite on the indexed key
+        where = where or {}
+        select = ", ".join(f'"{x}"' for x in columns) if columns else "*"
+        conditions = " AND ".join(f'"{x}" = ?' for x in where)
+        query = f'SELECT {select} FROM "{table}"'
+        if conditions:
+            query = f"{query} WHERE {conditions}"
+        history = []
+        for snapshot in self.partitions(source)[-last:]:
+            path = self.partition_path(source, snapshot)
+            uri = f"file:{path}?mode=ro"
+            with closing(sqlite3.connect(uri, uri=True, timeout=60)) as connection:
+                exists = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                    (table,),
+                ).fetchone()
+                if not exists:
+                    continue
+                data = pd.read_sql_query(query, connection, params=list(where.values()))
+            data.insert(0, "SNAPSHOT", snapshot)
+            history.append(data)
+        if not history:
+            return pd.DataFrame()
+        return pd.concat(history, ignore_index=True)
+
+    def component_history(self, component: str, table: str = "orders", last=26):
+        # for example the orders of a component over the last 26 snapshots
+        return self.history(
+            "components", table, last=last, where={"COMPONENT": component}
+        )
+
+    def product_history(self, soi: str, table: str = "products_orders", last=26):
+        return self.history("products", table, last=last, where={"SOI": soi})
+
+
+def append_snapshot(
+    snapshot_dir: str,
+    source: str,
+    frames: dict,
+    source_file: str,
+    snapshot: str = None,
+    replace_partition: bool = True,
+):
+    # readers keep working when the store can't be written
+    try:
+        SnapshotStore(snapshot_dir).append(
+            source,
+            frames,
+            source_file,
+            snapshot=snapshot,
+            replace_partition=replace_partition,
+        )
+    except Exception as e:
+        print(f"Error saving {source} snapshot: {e}")
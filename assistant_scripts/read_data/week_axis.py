@@ -0,0 +1,118 @@
+import re, datetime
+import pandas as pd
+
+from datetime import timedelta
+
+# "W Total" headers of the C711 and C502 plans end with the first day of the
+# week, "W Total 10/12)"
+week_header_pattern = re.compile(r"W Total.*?(\d{1,2})/(\d{1,2})\)?\s*$")
+week_label_pattern = re.compile(r"^(\d{1,2})/(\d{1,2})$")
+
+
+def week_monday(date=None):
+    date = date or datetime.date.today()
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    return date - timedelta(days=date.weekday())
+
+
+def week_key(date):
+    # integer key of the ISO week, 202442 for the 42nd week of 2024
+    year, week, _ = date.isocalendar()
+    return year * 100 + week
+
+
+def key_monday(key: int):
+    return datetime.date.fromisocalendar(key // 100, key % 100, 1)
+
+
+def week_label(date):
+    # "m/d" without leading zeros, as "%#m/%#d" gave on Windows only
+    return f"{date.month}/{date.day}"
+
+
+def week_year_label(key: int):
+    return f"W{key % 100}.{key // 100}"
+
+
+def header_label(header):
+    # "W Total 10/12)" -> "10/12", None for the other headers
+    match = week_header_pattern.search(str(header))
+    if match is None:
+        return None
+    return f"{int(match.group(1))}/{int(match.group(2))}"
+
+
+def label_date(label, start: datetime.date):
+    # "m/d" labels have no year, plans look ahead, so the label is the first
+    # such date from four weeks before the start on
+    match = week_label_pattern.match(str(label))
+    if match is None:
+        return None
+    month, day = int(match.group(1)), int(match.group(2))
+    earliest = start - timedelta(weeks=4)
+    for year in [start.year - 1, start.year, start.year + 1]:
+        try:
+            date = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if date >= earliest:
+            return date
+    return None
+
+
+def week_keys(dates: pd.Series):
+    iso = pd.to_datetime(dates).dt.isocalendar()
+    return iso["year"].astype("Int64") * 100 + iso["week"].astype("Int64")
+
+
+def week_year_labels(dates: pd.Series):
+    # "W42.2024" for every date, formatted once per week
+    keys = week_keys(dates)
+    labels = {key: week_year_label(key) for key in keys.dropna().unique()}
+    return keys.map(labels).astype(object)
+
+
+class WeekAxis:
+    # consecutive weeks from the Monday of start, the key, Monday and label of
+    # every week are computed once and looked up by dict
+    def __init__(self, start=None, weeks: int = 20):
+        first_monday = week_monday(start)
+        self.mondays = [first_monday + timedelta(weeks=i) for i in range(weeks)]
+        self.keys = [week_key(x) for x in self.mondays]
+        self.labels = [week_label(x) for x in self.mondays]
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self.label_positions = {label: i for i, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def datetimes(self):
+        return [datetime.datetime.combine(x, datetime.time()) for x in self.mondays]
+
+    def position(self, week):
+        # week as integer key, "m/d" label, date, datetime or Timestamp
+        if isinstance(week, str):
+            return self.label_positions.get(week)
+        if isinstance(week, datetime.date):
+            week = week_key(week)
+        return self.positions.get(week)
+
+    def select_headers(self, headers):
+        # "W Total" headers from the first week of the axis on, matched on the
+        # whole label, "1/1" is not found in "11/10)", empty when the first
+        # week is not in the headers
+        labels = [(x, header_label(x)) for x in headers]
+        week_headers = [(x, label) for x, label in labels if label is not None]
+        for i, (_, label) in enumerate(week_headers):
+            if label == self.labels[0]:
+                return [x for x, _ in week_headers[i:]]
+        return []
+
+    def select_dates(self, dates):
+        # datetime headers from the week of the first week of the axis on,
+        # empty when the first week is not in the dates
+        for i, date in enumerate(dates):
+            if week_key(date) == self.keys[0]:
+                return dates[i:]
+        return []
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+
+def get_fold_starts(columns: list, valid_weeks: list, keep_columns: list = ()):
+    # a column starts a new bucket when it is a valid week, every other column
+    # is folded into the bucket on its left
+    valid_weeks = set(valid_weeks) | set(keep_columns)
+    return [i for i, column in enumerate(columns) if i == 0 or column in valid_weeks]
+
+
+def fold_weeks(
+    data: pd.DataFrame,
+    valid_weeks: list,
+    how: str = "sum",
+    keep_columns: list = (),
+):
+    starts = get_fold_starts(data.columns.to_list(), valid_weeks, keep_columns)
+    values = data.to_numpy()
+    if how == "sum":
+        folded = np.add.reduceat(values, starts, axis=1)
+    elif how == "last":
+        ends = np.array(starts[1:] + [values.shape[1]])
+        folded = values[:, ends - 1]
+    else:
+        raise ValueError(f"Unknown fold method: {how}")
+    return pd.DataFrame(
+        folded, index=data.index, columns=data.columns[starts], copy=False
+    )
@@ -1,20 +1,34 @@
 import os
+import numpy as np
 import pandas as pd
-import openpyxl.utils
 
-from datetime import datetime, timedelta
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, NamedStyle, Font, Border, Side
-from openpyxl.formatting.rule import CellIsRule
+from datetime import datetime
 
 from assistant_scripts.read_data.read_components_data import ComponentsDataReader
+from assistant_scripts.read_data.data_cache import read_excel_cached
+from assistant_scripts.read_data.week_axis import WeekAxis, week_keys
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
+from assistant_scripts.other_functions.excel_writer import StreamingExcelWriter
+from assistant_scripts.other_functions.excel_formulas import (
+    FormulaSheet,
+    column_letter,
+    excel_rows,
+    render_formulas,
+)
 
 
 class ComponentsBalances:
-    def __init__(self, path_groups: str, path_components: str, path_supply: str):
+    def __init__(
+        self,
+        path_groups: str,
+        path_components: str,
+        path_supply: str,
+        use_formulas: bool = False,
+    ):
         self.path_groups = path_groups
         self.path_components = path_components
         self.path_supply = path_supply
+        self.use_formulas = use_formulas
         self.groups = None
         self.supply = None
         self.orders = None
@@ -22,25 +36,16 @@ class ComponentsBalances:
         self.stock = None
         self.groups_balances = None
         self.weeks = None
+        self.week_axis = None
         self.report_sources = None
+        self.formula_sheets = None
 
     def create_weeks(self):
-        actual_date = datetime.now()
-        how_many_weeks = 16
-        next_monday = (
-            actual_date - timedelta(days=actual_date.weekday()) + timedelta(weeks=1)
-        ).replace(hour=0, minute=0, second=0, microsecond=0)
-
-        first_monday = (actual_date - timedelta(days=actual_date.weekday())).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        self.weeks = [first_monday] + [
-            next_monday - timedelta(weeks=i)
-            for i in range(0, -(how_many_weeks - 1), -1)
-        ]
+        self.week_axis = WeekAxis(weeks=16)
+        self.weeks = self.week_axis.datetimes()
 
     def get_groups(self):
-        self.groups = pd.read_excel(self.path_groups, sheet_name="groups")
+        self.groups = read_excel_cached(self.path_groups, sheet_name="groups")
         self.groups = self.groups[
             ["COMPONENT", "GROUP", "GROUP_DESCRIPTION"]
         ].drop_duplicates()
@@ -59,15 +64,24 @@ class ComponentsBalances:
         self.stock = comp_data.components_stock
 
     def get_supply(self):
-        self.supply = pd.read_excel(self.path_supply, sheet_name="supply_confirmed")
+        self.supply = read_excel_cached(self.path_supply, sheet_name="supply_confirmed")
 
     def add_groups(self):
         to_add_groups = [self.orders, self.demand, self.stock]
+        # same as XLOOKUP, the first group listed for the component
+        groups_lookup = self.groups.drop_duplicates("COMPONENT")
+        groups_lookup = groups_lookup.set_index("COMPONENT")["GROUP"]
         for data in to_add_groups:
-            data["GROUP"] = data.apply(
-                lambda row: f'=_xlfn.XLOOKUP(B{row.name + 2},Components_groups!A:A,Components_groups!B:B,"NOT_FOUND")',
-                axis=1,
-            )
+            if self.use_formulas:
+                groups_sheet = FormulaSheet("Components_groups", self.groups)
+                data["GROUP"] = render_formulas(
+                    '=_xlfn.XLOOKUP(B{row},{components},{groups},"NOT_FOUND")',
+                    excel_rows(len(data)),
+                    components=groups_sheet.name("COMPONENT"),
+                    groups=groups_sheet.name("GROUP"),
+                )
+            else:
+                data["GROUP"] = data["COMPONENT"].map(groups_lookup).fillna("NOT_FOUND")
 
             data.insert(0, "GROUP", data.pop("GROUP"))
 
@@ -93,77 +107,133 @@ class ComponentsBalances:
         self.groups_balances["Data"].loc[midpoint:] = "Stock vs. Forecast"
         self.groups_balances["Category"] = "MEM"
 
-    def _formula_first_column(self, row):
-        part_a = f"E{row.name +2}"
-        part_b = (
-            f"_xlfn.SUMIFS(Supply!$E:$E,Supply!$D:$D,I$1,Supply!$A:$A,$C{row.name +2})"
+    def _apply_formulas(self):
+        self.demand["AVG"] = render_formulas(
+            "=_xlfn.AVERAGE(C{row}:V{row})*4", excel_rows(len(self.demand))
         )
-        part_c = f'_xlfn.IF($D{row.name +2}="Stock vs. Real customer orders",SUMIFS(Order!C:C,Order!$A:$A,$C{row.name +2}),SUMIFS(Demand_Plan!C:C,Demand_Plan!$A:$A,$C{row.name +2}))'
-        return f"={part_a}+{part_b}-{part_c}"
+        self.formula_sheets = {
+            "groups": FormulaSheet("Components_groups", self.groups),
+            "demand": FormulaSheet("Demand_Plan", self.demand),
+            "orders": FormulaSheet("Order", self.orders),
+            "stock": FormulaSheet("Stock", self.stock),
+            "supply": FormulaSheet("Supply", self.supply),
+        }
+        supply = self.formula_sheets["supply"]
+        orders = self.formula_sheets["orders"]
+        demand = self.formula_sheets["demand"]
+        stock = self.formula_sheets["stock"]
+        rows = excel_rows(len(self.groups_balances))
 
-    def _formula_next_columns(self, row):
-        part_a = f"I{row.name +2}"
-        part_b = (
-            f"_xlfn.SUMIFS(Supply!$E:$E,Supply!$D:$D,J$1,Supply!$A:$A,$C{row.name +2})"
+        self.groups_balances["Current stock"] = render_formulas(
+            "=_xlfn.SUMIFS({stock},{stock_groups},C{row})",
+            rows,
+            stock=stock.name("TOTAL_STOCK"),
+            stock_groups=stock.name("GROUP"),
+        )
+        self.groups_balances["Healthy Stock Level vs. Forecast"] = render_formulas(
+            "=_xlfn.SUMIFS({average},{demand_groups},$C{row})*1.5",
+            rows,
+            average=demand.name("AVG"),
+            demand_groups=demand.name("GROUP"),
         )
-        part_c = f'_xlfn.IF($D{row.name +2}="Stock vs. Real customer orders",SUMIFS(Order!D:D,Order!$A:$A,$C{row.name +2}),SUMIFS(Demand_Plan!D:D,Demand_Plan!$A:$A,$C{row.name +2}))'
-        return f"={part_a}+{part_b}-{part_c}"
 
-    def _formula_stock_columns(self, row):
-        return f"=_xlfn.SUMIFS(Stock!$E:$E,Stock!$A:$A,C{row.name +2})"
+        # every week adds its supply and takes its orders or demand from the
+        # balance of the week before
+        first_week = self.groups_balances.columns.get_loc(self.weeks[0])
+        weeks_with_data = min(len(self.weeks), len(self.orders.columns) - 2)
+        for i in range(weeks_with_data):
+            column = first_week + i
+            self.groups_balances.isetitem(
+                column,
+                render_formulas(
+                    "={previous}{row}"
+                    "+_xlfn.SUMIFS({supply},{supply_weeks},{week}$1,{supply_groups},$C{row})"
+                    '-_xlfn.IF($D{row}="Stock vs. Real customer orders",'
+                    "SUMIFS({orders},{orders_groups},$C{row}),"
+                    "SUMIFS({demand},{demand_groups},$C{row}))",
+                    rows,
+                    previous=column_letter(column - 1) if i else "E",
+                    week=column_letter(column),
+                    supply=supply.name("QTY"),
+                    supply_weeks=supply.name("ETD_DATE_WEEK"),
+                    supply_groups=supply.name("GROUP"),
+                    orders=orders.range_at(2 + i),
+                    orders_groups=orders.name("GROUP"),
+                    demand=demand.range_at(2 + i),
+                    demand_groups=demand.name("GROUP"),
+                ),
+            )
 
-    def _formula_avg_demand_columns(self, row):
-        return f"=_xlfn.AVERAGE(C{row.name +2}:V{row.name +2})*4"
+    def _define_formula_names(self, writer):
+        named_columns = {
+            "groups": ["COMPONENT", "GROUP"],
+            "demand": ["GROUP", "AVG"],
+            "orders": ["GROUP"],
+            "stock": ["GROUP", "TOTAL_STOCK"],
+            "supply": ["GROUP", "ETD_DATE_WEEK", "QTY"],
+        }
+        for key, columns in named_columns.items():
+            self.formula_sheets[key].define_names(writer, columns)
 
-    def _formula_dos_forecast(self, row):
-        part_a = f"_xlfn.SUMIFS(Demand_Plan!$W:$W,Demand_Plan!$A:$A,$C{row.name +2})"
-        part_b = 1.5
-        return f"={part_a}*{part_b}"
+    def _sum_by_group(self, data: pd.DataFrame, columns: list):
+        # SUMIFS over the GROUP column, one row per row of Groups_balances
+        sums = data.groupby("GROUP", sort=False)[columns].sum()
+        sums = sums.reindex(self.groups_balances["Group"], fill_value=0)
+        return sums.to_numpy(dtype=float)
 
-    def _apply_formulas(self):
-        self.groups_balances.iloc[:, 8] = self.groups_balances.apply(
-            lambda row: self._formula_first_column(row), axis=1
-        )
-        self.groups_balances.iloc[:, 9] = self.groups_balances.apply(
-            lambda row: self._formula_next_columns(row), axis=1
-        )
-        self.groups_balances.iloc[:, 4] = self.groups_balances.apply(
-            lambda row: self._formula_stock_columns(row), axis=1
-        )
-        self.groups_balances.iloc[:, 5] = self.groups_balances.apply(
-            lambda row: self._formula_dos_forecast(row), axis=1
-        )
-        self.demand["AVG"] = self.demand.apply(
-            lambda row: self._formula_avg_demand_columns(row), axis=1
-        )
+    def _weeks_by_group(self, data: pd.DataFrame):
+        # week k of the report is the k-th week column after GROUP and COMPONENT
+        week_columns = list(data.columns[2 : 2 + len(self.weeks)])
+        sums = self._sum_by_group(data, week_columns)
+        missing_weeks = len(self.weeks) - len(week_columns)
+        return np.pad(sums, ((0, 0), (0, missing_weeks)))
 
-    def _apply_excel_formatting(self, final_file_path):
-        redFill = PatternFill(
-            start_color="FF7276", end_color="FF7276", fill_type="solid"
-        )
-        rule_negative = CellIsRule(
-            operator="lessThan", formula=[0], stopIfTrue=True, fill=redFill
+    def _supply_by_group(self):
+        # supply and report weeks are joined on integer week keys
+        weeks = week_keys(self.supply["ETD_DATE_WEEK"])
+        supply = self.supply.assign(WEEK=weeks)[weeks.isin(self.week_axis.keys)]
+        supply = supply.groupby(["GROUP", "WEEK"])["QTY"].sum().unstack()
+        supply = supply.reindex(
+            index=self.groups_balances["Group"], columns=self.week_axis.keys
+        ).fillna(0)
+        return supply.to_numpy(dtype=float)
+
+    def compute_balances(self):
+        # the AVG column covers the first 20 weeks, as AVERAGE(C:V)*4 did
+        demand_weeks = self.demand.iloc[:, 2:22]
+        orders = self._weeks_by_group(self.orders)
+        demand = self._weeks_by_group(self.demand)
+        self.demand["AVG"] = demand_weeks.mean(axis=1) * 4
+
+        stock = self._sum_by_group(self.stock, ["TOTAL_STOCK"])[:, 0]
+        use_orders = (
+            self.groups_balances["Data"] == "Stock vs. Real customer orders"
+        ).to_numpy()
+        demand = np.where(use_orders[:, None], orders, demand)
+        balances = stock[:, None] + np.cumsum(self._supply_by_group() - demand, axis=1)
+
+        self.groups_balances["Current stock"] = stock
+        self.groups_balances["Healthy Stock Level vs. Forecast"] = (
+            self._sum_by_group(self.demand, ["AVG"])[:, 0] * 1.5
         )
-        workbook = load_workbook(filename=final_file_path)
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            sheet.conditional_formatting.add("B2:AE1000", rule_negative)
-
-        sheet = workbook["Groups_balances"]
-        columns_to_format = list(range(9, 25))
-        date_format = NamedStyle(name="date_format", number_format="m/d")
-        date_format.font = Font(bold=True)
-        date_format.border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
+        first_week = self.groups_balances.columns.get_loc(self.weeks[0])
+        for i, week_balance in enumerate(balances.T):
+            self.groups_balances.isetitem(first_week + i, week_balance)
+
+    def _apply_excel_formatting(self, writer):
+        red_fill = writer.add_format({"bg_color": "#FF7276"})
+        rule_negative = {
+            "type": "cell",
+            "criteria": "<",
+            "value": 0,
+            "format": red_fill,
+            "stop_if_true": True,
+        }
+        writer.add_conditional_format("B2:AE1000", rule_negative)
+        # week headers of Groups_balances
+        writer.date_header_format = writer.add_format(
+            {"num_format": "m/d", "bold": True, "border": 1}
         )
-        for column_number in columns_to_format:
-            column_letter = openpyxl.utils.get_column_letter(column_number)
-            cell = sheet[column_letter + "1"]
-            cell.style = date_format
-        workbook.save(final_file_path)
 
     def get_report_sources(self):
         source_files = [self.path_groups, self.path_components, self.path_supply]
@@ -182,27 +252,30 @@ class ComponentsBalances:
         directory_path = os.path.dirname(self.path_components)
         report_file_path = os.path.join(directory_path, filename)
 
-        writer = pd.ExcelWriter(report_file_path)
-        self.report_sources.to_excel(writer, sheet_name=f"INFO", index=False)
-        self.groups_balances.to_excel(
-            writer, sheet_name=f"Groups_balances", index=False
-        )
-        self.groups.to_excel(writer, sheet_name=f"Components_groups", index=False)
-        self.demand.to_excel(writer, sheet_name=f"Demand_Plan", index=False)
-        self.orders.to_excel(writer, sheet_name=f"Order", index=False)
-        self.stock.to_excel(writer, sheet_name=f"Stock", index=False)
-        self.supply.to_excel(writer, sheet_name=f"Supply", index=False)
-
-        writer._save()
-        self._apply_excel_formatting(report_file_path)
+        writer = StreamingExcelWriter(report_file_path)
+        self._apply_excel_formatting(writer)
+        if self.use_formulas:
+            self._define_formula_names(writer)
+        writer.write_frame("INFO", self.report_sources)
+        writer.write_frame("Groups_balances", self.groups_balances)
+        writer.write_frame("Components_groups", self.groups)
+        writer.write_frame("Demand_Plan", self.demand)
+        writer.write_frame("Order", self.orders)
+        writer.write_frame("Stock", self.stock)
+        writer.write_frame("Supply", self.supply)
+        writer.close()
+        report_saved(report_file_path)
 
     def __call__(self):
-        self.get_groups()
-        self.create_weeks()
-        self.get_components_data()
-        self.get_supply()
-        self.add_groups()
-        self.prepare_groups_balances()
-        self._apply_formulas()
-        self.get_report_sources()
-        self.save_to_excel()
+        run_stage(self.get_groups)
+        run_stage(self.create_weeks)
+        run_stage(self.get_components_data)
+        run_stage(self.get_supply)
+        run_stage(self.add_groups)
+        run_stage(self.prepare_groups_balances)
+        if self.use_formulas:
+            run_stage(self._apply_formulas)
+        else:
+            run_stage(self.compute_balances)
+        run_stage(self.get_report_sources)
+        run_stage(self.save_to_excel)
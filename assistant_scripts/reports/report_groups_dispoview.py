@@ -1,12 +1,19 @@
 import os, datetime
 
+import numpy as np
 import pandas as pd
-import openpyxl.utils
 
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, NamedStyle, Font, Border, Side
-from openpyxl.formatting.rule import CellIsRule
 from assistant_scripts.read_data.read_dispoview_data import DispoviewDataReader
+from assistant_scripts.read_data.key_registry import merge_on_key
+from assistant_scripts.read_data.week_axis import week_year_labels
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
+from assistant_scripts.other_functions.excel_writer import StreamingExcelWriter
+from assistant_scripts.other_functions.excel_formulas import (
+    FormulaSheet,
+    column_letter,
+    excel_rows,
+    render_formulas,
+)
 
 
 class GroupsDispoview:
@@ -15,10 +22,12 @@ class GroupsDispoview:
         dispo_file_path: str,
         groups_file_path: str,
         supply_file_path: str,
+        use_formulas: bool = False,
     ):
         self.dispo_file_path = dispo_file_path
         self.groups_file_path = groups_file_path
         self.supply_file_path = supply_file_path
+        self.use_formulas = use_formulas
 
         self.raw_dispoview = None
 
@@ -34,6 +43,7 @@ class GroupsDispoview:
 
         self.groups_balances = None
         self.weeks = None
+        self.formula_sheets = None
 
     def _read_dispoview(self):
         dispoview = DispoviewDataReader(dispo_file_path=self.dispo_file_path)
@@ -55,15 +65,10 @@ class GroupsDispoview:
             zip(self.ready_groups["COMPONENT"], self.ready_groups["CODENUMBER"])
         )
 
-    def _format_week_year(self, date):
-        week_number = date.isocalendar().week
-        year = date.year
-        return f"W{week_number}.{year}"
-
     def _read_supply(self):
         def process_supply_sheet(sheet_name):
             df = pd.read_excel(self.supply_file_path, sheet_name=sheet_name)
-            df["ETD_DATE_WEEK"] = df["ETD_DATE_WEEK"].apply(self._format_week_year)
+            df["ETD_DATE_WEEK"] = week_year_labels(df["ETD_DATE_WEEK"])
             df["CODENUMBER"] = df["COMPONENT"].map(self.component_to_codenumber)
             return df
 
@@ -71,7 +76,7 @@ class GroupsDispoview:
         self.supply_requested = process_supply_sheet("supply_requested")
 
     def _mergre_groups_dispoview(self):
-        self.all_merged_data = pd.merge(
+        self.all_merged_data = merge_on_key(
             self.ready_groups[["CODENUMBER", "GROUP", "GROUP_DESCRIPTION"]],
             self.raw_dispoview,
             on="CODENUMBER",
@@ -79,33 +84,6 @@ class GroupsDispoview:
         )
         self.weeks = list(self.all_merged_data.columns[4:])
 
-    def _formula_column(self, row, first: bool):
-        if row["DATA"] == "Forecast_confirmed":
-            if first:
-                part_a = f'_xlfn.SUMIFS(All_data!E:E,All_data!$B:$B,$A{row.name +2},All_data!$D:$D,"Stock")'
-                sub_part_a = f"E$1"
-                sub_part_b = f"All_data!E:E"
-            else:
-                part_a = f"E{row.name +2}"
-                sub_part_a = f"F$1"
-                sub_part_b = f"All_data!F:F"
-            part_b = f'_xlfn.SUMIFS({sub_part_b},All_data!$B:$B,$A{row.name +2},All_data!$D:$D,"NetForecast")'
-            part_c = f"_xlfn.SUMIFS(Supply_confirmed!$E:$E,Supply_confirmed!$A:$A,$A{row.name +2},Supply_confirmed!$D:$D,{sub_part_a})"
-            return f"={part_a}-{part_b}+{part_c}"
-
-        if row["DATA"] == "Orders_confirmed":
-            if first:
-                part_a = f'_xlfn.SUMIFS(All_data!E:E,All_data!$B:$B,$A{row.name +2},All_data!$D:$D,"Stock")'
-                sub_part_a = f"E$1"
-                sub_part_b = f"All_data!E:E"
-            else:
-                part_a = f"E{row.name +2}"
-                sub_part_a = f"F$1"
-                sub_part_b = f"All_data!F:F"
-            part_b = f'_xlfn.SUMIFS({sub_part_b},All_data!$B:$B,$A{row.name +2},All_data!$D:$D,"CustOrders")'
-            part_c = f"_xlfn.SUMIFS(Supply_confirmed!$E:$E,Supply_confirmed!$A:$A,$A{row.name +2},Supply_confirmed!$D:$D,{sub_part_a})"
-            return f"={part_a}-{part_b}+{part_c}"
-
     def _create_groups_balances(self):
         main_headers = ["GROUP", "GROUP_DESCRIPTION", "DATA", "COMMENTS"] + self.weeks
         groups_descriptions = (
@@ -137,25 +115,126 @@ class GroupsDispoview:
             ],
             ignore_index=True,
         )
-        self.groups_balances.iloc[:, 4] = self.groups_balances.apply(
-            lambda row: self._formula_column(row, True), axis=1
-        )
-        self.groups_balances.iloc[:, 5] = self.groups_balances.apply(
-            lambda row: self._formula_column(row, False), axis=1
-        )
 
-    def _apply_excel_formatting(self, final_file_path):
-        redFill = PatternFill(
-            start_color="FF7276", end_color="FF7276", fill_type="solid"
-        )
-        rule_negative = CellIsRule(
-            operator="lessThan", formula=[0], stopIfTrue=True, fill=redFill
+    def _apply_formulas(self):
+        if not self.weeks:
+            return
+        self.formula_sheets = {
+            "all_data": FormulaSheet("All_data", self.all_merged_data),
+            "supply_confirmed": FormulaSheet("Supply_confirmed", self.supply_confirmed),
+        }
+        all_data = self.formula_sheets["all_data"]
+        supply = self.formula_sheets["supply_confirmed"]
+        rows = excel_rows(len(self.groups_balances))
+        data = self.groups_balances["DATA"].to_numpy()
+        demand_figures = {
+            "Forecast_confirmed": "NetForecast",
+            "Orders_confirmed": "CustOrders",
+        }
+
+        # the first week starts from the stock, the next weeks from the balance
+        # of the week before
+        first_week = self.groups_balances.columns.get_loc(self.weeks[0])
+        for i, week in enumerate(self.weeks):
+            column = first_week + i
+            week_data = all_data.range(week)
+            if i:
+                balance = column_letter(column - 1) + "{row}"
+            else:
+                balance = (
+                    f"_xlfn.SUMIFS({week_data},{all_data.name('GROUP')},$A{{row}},"
+                    f'{all_data.name("DATA")},"Stock")'
+                )
+            formulas = np.full(len(data), None, dtype=object)
+            for name, figure in demand_figures.items():
+                selected = data == name
+                formulas[selected] = render_formulas(
+                    "={balance}"
+                    '-_xlfn.SUMIFS({week_data},{groups},$A{row},{figures},"{figure}")'
+                    "+_xlfn.SUMIFS({supply},{supply_groups},$A{row},{supply_weeks},{week}$1)",
+                    rows[selected],
+                    balance=balance,
+                    week_data=week_data,
+                    groups=all_data.name("GROUP"),
+                    figures=all_data.name("DATA"),
+                    figure=figure,
+                    supply=supply.name("QTY"),
+                    supply_groups=supply.name("GROUP"),
+                    supply_weeks=supply.name("ETD_DATE_WEEK"),
+                    week=column_letter(column),
+                )
+            self.groups_balances.isetitem(column, formulas)
+
+    def _define_formula_names(self, writer):
+        self.formula_sheets["all_data"].define_names(writer, ["GROUP", "DATA"])
+        self.formula_sheets["supply_confirmed"].define_names(
+            writer, ["GROUP", "ETD_DATE_WEEK", "QTY"]
         )
-        workbook = load_workbook(filename=final_file_path)
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            sheet.conditional_formatting.add("B2:Z1000", rule_negative)
-        workbook.save(final_file_path)
+
+    def _sum_by_group(self, data: pd.DataFrame, columns: list):
+        # SUMIFS over the GROUP column, one row per row of Groups_balances
+        sums = data.groupby("GROUP")[columns].sum()
+        sums = sums.reindex(self.groups_balances["GROUP"], fill_value=0)
+        return sums.to_numpy(dtype=float)
+
+    def _figure_by_group(self, figure: str):
+        figure_data = self.all_merged_data[self.all_merged_data["DATA"] == figure]
+        return self._sum_by_group(figure_data, self.weeks)
+
+    def _supply_by_group(self, supply: pd.DataFrame):
+        supply = supply[supply["ETD_DATE_WEEK"].isin(self.weeks)]
+        supply = supply.groupby(["GROUP", "ETD_DATE_WEEK"])["QTY"].sum().unstack()
+        supply = supply.reindex(
+            index=self.groups_balances["GROUP"], columns=self.weeks
+        ).fillna(0)
+        return supply.to_numpy(dtype=float)
+
+    def _next_weeks_sum(self, values: np.ndarray, weeks: int):
+        # sum of the week and the following weeks, shorter at the horizon end
+        cumulative = np.pad(np.cumsum(values, axis=1), ((0, 0), (1, 0)))
+        starts = np.arange(values.shape[1])
+        ends = np.minimum(starts + weeks, values.shape[1])
+        return cumulative[:, ends] - cumulative[:, starts]
+
+    def _compute_groups_balances(self):
+        if not self.weeks:
+            return
+        # stock of the first week, then week by week supply minus demand
+        stock = self._figure_by_group("Stock")[:, [0]]
+        net_forecast = self._figure_by_group("NetForecast")
+        customer_orders = self._figure_by_group("CustOrders")
+        supply_confirmed = self._supply_by_group(self.supply_confirmed)
+        supply_requested = self._supply_by_group(self.supply_requested)
+
+        forecast_confirmed = stock + np.cumsum(supply_confirmed - net_forecast, axis=1)
+        balances = {
+            "Forecast_confirmed": forecast_confirmed,
+            "Forecast_requested": forecast_confirmed
+            + np.cumsum(supply_requested, axis=1),
+            "Healthy_stock_forecast": 1.5 * self._next_weeks_sum(net_forecast, 4),
+            "Orders_confirmed": stock
+            + np.cumsum(supply_confirmed - customer_orders, axis=1),
+        }
+        data = self.groups_balances["DATA"].to_numpy()
+        values = np.zeros((len(data), len(self.weeks)))
+        for name, balance in balances.items():
+            rows = data == name
+            values[rows] = balance[rows]
+
+        first_week = self.groups_balances.columns.get_loc(self.weeks[0])
+        for i, week_values in enumerate(values.T):
+            self.groups_balances.isetitem(first_week + i, week_values)
+
+    def _apply_excel_formatting(self, writer):
+        red_fill = writer.add_format({"bg_color": "#FF7276"})
+        rule_negative = {
+            "type": "cell",
+            "criteria": "<",
+            "value": 0,
+            "format": red_fill,
+            "stop_if_true": True,
+        }
+        writer.add_conditional_format("B2:Z1000", rule_negative)
 
     def _save_to_excel(self):
         now = datetime.datetime.now()
@@ -163,26 +242,27 @@ class GroupsDispoview:
         directory_path = os.path.dirname(self.dispo_file_path)
         report_file_path = os.path.join(directory_path, filename)
 
-        writer = pd.ExcelWriter(report_file_path)
-        self.groups_balances.to_excel(
-            writer, sheet_name=f"Groups_balances", index=False
-        )
-        self.all_merged_data.to_excel(writer, sheet_name=f"All_data", index=False)
-        self.supply_confirmed.to_excel(
-            writer, sheet_name=f"Supply_confirmed", index=False
-        )
-        self.supply_confirmed.to_excel(
-            writer, sheet_name=f"Supply_requested", index=False
-        )
-        self.raw_groups.to_excel(writer, sheet_name=f"Groups", index=False)
-        writer._save()
-        self._apply_excel_formatting(report_file_path)
+        writer = StreamingExcelWriter(report_file_path)
+        if self.use_formulas and self.formula_sheets:
+            self._define_formula_names(writer)
+        writer.write_frame("Groups_balances", self.groups_balances)
+        writer.write_frame("All_data", self.all_merged_data)
+        writer.write_frame("Supply_confirmed", self.supply_confirmed)
+        writer.write_frame("Supply_requested", self.supply_requested)
+        writer.write_frame("Groups", self.raw_groups)
+        self._apply_excel_formatting(writer)
+        writer.close()
+        report_saved(report_file_path)
 
     def __call__(self):
-        self._read_dispoview()
-        self._read_groups()
-        self._select_groups()
-        self._read_supply()
-        self._mergre_groups_dispoview()
-        self._create_groups_balances()
-        self._save_to_excel()
+        run_stage(self._read_dispoview)
+        run_stage(self._read_groups)
+        run_stage(self._select_groups)
+        run_stage(self._read_supply)
+        run_stage(self._mergre_groups_dispoview)
+        run_stage(self._create_groups_balances)
+        if self.use_formulas:
+            run_stage(self._apply_formulas)
+        else:
+            run_stage(self._compute_groups_balances)
+        run_stage(self._save_to_excel)
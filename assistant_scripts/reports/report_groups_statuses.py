@@ -1,16 +1,28 @@
-import os, datetime
+import os, datetime, shutil, tempfile
 import pandas as pd
 
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from openpyxl.formatting.rule import CellIsRule
-
 from assistant_scripts.read_data.read_components_data import ComponentsDataReader
 from assistant_scripts.read_data.read_products_data import ProductsDataReader
 from assistant_scripts.read_data.read_companion_data import CompanionDbReader
+from assistant_scripts.read_data.data_cache import read_excel_cached
+from assistant_scripts.read_data.key_registry import key_registry, merge_on_key
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
+from assistant_scripts.other_functions.excel_writer import StreamingExcelWriter
+from assistant_scripts.other_functions.report_manifest import (
+    ReportManifest,
+    combine_fingerprints,
+    copy_sheets,
+    frame_fingerprint,
+    partition_fingerprints,
+)
 
 
 class GroupsStatuses:
+    # bump when the sheets are written differently (positions of the group
+    # tables, hyperlinks, formats, conditional ranges), so sheets of older
+    # reports are not copied next to new ones
+    layout_version = 1
+
     def __init__(
         self,
         path_components: str,
@@ -18,13 +30,18 @@ class GroupsStatuses:
         path_groups: str,
         path_supply: str,
         path_db: str,
+        products_workers: int = None,
+        incremental: bool = False,
     ):
         self.path_components = path_components
         self.path_products = path_products
         self.path_groups = path_groups
         self.path_supply = path_supply
         self.path_db = path_db
+        self.products_workers = products_workers
+        self.incremental = incremental
         self.groups = None
+        self.groups_keys = None
         self.all_products_orders = None
         self.all_products_supply = None
         self.all_products_balances = None
@@ -33,7 +50,10 @@ class GroupsStatuses:
         self.groups_summary = None
         self.unique_groups = None
         self.db_info = None
+        self.groups_index = None
         self.report_file_path = None
+        self.sheets_fingerprints = None
+        self.previous_manifest = None
 
     def get_components_data(self):
         comp = ComponentsDataReader(
@@ -45,9 +65,9 @@ class GroupsStatuses:
         comp()
         self.all_components_stock = comp.components_stock
 
-        self.all_components_stock = pd.merge(
+        self.all_components_stock = merge_on_key(
             self.all_components_stock,
-            self.groups[["GROUP", "COMPONENT"]],
+            self.groups_keys[["GROUP", "COMPONENT"]],
             on="COMPONENT",
             how="left",
         )
@@ -59,7 +79,10 @@ class GroupsStatuses:
 
     def get_products_data(self):
         products = ProductsDataReader(
-            file_path=None, folder_path=self.path_products, to_excel=False
+            file_path=None,
+            folder_path=self.path_products,
+            to_excel=False,
+            workers=self.products_workers,
         )
         products()
         self.all_products_orders = products.orders
@@ -70,9 +93,9 @@ class GroupsStatuses:
         self._update_all_products_balances()
 
     def _update_all_products_orders(self):
-        self.all_products_orders = pd.merge(
+        self.all_products_orders = merge_on_key(
             self.all_products_orders,
-            self.groups[["GROUP", "SOI"]],
+            self.groups_keys[["GROUP", "SOI"]],
             on="SOI",
             how="left",
         )
@@ -88,9 +111,9 @@ class GroupsStatuses:
         self.all_products_orders = self.all_products_orders.drop_duplicates()
 
     def _update_all_products_supply(self):
-        self.all_products_supply = pd.merge(
+        self.all_products_supply = merge_on_key(
             self.all_products_supply,
-            self.groups[["GROUP", "SOI"]],
+            self.groups_keys[["GROUP", "SOI"]],
             on="SOI",
             how="left",
         )
@@ -106,9 +129,9 @@ class GroupsStatuses:
         self.all_products_supply = self.all_products_supply.drop_duplicates()
 
     def _update_all_products_balances(self):
-        self.all_products_balances = pd.merge(
+        self.all_products_balances = merge_on_key(
             self.all_products_balances,
-            self.groups[["GROUP", "SOI"]],
+            self.groups_keys[["GROUP", "SOI"]],
             on="SOI",
             how="left",
         )
@@ -126,16 +149,23 @@ class GroupsStatuses:
         self.all_products_balances = self.all_products_balances.drop_duplicates()
 
     def get_groups_data(self):
-        self.groups = pd.read_excel(self.path_groups, sheet_name="groups")
+        self.groups = read_excel_cached(self.path_groups, sheet_name="groups")
         self.unique_groups = self.groups["GROUP"].unique()
+        # the keys are interned once and joined as codes, GROUP stays categorical
+        # in the merged data
+        self.groups_keys = key_registry.encode_frame(
+            self.groups[["GROUP", "COMPONENT", "SOI"]]
+        )
 
     def get_supply_data(self):
-        self.all_components_supply = pd.read_excel(
+        self.all_components_supply = read_excel_cached(
             self.path_supply, sheet_name="supply_confirmed"
         )
 
     def get_db_info_data(self):
-        self.db_info = CompanionDbReader(path_db=self.path_db)
+        self.db_info = CompanionDbReader(
+            path_db=self.path_db, sql_pushdown=True, snapshot=True
+        )
         self.db_info()
 
     def get_groups_summary(self):
@@ -150,28 +180,36 @@ class GroupsStatuses:
         products_orders = self.all_products_orders.copy()
         products_orders = products_orders[["GROUP", "ORDERS_CUMULATIVE"]]
         products_orders = (
-            products_orders.groupby("GROUP")["ORDERS_CUMULATIVE"].sum().reset_index()
+            products_orders.groupby("GROUP", observed=True)["ORDERS_CUMULATIVE"]
+            .sum()
+            .reset_index()
         )
         products_orders.set_index("GROUP", inplace=True)
 
         products_supply = self.all_products_supply.copy()
         products_supply = products_supply[["GROUP", "SUPPLY_CUMULATIVE"]]
         products_supply = (
-            products_supply.groupby("GROUP")["SUPPLY_CUMULATIVE"].sum().reset_index()
+            products_supply.groupby("GROUP", observed=True)["SUPPLY_CUMULATIVE"]
+            .sum()
+            .reset_index()
         )
         products_supply.set_index("GROUP", inplace=True)
 
         products_balances = self.all_products_balances.copy()
         products_balances = products_balances[["GROUP", "BALANCE_CUMULATIVE"]]
         products_balances = (
-            products_balances.groupby("GROUP")["BALANCE_CUMULATIVE"].min().reset_index()
+            products_balances.groupby("GROUP", observed=True)["BALANCE_CUMULATIVE"]
+            .min()
+            .reset_index()
         )
         products_balances.set_index("GROUP", inplace=True)
 
         components_stock = self.all_components_stock.copy()
         components_stock = components_stock[["GROUP", "TOTAL_STOCK"]]
         components_stock = (
-            components_stock.groupby("GROUP")["TOTAL_STOCK"].sum().reset_index()
+            components_stock.groupby("GROUP", observed=True)["TOTAL_STOCK"]
+            .sum()
+            .reset_index()
         )
         components_stock.set_index("GROUP", inplace=True)
 
@@ -197,10 +235,67 @@ class GroupsStatuses:
             {"BALANCE_CUMULATIVE": "MIN_BALANCE_CUMULATIVE"}, inplace=True
         )
 
-    def _one_group_info(self, group):
-        group_info = pd.DataFrame(
-            self.db_info.groups[self.db_info.groups["GROUP"] == group]
+    def _group_sources(self):
+        return {
+            "db_groups": self.db_info.groups,
+            "db_products": self.db_info.products,
+            "db_components": self.db_info.components,
+            "groups": self.groups,
+            "components_stock": self.all_components_stock,
+            "components_supply": self.all_components_supply,
+            "products_supply": self.all_products_supply,
+            "products_balances": self.all_products_balances,
+            "products_orders": self.all_products_orders,
+        }
+
+    def _data_sheets(self):
+        # sheets with all the data, and whether the index is written
+        return {
+            "GROUPS": (self.groups, True),
+            "ALL_SOI_ORDERS": (self.all_products_orders, False),
+            "ALL_SOI_SUPPLY": (self.all_products_supply, False),
+            "ALL_SOI_BALANCES": (self.all_products_balances, False),
+            "ALL_COMPONENTS_STOCK": (self.all_components_stock, False),
+            "ALL_COMPONENTS_SUPPLY": (self.all_components_supply, False),
+        }
+
+    def index_groups(self):
+        self.groups_index = {}
+        for source, data in self._group_sources().items():
+            partitions = dict(list(data.groupby("GROUP", sort=False, observed=True)))
+            self.groups_index[source] = (partitions, data.iloc[:0])
+
+    def fingerprint_sheets(self):
+        # a group sheet is built only from the rows of the group in every source
+        self.sheets_fingerprints = {
+            "SUMMARY": frame_fingerprint(self.groups_summary, index=True)
+        }
+        for sheet, (data, index) in self._data_sheets().items():
+            self.sheets_fingerprints[sheet] = frame_fingerprint(data, index=index)
+        sources = {
+            source: partition_fingerprints(data, "GROUP")
+            for source, data in self._group_sources().items()
+        }
+        for group in self.unique_groups:
+            self.sheets_fingerprints[f"{group}"] = combine_fingerprints(
+                {
+                    source: fingerprints.get(group)
+                    for source, fingerprints in sources.items()
+                }
+            )
+
+    def get_previous_report(self):
+        directory_path = os.path.dirname(self.path_components)
+        self.previous_manifest = ReportManifest.latest(
+            directory_path, "Report_groups_statuses_", self.layout_version
         )
+
+    def _group_data(self, source, group):
+        partitions, empty = self.groups_index[source]
+        return partitions.get(group, empty).copy()
+
+    def _one_group_info(self, group):
+        group_info = self._group_data("db_groups", group)
         sheets = ["SUMMARY", "ALL_SOI_SUPPLY", "ALL_SOI_BALANCES", "ALL_SOI_ORDERS"]
         for sheet in sheets:
             group_info[sheet] = f'=HYPERLINK("#{sheet}!A1", "{sheet}")'
@@ -209,7 +304,7 @@ class GroupsStatuses:
         return group_info
 
     def _one_group_matrix(self, group):
-        matrix = pd.DataFrame(self.groups[self.groups["GROUP"] == group])
+        matrix = self._group_data("groups", group)
         data = matrix[["SOI", "COMPONENT", "USAGE"]]
         group_matrix = data.pivot_table(
             index="SOI",
@@ -218,9 +313,7 @@ class GroupsStatuses:
             aggfunc="first",
             fill_value=0,
         )
-        group_products_notes = self.db_info.products[
-            self.db_info.products["GROUP"] == group
-        ]
+        group_products_notes = self._group_data("db_products", group)
         group_products_notes.set_index("SOI", inplace=True)
 
         group_matrix = group_matrix.reindex(sorted(group_matrix.columns), axis=1)
@@ -231,14 +324,10 @@ class GroupsStatuses:
         return group_matrix
 
     def _one_group_components_stock(self, group):
-        components_info = pd.DataFrame(
-            self.db_info.components[self.db_info.components["GROUP"] == group]
-        )
+        components_info = self._group_data("db_components", group)
         components_info.set_index("COMPONENT", inplace=True)
         components_info.drop(["GROUP"], axis=1, inplace=True)
-        group_stock = pd.DataFrame(
-            self.all_components_stock[self.all_components_stock["GROUP"] == group]
-        )
+        group_stock = self._group_data("components_stock", group)
         group_stock.set_index("COMPONENT", inplace=True)
         components_info = pd.concat([components_info, group_stock], axis=1)
         components_info.drop(["GROUP"], axis=1, inplace=True)
@@ -252,9 +341,7 @@ class GroupsStatuses:
         return components_info
 
     def _one_group_components_supply(self, group):
-        group_components_supply = pd.DataFrame(
-            self.all_components_supply[self.all_components_supply["GROUP"] == group]
-        )
+        group_components_supply = self._group_data("components_supply", group)
         group_components_supply.drop(["GROUP"], axis=1, inplace=True)
         group_components_supply.set_index("COMPONENT", inplace=True)
         group_components_supply = group_components_supply.sort_index()
@@ -262,9 +349,7 @@ class GroupsStatuses:
         return group_components_supply
 
     def _one_group_products_supply(self, group):
-        group_products_supply = pd.DataFrame(
-            self.all_products_supply[self.all_products_supply["GROUP"] == group]
-        )
+        group_products_supply = self._group_data("products_supply", group)
         group_products_supply.set_index("SOI", inplace=True)
         group_products_supply.drop(["GROUP"], axis=1, inplace=True)
         group_products_supply = group_products_supply.loc[
@@ -275,9 +360,7 @@ class GroupsStatuses:
         return group_products_supply
 
     def _one_group_products_balances(self, group):
-        group_products_balances = pd.DataFrame(
-            self.all_products_balances[self.all_products_balances["GROUP"] == group]
-        )
+        group_products_balances = self._group_data("products_balances", group)
         group_products_balances.set_index("SOI", inplace=True)
         group_products_balances.drop(["GROUP"], axis=1, inplace=True)
         group_products_balances = group_products_balances.loc[
@@ -287,9 +370,7 @@ class GroupsStatuses:
         return group_products_balances
 
     def _one_group_products_orders(self, group):
-        group_products_orders = pd.DataFrame(
-            self.all_products_orders[self.all_products_orders["GROUP"] == group]
-        )
+        group_products_orders = self._group_data("products_orders", group)
         group_products_orders.set_index("SOI", inplace=True)
         group_products_orders.drop(["GROUP"], axis=1, inplace=True)
         group_products_orders = group_products_orders.loc[
@@ -328,76 +409,114 @@ class GroupsStatuses:
             positions.append(len(df) + positions[i] + 2)
         return positions, all_data_group
 
-    def save_to_excel(self):
-        now = datetime.datetime.now()
-        filename = f"Report_groups_statuses_{now.strftime('%d%m%Y_%H%M')}.xlsx"
-        directory_path = os.path.dirname(self.path_components)
-        self.report_file_path = os.path.join(directory_path, filename)
-        writer = pd.ExcelWriter(self.report_file_path)
+    def _write_report(self, reused_sheets: set):
+        writer = StreamingExcelWriter(self.report_file_path)
+        writer.pin_formats()
 
-        self.groups_summary.to_excel(writer, sheet_name=f"SUMMARY", index=True)
-        self.groups.to_excel(writer, sheet_name=f"GROUPS", index=True)
+        # SUMMARY is written first so it is the first sheet of the workbook,
+        # reused sheets are left empty here and copied from the previous report
+        if "SUMMARY" in reused_sheets:
+            writer.get_sheet("SUMMARY")
+        else:
+            writer.write_frame("SUMMARY", self.groups_summary, index=True)
 
-        self.all_products_orders.to_excel(
-            writer, sheet_name=f"ALL_SOI_ORDERS", index=False
-        )
-        self.all_products_supply.to_excel(
-            writer, sheet_name=f"ALL_SOI_SUPPLY", index=False
-        )
-        self.all_products_balances.to_excel(
-            writer, sheet_name=f"ALL_SOI_BALANCES", index=False
-        )
-        self.all_components_stock.to_excel(
-            writer, sheet_name=f"ALL_COMPONENTS_STOCK", index=False
-        )
-        self.all_components_supply.to_excel(
-            writer, sheet_name=f"ALL_COMPONENTS_SUPPLY", index=False
-        )
+        for sheet, (data, index) in self._data_sheets().items():
+            if sheet in reused_sheets:
+                writer.get_sheet(sheet)
+            else:
+                writer.write_frame(sheet, data, index=index)
 
         for group in self.unique_groups:
+            if f"{group}" in reused_sheets:
+                writer.get_sheet(f"{group}")
+                continue
             ready_sheet = self.prepare_one_group_data(group)
             for position, data in zip(ready_sheet[0], ready_sheet[1]):
-                data.to_excel(
-                    writer,
-                    sheet_name=f"{group}",
-                    startrow=position,
-                    index=True,
+                writer.write_frame(f"{group}", data, startrow=position, index=True)
+
+        self._apply_excel_formatting(writer)
+        writer.close()
+
+    def _reuse_previous_sheets(self, reused_sheets: set):
+        previous_path = self.previous_manifest.report_path
+        copied_path = None
+        if os.path.abspath(previous_path) == os.path.abspath(self.report_file_path):
+            # the previous report was saved in the same minute, under this name
+            file, copied_path = tempfile.mkstemp(
+                suffix=".xlsx", dir=os.path.dirname(self.report_file_path)
+            )
+            os.close(file)
+            shutil.copy2(previous_path, copied_path)
+            previous_path = copied_path
+        try:
+            self._write_report(reused_sheets)
+            copied = copy_sheets(previous_path, self.report_file_path, reused_sheets)
+            if copied != len(reused_sheets):
+                raise ValueError(
+                    f"{len(reused_sheets) - copied} sheets missing in {previous_path}"
                 )
+        finally:
+            if copied_path is not None:
+                os.remove(copied_path)
 
-        writer._save()
+    def save_to_excel(self):
+        now = datetime.datetime.now()
+        filename = f"Report_groups_statuses_{now.strftime('%d%m%Y_%H%M')}.xlsx"
+        directory_path = os.path.dirname(self.path_components)
+        self.report_file_path = os.path.join(directory_path, filename)
 
-    def _apply_excel_formatting(self):
-        redFill = PatternFill(
-            start_color="FF7276", end_color="FF7276", fill_type="solid"
-        )
-        rule_zero_less = CellIsRule(
-            operator="lessThan", formula=[0], stopIfTrue=True, fill=redFill
-        )
-        rule_equal = CellIsRule(
-            operator="equal", formula=['"Not active - EOL"'], fill=redFill
-        )
-        workbook = load_workbook(filename=self.report_file_path)
-        blank_sheet_position = workbook.worksheets.index(workbook["SUMMARY"])
-        sheets = workbook._sheets.copy()
-        sheets.insert(0, sheets.pop(blank_sheet_position))
-        workbook._sheets = sheets
-
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            sheet.conditional_formatting.add("B2:CT1000", rule_zero_less)
-            sheet.conditional_formatting.add("B2:J100", rule_equal)
-            for column in range(ord("A"), ord("J") + 1):
-                column_letter = chr(column)
-                sheet.column_dimensions[column_letter].width = 18
-
-        workbook.save(self.report_file_path)
+        reused_sheets = set()
+        if self.previous_manifest is not None:
+            reused_sheets = self.previous_manifest.unchanged_sheets(
+                self.sheets_fingerprints
+            )
+        if reused_sheets:
+            try:
+                self._reuse_previous_sheets(reused_sheets)
+            except Exception as e:
+                print(f"Error reusing sheets of the previous report: {e}")
+                self._write_report(set())
+        else:
+            self._write_report(set())
+
+        # the manifest is only kept for the next incremental run
+        if self.incremental:
+            try:
+                ReportManifest(self.report_file_path, self.layout_version).save(
+                    self.sheets_fingerprints
+                )
+            except Exception as e:
+                print(f"Error saving report manifest: {e}")
+        report_saved(self.report_file_path)
+
+    def _apply_excel_formatting(self, writer):
+        red_fill = writer.add_format({"bg_color": "#FF7276"})
+        rule_zero_less = {
+            "type": "cell",
+            "criteria": "<",
+            "value": 0,
+            "format": red_fill,
+            "stop_if_true": True,
+        }
+        rule_equal = {
+            "type": "cell",
+            "criteria": "==",
+            "value": '"Not active - EOL"',
+            "format": red_fill,
+        }
+        writer.add_conditional_format("B2:CT1000", rule_zero_less)
+        writer.add_conditional_format("B2:J100", rule_equal)
+        writer.set_column_width(0, 9, 18)
 
     def __call__(self):
-        self.get_groups_data()
-        self.get_db_info_data()
-        self.get_components_data()
-        self.get_products_data()
-        self.get_supply_data()
-        self.get_groups_summary()
-        self.save_to_excel()
-        self._apply_excel_formatting()
+        run_stage(self.get_groups_data)
+        run_stage(self.get_db_info_data)
+        run_stage(self.get_components_data)
+        run_stage(self.get_products_data)
+        run_stage(self.get_supply_data)
+        run_stage(self.get_groups_summary)
+        run_stage(self.index_groups)
+        if self.incremental:
+            run_stage(self.fingerprint_sheets)
+            run_stage(self.get_previous_report)
+        run_stage(self.save_to_excel)
@@ -1,6 +1,9 @@
 import os, datetime
 import numpy as np
 import pandas as pd
+from assistant_scripts.read_data.data_cache import read_excel_cached
+from assistant_scripts.read_data.key_registry import merge_on_key
+from assistant_scripts.other_functions.pipeline_stages import run_stage, report_saved
 
 
 class CreateSupplyInfo:
@@ -27,7 +30,7 @@ class CreateSupplyInfo:
 
     def read_supply_data(self):
         try:
-            self.supply_info_raw = pd.read_excel(
+            self.supply_info_raw = read_excel_cached(
                 self.path_supply, sheet_name="supply_confirmed"
             )
             self.components_info = pd.read_excel(self.path_components)
@@ -75,8 +78,8 @@ class CreateSupplyInfo:
         )
 
     def merge_component_info(self):
-        self.supply_info = pd.merge(
-            self.supply_info, self.components_info, how="left", on="COMPONENT"
+        self.supply_info = merge_on_key(
+            self.supply_info, self.components_info, on="COMPONENT", how="left"
         )
         self.supply_info = self.supply_info.drop_duplicates()
 
@@ -111,13 +114,14 @@ class CreateSupplyInfo:
         writer = pd.ExcelWriter(report_file_path)
         self.supply_info.to_excel(writer, sheet_name=f"Sheet1", index=False)
         writer._save()
+        report_saved(report_file_path)
 
     def __call__(self):
-        self.read_supply_data()
-        self.drop_columns()
-        self.rename_suppliers()
-        self.calucate_dates()
-        self.merge_component_info()
-        self.add_more_info()
-        self.final_update()
-        self.save_to_excel()
+        run_stage(self.read_supply_data)
+        run_stage(self.drop_columns)
+        run_stage(self.rename_suppliers)
+        run_stage(self.calucate_dates)
+        run_stage(self.merge_component_info)
+        run_stage(self.add_more_info)
+        run_stage(self.final_update)
+        run_stage(self.save_to_excel)
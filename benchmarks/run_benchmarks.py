@@ -0,0 +1,265 @@
+import os, sys, json, shutil, argparse, platform, tempfile, time, tracemalloc
+
+from benchmarks.synthetic_data import SCALES, generate_dataset
+
+# run from the repository root: python -m benchmarks.run_benchmarks --scale small
+# baselines/1000_5_200.json holds a cold run of the default small scale (1000
+# components, 5 products files of 200 products, seeded data), taken with
+# --save-baseline, save a new one after a change that is meant to be faster,
+# timings compare only on the same machine, the peak MB everywhere
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def build_benchmarks(paths: dict, workers: int):
+    # imported here, so PATH_CACHE set by main() is used by every reader
+    from assistant_scripts.read_data.read_components_data import ComponentsDataReader
+    from assistant_scripts.read_data.read_products_data import ProductsDataReader
+    from assistant_scripts.read_data.read_companion_data import CompanionDbReader
+    from assistant_scripts.read_data.read_factory_data import FactoryDataReader
+    from assistant_scripts.read_data.read_supply_data import SupplyDataReader
+    from assistant_scripts.read_data.read_dispoview_data import DispoviewDataReader
+    from assistant_scripts.reports.report_components_balances import (
+        ComponentsBalances,
+    )
+    from assistant_scripts.reports.report_groups_statuses import GroupsStatuses
+    from assistant_scripts.reports.report_groups_dispoview import GroupsDispoview
+    from assistant_scripts.reports.report_supply_info import CreateSupplyInfo
+
+    return {
+        "components_reader": lambda: ComponentsDataReader(
+            file_path=paths["components"],
+            fix_weeks=True,
+            add_forecast=False,
+            to_excel=False,
+        ),
+        "components_reader_streaming": lambda: ComponentsDataReader(
+            file_path=paths["components"],
+            fix_weeks=True,
+            add_forecast=False,
+            to_excel=False,
+            use_cache=False,
+            streaming=True,
+        ),
+        "products_reader": lambda: ProductsDataReader(
+            folder_path=paths["products"], workers=1
+        ),
+        "products_reader_parallel": lambda: ProductsDataReader(
+            folder_path=paths["products"], workers=workers
+        ),
+        "companion_reader": lambda: CompanionDbReader(
+            path_db=paths["db"], sql_pushdown=True
+        ),
+        "companion_reader_snapshot": lambda: CompanionDbReader(
+            path_db=paths["db"], sql_pushdown=True, snapshot=True
+        ),
+        "dispoview_reader": lambda: DispoviewDataReader(
+            dispo_file_path=paths["dispoview"]
+        ),
+        "factory_report": lambda: FactoryDataReader(
+            factory_data_path=paths["factory"], db_path=paths["db"]
+        ),
+        "factory_report_chunked": lambda: FactoryDataReader(
+            factory_data_path=paths["factory"],
+            db_path=paths["db"],
+            chunksize=200000,
+        ),
+        "supply_data": lambda: SupplyDataReader(
+            path_supply=paths["supply"], path_groups=paths["groups"]
+        ),
+        "supply_info": lambda: CreateSupplyInfo(
+            path_supply=paths["supply_confirmed"],
+            path_components=paths["components_info"],
+            supplier1="Alpha Ltd,ALP",
+            supplier2="Beta Inc,BET",
+            supplier3="Gamma,GAM",
+            incoterms="FCA",
+            t_mode="Sea",
+        ),
+        "components_balances": lambda: ComponentsBalances(
+            path_groups=paths["groups"],
+            path_components=paths["components"],
+            path_supply=paths["supply_confirmed"],
+        ),
+        "groups_dispoview": lambda: GroupsDispoview(
+            dispo_file_path=paths["dispoview"],
+            groups_file_path=paths["groups"],
+            supply_file_path=paths["supply_confirmed"],
+        ),
+        "groups_statuses": lambda: GroupsStatuses(
+            path_components=paths["components"],
+            path_products=paths["products"],
+            path_groups=paths["groups"],
+            path_supply=paths["supply_confirmed"],
+            path_db=paths["db"],
+            products_workers=workers,
+        ),
+    }
+
+
+def measure(create, trace_memory: bool):
+    # tracemalloc sees numpy and pandas buffers, but not process pool workers
+    if trace_memory:
+        tracemalloc.start()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        create()()
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    result = {"wall_s": round(wall, 4), "cpu_s": round(cpu, 4)}
+    if peak is not None:
+        result["peak_mb"] = round(peak / 2**20, 2)
+    return result
+
+
+def clear_caches():
+    from assistant_scripts.read_data.data_cache import ParsedDataCache
+    from assistant_scripts.read_data.companion_snapshot import CompanionDbSnapshot
+
+    shutil.rmtree(os.environ["PATH_CACHE"], ignore_errors=True)
+    ParsedDataCache._file_hashes.clear()
+    CompanionDbSnapshot._sessions.clear()
+
+
+def run_benchmark(create, repeat: int, warm: bool, trace_memory: bool):
+    # a cold run starts from empty caches, a warm run from filled ones
+    if warm:
+        create()()
+    runs = []
+    for _ in range(repeat):
+        if not warm:
+            clear_caches()
+        runs.append(measure(create, trace_memory))
+    best = min(runs, key=lambda run: run["wall_s"])
+    return {**best, "runs": len(runs)}
+
+
+def baseline_path(dataset: str, warm: bool):
+    return os.path.join(BASELINES_DIR, f"{dataset}{'_warm' if warm else ''}.json")
+
+
+def load_baseline(path: str):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def save_baseline(path: str, results: dict, settings: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "settings": settings,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+
+
+def format_change(value, baseline_value):
+    if baseline_value in (None, 0) or value is None:
+        return ""
+    return f"{(value - baseline_value) / baseline_value * 100:+.1f}%"
+
+
+def print_results(results: dict, baseline: dict):
+    print(
+        f"{'benchmark':32} {'wall s':>10} {'cpu s':>10} {'peak MB':>10} "
+        f"{'vs wall':>9} {'vs peak':>9}"
+    )
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:32} error: {result['error']}")
+            continue
+        base = baseline.get(name, {})
+        peak = result.get("peak_mb")
+        print(
+            f"{name:32} {result['wall_s']:>10.3f} {result['cpu_s']:>10.3f} "
+            f"{'-' if peak is None else f'{peak:.1f}':>10} "
+            f"{format_change(result['wall_s'], base.get('wall_s')):>9} "
+            f"{format_change(peak, base.get('peak_mb')):>9}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time and memory profile readers and reports on synthetic data."
+    )
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--components", type=int, help="override the scale")
+    parser.add_argument("--product-files", type=int, help="override the scale")
+    parser.add_argument("--products-per-file", type=int, help="override the scale")
+    parser.add_argument(
+        "--data-dir",
+        help="where the synthetic files are kept between runs "
+        "(default: a folder per scale in the temp directory)",
+    )
+    parser.add_argument("--only", nargs="+", help="names of benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--warm", action="store_true", help="measure with a filled cache"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="process pool size"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip tracemalloc, it slows runs down"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as the baseline"
+    )
+    parser.add_argument("--list", action="store_true", help="list benchmark names")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = dict(SCALES[args.scale])
+    for name in ["components", "product_files", "products_per_file"]:
+        if getattr(args, name) is not None:
+            settings[name] = getattr(args, name)
+
+    dataset = "{components}_{product_files}_{products_per_file}".format(**settings)
+    data_dir = args.data_dir or os.path.join(
+        tempfile.gettempdir(), "assistant_benchmarks", dataset
+    )
+    os.environ["PATH_CACHE"] = os.path.join(data_dir, "cache")
+
+    if args.list:
+        print("\n".join(build_benchmarks({}, args.workers)))
+        return 0
+
+    print(f"Generating data in {data_dir} ...")
+    paths = generate_dataset(data_dir, **settings)
+    benchmarks = build_benchmarks(paths, args.workers)
+    names = args.only or list(benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}")
+        return 2
+
+    results = {}
+    for name in names:
+        print(f"Running {name} ...")
+        try:
+            results[name] = run_benchmark(
+                benchmarks[name], args.repeat, args.warm, not args.no_memory
+            )
+        except Exception as e:
+            results[name] = {"error": str(e)}
+
+    path = baseline_path(dataset, args.warm)
+    print_results(results, load_baseline(path))
+    if args.save_baseline:
+        save_baseline(path, results, settings)
+        print(f"Baseline saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+import os, json, random, sqlite3, datetime
+import pandas as pd
+
+from datetime import timedelta
+from openpyxl import Workbook
+
+SCALES = {
+    "small": {"components": 1000, "product_files": 5, "products_per_file": 200},
+    "medium": {"components": 10000, "product_files": 20, "products_per_file": 500},
+    "large": {"components": 50000, "product_files": 100, "products_per_file": 500},
+}
+
+GOOD_SLOCS = ["W101", "W10A", "W191", "W1LA", "W1PA", "W104", "W2Y3", "WIP", "W1L0"]
+OTHER_SLOCS = ["X900", "Q100", "R200"]
+
+DISPO_DROPPED_COLUMNS = [
+    "SAP - Material Description",
+    "SAP - Material Number (106xxx)",
+    "SAP - Purchasing Group",
+    "StratBuyer",
+    "MRPtype",
+    "SAP - MRP Controller",
+    "FrameContract",
+    "SAP - Planned Deliv. Time",
+    "Trading Partner Code",
+    "SAP - Vendor Name",
+]
+
+
+def mondays(n_weeks: int, weeks_back: int = 3):
+    today = datetime.date.today()
+    start = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks_back)
+    return [start + timedelta(weeks=i) for i in range(n_weeks)]
+
+
+def week_headers(n_weeks: int):
+    # SAP splits a week crossing the month end into a second "W Total" column
+    # starting on the first day of the new month
+    headers = []
+    for monday in mondays(n_weeks):
+        headers.append(("W Total", f"{monday.month}/{monday.day})"))
+        sunday = monday + timedelta(days=6)
+        if sunday.month != monday.month:
+            first_day = sunday.replace(day=1)
+            headers.append(("W Total", f"{first_day.month}/{first_day.day})"))
+    return headers
+
+
+def component_name(number: int):
+    return f"COMP{number:05d}"
+
+
+def product_name(file_number: int, number: int):
+    return f"SOI{file_number:03d}-{number:04d}"
+
+
+def write_c711(path: str, n_components: int, n_weeks: int = 30, seed: int = 1):
+    rnd = random.Random(seed)
+    weeks = week_headers(n_weeks)
+    width = 21 + len(weeks) + 2
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+
+    # 7 rows of preamble under the title row, weeks header on rows 9 and 10
+    sheet.append([f"H{i}" for i in range(width)])
+    for row in range(7):
+        sheet.append([f"preamble {row}"] + [None] * (width - 1))
+    sheet.append(
+        ["x"] * 11 + [None] * 10 + [week[0] for week in weeks] + ["M Total"] * 2
+    )
+    sheet.append(
+        ["x"] * 11 + [None] * 10 + [week[1] for week in weeks] + ["11/2026)"] * 2
+    )
+    for row in range(5):
+        sheet.append(["skip"] + [None] * (width - 1))
+
+    # 24 rows per component, the name is written with a space as SAP does
+    for number in range(n_components):
+        for row_number in range(1, 25):
+            row = ["a"] * 11 + [None] * 10
+            if row_number == 12:
+                row[11] = f"COMP {number:05d}"
+            if row_number == 6:
+                row[12] = rnd.randint(0, 500)
+            if row_number == 8 and number % 3:
+                row[12] = f"CZs{rnd.randint(0, 500)}"
+            row[18] = f"label {row_number}"
+            if row_number in (1, 2):
+                values = [rnd.randint(0, 50) for _ in weeks]
+            else:
+                values = [None] * len(weeks)
+            sheet.append(row + values + [5, 7])
+    workbook.save(path)
+
+
+def write_c502(
+    path: str, file_number: int, n_products: int, n_weeks: int = 30, seed: int = 1
+):
+    rnd = random.Random(seed + file_number)
+    weeks = week_headers(n_weeks)
+    width = 9 + len(weeks) + 2
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+
+    sheet.append([f"H{i}" for i in range(width)])
+    for row in range(11):
+        sheet.append([f"preamble {row}"] + [None] * (width - 1))
+    sheet.append(
+        ["x"] * 4 + [None] * 5 + [week[0] for week in weeks] + ["After", "Total"]
+    )
+    sheet.append(["x"] * 4 + [None] * 5 + [week[1] for week in weeks] + ["x", "y"])
+    sheet.append(["dropped"] + [None] * (width - 1))
+
+    # 26 rows per product: SOI on row 3, supply 5, orders 13, balances 24
+    for number in range(n_products):
+        for row_number in range(1, 27):
+            row = ["a"] * 4 + [None] * 5
+            if row_number == 3:
+                row[4] = product_name(file_number, number)
+            row[8] = f"label {row_number}"
+            if row_number in (5, 13, 24):
+                values = [rnd.randint(-20, 50) for _ in weeks]
+            else:
+                values = [None] * len(weeks)
+            sheet.append(row + values + [3, 9])
+    workbook.save(path)
+
+
+def build_groups(
+    n_components: int,
+    product_files: int,
+    products_per_file: int,
+    components_per_group: int = 5,
+    products_per_group: int = 4,
+    seed: int = 1,
+):
+    rnd = random.Random(seed)
+    products = [
+        product_name(file_number, number)
+        for file_number in range(product_files)
+        for number in range(products_per_file)
+    ]
+    rows = []
+    for group_number in range(max(n_components // components_per_group, 1)):
+        group = f"G{group_number:05d}"
+        status = "Active" if group_number % 5 else "Not active - EOL"
+        components = rnd.sample(range(n_components), components_per_group)
+        for product in rnd.sample(products, products_per_group):
+            for number in components:
+                rows.append(
+                    {
+                        "GROUP": group,
+                        "SOI": product,
+                        "COMPONENT": component_name(number),
+                        "USAGE": rnd.randint(1, 4),
+                        "GROUP_DESCRIPTION": f"description {group_number}",
+                        "GROUP_STATUS": status,
+                        "CODENUMBER": f"CN{number:05d}",
+                    }
+                )
+    return pd.DataFrame(rows)
+
+
+def write_groups(path: str, groups: pd.DataFrame):
+    groups.to_excel(path, sheet_name="groups", index=False)
+
+
+def write_supply_confirmed(path: str, groups: pd.DataFrame, n_rows: int, seed: int = 1):
+    rnd = random.Random(seed)
+    group_components = groups[["GROUP", "COMPONENT"]].drop_duplicates()
+    group_components = group_components.values.tolist()
+    weeks = [
+        datetime.datetime.combine(monday, datetime.time())
+        for monday in mondays(12, weeks_back=0)
+    ]
+    rows = []
+    for _ in range(n_rows):
+        group, component = rnd.choice(group_components)
+        rows.append(
+            {
+                "GROUP": group,
+                "COMPONENT": component,
+                "SUPPLIER": rnd.choice(["Alpha Ltd", "Beta Inc", "Gamma"]),
+                "ETD_DATE_WEEK": rnd.choice(weeks),
+                "QTY": rnd.randint(1, 100),
+                "STATUS": None,
+                "SHIPMENT_ID": None,
+                "COMMENT": None,
+            }
+        )
+    supply = pd.DataFrame(rows)
+    with pd.ExcelWriter(path) as writer:
+        supply.to_excel(writer, sheet_name="supply_confirmed", index=False)
+        supply.sample(frac=0.5, random_state=seed).to_excel(
+            writer, sheet_name="supply_requested", index=False
+        )
+
+
+def write_supply(path: str, groups: pd.DataFrame, n_rows: int, seed: int = 1):
+    rnd = random.Random(seed)
+    weeks = [
+        datetime.datetime.combine(monday, datetime.time())
+        for monday in mondays(20, weeks_back=4)
+    ]
+    components = groups["COMPONENT"].unique().tolist()
+    width = 8 + len(weeks)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("SUPPLY")
+    sheet.append([f"H{i}" for i in range(width)])
+    sheet.append(["preamble"] * width)
+    sheet.append(
+        ["a"] * 4 + ["component", "factory\n(destination)", "date", "Supplier"] + weeks
+    )
+    for _ in range(n_rows):
+        row = ["a"] * 4 + [
+            rnd.choice(components),
+            rnd.choice(["CZ", "CZ", "DE"]),
+            rnd.choice(["supply: C", "supply: R"]),
+            rnd.choice(["Alpha", "Beta"]),
+        ]
+        values = [rnd.choice([None, None, rnd.randint(1, 90)]) for _ in weeks]
+        sheet.append(row + values)
+    workbook.save(path)
+
+
+def write_zpp066(path: str, n_lines: int, n_components: int, seed: int = 1):
+    rnd = random.Random(seed)
+    slocs = GOOD_SLOCS + OTHER_SLOCS
+    with open(path, "w") as file:
+        file.write("Plant\tFJJ P/N\tSLoc\tAvailable Qty\tBatch\n")
+        for line in range(n_lines):
+            # a third of the lines are parts that are not in the database
+            component = component_name(rnd.randint(0, n_components * 3 // 2))
+            quantity = f"{rnd.randint(0, 20000):,}"
+            file.write(f"CZ01\t{component}\t{rnd.choice(slocs)}\t{quantity}\tB{line}\n")
+
+
+def write_dispoview(path: str, groups: pd.DataFrame, n_weeks: int = 20, seed=1):
+    rnd = random.Random(seed)
+    weeks = []
+    for monday in mondays(n_weeks, weeks_back=0):
+        weeks.append(f"W{monday.isocalendar().week}.{monday.year}")
+    rows = []
+    for codenumber in sorted(groups["CODENUMBER"].unique()):
+        for figure in ["Stock", "NetForecast", "CustOrders"]:
+            row = {column: "x" for column in DISPO_DROPPED_COLUMNS}
+            row["SAP - Product Number Print"] = codenumber
+            row["Figure"] = figure
+            for week in weeks:
+                # SAP exports numbers as text with a leading apostrophe
+                row[week] = f"'{rnd.randint(0, 300)}"
+            rows.append(row)
+    pd.DataFrame(rows).to_excel(path, index=False)
+
+
+def write_components_info(path: str, groups: pd.DataFrame):
+    components = groups["COMPONENT"].unique()
+    pd.DataFrame(
+        {
+            "COMPONENT": components,
+            "Codenumber": [c.replace("COMP", "CN") for c in components],
+            "Part number": components,
+            "Description": "description",
+        }
+    ).to_excel(path, index=False)
+
+
+def write_companion_db(path: str, groups: pd.DataFrame, comments: int = 3, seed=1):
+    rnd = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE my_group (id INTEGER PRIMARY KEY, name TEXT, info TEXT);
+        CREATE TABLE my_group_comment (
+            id INTEGER PRIMARY KEY, product_id INTEGER, text TEXT, timestamp TEXT
+        );
+        CREATE TABLE my_group_product (
+            id INTEGER PRIMARY KEY, my_group_id INTEGER, soi_id INTEGER,
+            component_id INTEGER
+        );
+        CREATE TABLE soi (
+            id INTEGER PRIMARY KEY, name TEXT, status TEXT, note TEXT,
+            "check" INTEGER, dummy INTEGER
+        );
+        CREATE TABLE soi_comment (
+            id INTEGER PRIMARY KEY, product_id INTEGER, text TEXT, timestamp TEXT
+        );
+        CREATE TABLE component (
+            id INTEGER PRIMARY KEY, name TEXT, status TEXT, note TEXT,
+            "check" INTEGER, supplier TEXT
+        );
+        CREATE TABLE component_comment (
+            id INTEGER PRIMARY KEY, product_id INTEGER, text TEXT, timestamp TEXT
+        );
+        """)
+    group_ids = {name: i for i, name in enumerate(groups["GROUP"].unique(), 1)}
+    product_ids = {name: i for i, name in enumerate(groups["SOI"].unique(), 1)}
+    component_ids = {name: i for i, name in enumerate(groups["COMPONENT"].unique(), 1)}
+    conn.executemany(
+        "INSERT INTO my_group VALUES (?, ?, ?)",
+        [(i, name, "info") for name, i in group_ids.items()],
+    )
+    conn.executemany(
+        "INSERT INTO soi VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, name, "Active", "note", 0, 0) for name, i in product_ids.items()],
+    )
+    conn.executemany(
+        "INSERT INTO component VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (i, name, "Active" if i % 4 else "Inactive", "note", 0, "supplier")
+            for name, i in component_ids.items()
+        ],
+    )
+    links = set()
+    for row in groups[["GROUP", "SOI", "COMPONENT"]].itertuples(index=False):
+        links.add((group_ids[row.GROUP], product_ids[row.SOI], None))
+        links.add((group_ids[row.GROUP], None, component_ids[row.COMPONENT]))
+    conn.executemany(
+        "INSERT INTO my_group_product (my_group_id, soi_id, component_id) "
+        "VALUES (?, ?, ?)",
+        sorted(links, key=str),
+    )
+
+    # comments are added in time order, like in the companion app
+    first_timestamp = datetime.datetime(2024, 1, 1)
+    for table, ids in [
+        ("my_group_comment", group_ids),
+        ("soi_comment", product_ids),
+        ("component_comment", component_ids),
+    ]:
+        rows = []
+        for comment_number in range(comments):
+            for i in ids.values():
+                timestamp = first_timestamp + timedelta(hours=rnd.randint(0, 5000))
+                rows.append(
+                    (
+                        i,
+                        f"comment {comment_number} for {i}",
+                        timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                    )
+                )
+        rows.sort(key=lambda row: row[2])
+        conn.executemany(
+            f"INSERT INTO {table} (product_id, text, timestamp) VALUES (?, ?, ?)",
+            rows,
+        )
+    conn.commit()
+    conn.close()
+
+
+def dataset_paths(data_dir: str):
+    return {
+        "components": os.path.join(data_dir, "C711.xlsx"),
+        "products": os.path.join(data_dir, "products"),
+        "groups": os.path.join(data_dir, "groups.xlsx"),
+        "supply_confirmed": os.path.join(data_dir, "supply_confirmed.xlsx"),
+        "supply": os.path.join(data_dir, "SUPPLY.xlsx"),
+        "factory": os.path.join(data_dir, "zpp066.txt"),
+        "dispoview": os.path.join(data_dir, "dispoview.xlsx"),
+        "components_info": os.path.join(data_dir, "components_info.xlsx"),
+        "db": os.path.join(data_dir, "companion.db"),
+    }
+
+
+def generate_dataset(
+    data_dir: str,
+    components: int,
+    product_files: int,
+    products_per_file: int,
+    seed: int = 1,
+):
+    paths = dataset_paths(data_dir)
+    settings = {
+        "components": components,
+        "product_files": product_files,
+        "products_per_file": products_per_file,
+        "seed": seed,
+    }
+    manifest_path = os.path.join(data_dir, "dataset.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            if json.load(file) == settings:
+                return paths
+
+    os.makedirs(paths["products"], exist_ok=True)
+    for file_name in os.listdir(paths["products"]):
+        os.remove(os.path.join(paths["products"], file_name))
+
+    groups = build_groups(components, product_files, products_per_file, seed=seed)
+    write_groups(paths["groups"], groups)
+    write_c711(paths["components"], components, seed=seed)
+    for file_number in range(product_files):
+        write_c502(
+            os.path.join(paths["products"], f"C502_{file_number:03d}.xlsx"),
+            file_number,
+            products_per_file,
+            seed=seed,
+        )
+    # Excel keeps a lock file next to an opened workbook
+    with open(os.path.join(paths["products"], "~$C502_000.xlsx"), "w") as file:
+        file.write("lock")
+    write_supply_confirmed(paths["supply_confirmed"], groups, components, seed=seed)
+    write_supply(paths["supply"], groups, components // 2, seed=seed)
+    write_zpp066(paths["factory"], components * 20, components, seed=seed)
+    write_dispoview(paths["dispoview"], groups, seed=seed)
+    write_components_info(paths["components_info"], groups)
+    write_companion_db(paths["db"], groups, seed=seed)
+
+    with open(manifest_path, "w") as file:
+        json.dump(settings, file)
+    return paths
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from assistant_scripts.read_data.block_tensor import BlockTensor
+
+
+def blocks_frame(blocks, rows_per_block=3):
+    data = pd.DataFrame(
+        {
+            "NAME": [f"B{i // rows_per_block}" for i in range(blocks * rows_per_block)],
+            "1/6": [f"'{i},000" for i in range(blocks * rows_per_block)],
+            "1/13": [None, "text", 7.0] * blocks,
+        }
+    )
+    return data
+
+
+def test_from_frame_parses_selected_rows_only():
+    tensor = BlockTensor.from_frame(
+        blocks_frame(2),
+        rows_per_block=3,
+        meta_columns=["NAME"],
+        week_columns=["1/6", "1/13"],
+        rows=[3, 1],
+    )
+    assert tensor.values.shape == (2, 2, 2)
+    assert tensor.row(1).tolist() == [[0, 0], [3000, 0]]
+    assert tensor.row(3).tolist() == [[2000, 7], [5000, 7]]
+    tensor.set_index(1, "NAME", "BLOCK")
+    assert tensor.row_frame(3)["BLOCK"].tolist() == ["B0", "B1"]
+
+
+def test_from_frame_rejects_bad_cells_in_selected_rows():
+    with pytest.raises(ValueError):
+        BlockTensor.from_frame(
+            blocks_frame(1),
+            rows_per_block=3,
+            meta_columns=["NAME"],
+            week_columns=["1/6", "1/13"],
+            rows=[2],
+        )
+
+
+def test_from_frame_warns_about_partial_block(capsys):
+    data = blocks_frame(2).iloc[:5]
+    tensor = BlockTensor.from_frame(
+        data,
+        rows_per_block=3,
+        meta_columns=["NAME"],
+        week_columns=["1/6"],
+        rows=[1],
+    )
+    assert len(tensor) == 1
+    assert "last 2 rows" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import os
+import pandas as pd
+
+from assistant_scripts.read_data.data_cache import ParsedDataCache, read_excel_cached
+
+
+def write_source(path, content: bytes):
+    with open(path, "wb") as file:
+        file.write(content)
+    return str(path)
+
+
+def test_cache_hits_for_the_same_content(tmp_path):
+    frame = pd.DataFrame({"a": [1, 2]})
+    first = write_source(tmp_path / "first.xlsx", b"same content")
+    copy = write_source(tmp_path / "copy.xlsx", b"same content")
+    ParsedDataCache(first, "reader", 1, cache_dir=tmp_path / "cache").save(
+        {"data": frame}
+    )
+
+    cached = ParsedDataCache(copy, "reader", 1, cache_dir=tmp_path / "cache").load(
+        ["data"]
+    )
+    assert cached["data"].equals(frame)
+
+
+def test_cache_misses_when_content_reader_version_or_params_change(tmp_path):
+    source = write_source(tmp_path / "source.xlsx", b"content")
+    cache_dir = tmp_path / "cache"
+    ParsedDataCache(source, "reader", 1, {"sheet": "A"}, cache_dir).save(
+        {"data": pd.DataFrame({"a": [1]})}
+    )
+
+    assert ParsedDataCache(source, "reader", 1, {"sheet": "A"}, cache_dir).load(
+        ["data"]
+    )
+    for reader, version, params in [
+        ("other", 1, {"sheet": "A"}),
+        ("reader", 2, {"sheet": "A"}),
+        ("reader", 1, {"sheet": "B"}),
+    ]:
+        cache = ParsedDataCache(source, reader, version, params, cache_dir)
+        assert cache.load(["data"]) is None
+
+    stat = os.stat(source)
+    write_source(source, b"changed")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    cache = ParsedDataCache(source, "reader", 1, {"sheet": "A"}, cache_dir)
+    assert cache.load(["data"]) is None
+
+
+def test_missing_frame_is_a_miss(tmp_path):
+    source = write_source(tmp_path / "source.xlsx", b"content")
+    cache = ParsedDataCache(source, "reader", 1, cache_dir=tmp_path / "cache")
+    cache.save({"data": pd.DataFrame({"a": [1]})})
+    assert cache.load(["data", "other"]) is None
+
+
+def test_chunks_round_trip(tmp_path):
+    source = write_source(tmp_path / "source.xlsx", b"content")
+    cache = ParsedDataCache(source, "reader", 1, cache_dir=tmp_path / "cache")
+    chunks = [pd.DataFrame({"a": [i]}) for i in range(3)]
+    assert cache.load_chunks("rows") is None
+
+    assert [x["a"][0] for x in cache.save_chunks("rows", iter(chunks))] == [0, 1, 2]
+    assert [x["a"][0] for x in cache.load_chunks("rows")] == [0, 1, 2]
+
+
+def test_read_excel_cached_reads_the_file_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH_CACHE", str(tmp_path / "cache"))
+    path = tmp_path / "data.xlsx"
+    pd.DataFrame({"a": [1, 2]}).to_excel(path, sheet_name="Sheet1", index=False)
+    first = read_excel_cached(str(path), "Sheet1")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("read from the file again")
+
+    monkeypatch.setattr(pd, "read_excel", fail)
+    assert read_excel_cached(str(path), "Sheet1").equals(first)
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from assistant_scripts.other_functions.excel_formulas import (
+    FormulaSheet,
+    column_letter,
+    excel_rows,
+    render_formulas,
+)
+
+
+def test_render_formulas_puts_the_row_of_every_formula():
+    formulas = render_formulas(
+        "=SUMIFS({values},{groups},$C{row})+D{row}",
+        excel_rows(3),
+        values="Stock_QTY",
+        groups="Stock_GROUP",
+    )
+    assert formulas.tolist() == [
+        "=SUMIFS(Stock_QTY,Stock_GROUP,$C2)+D2",
+        "=SUMIFS(Stock_QTY,Stock_GROUP,$C3)+D3",
+        "=SUMIFS(Stock_QTY,Stock_GROUP,$C4)+D4",
+    ]
+
+
+def test_render_formulas_edge_cases():
+    formulas = render_formulas("={previous}{row}", [5, 7], previous="E")
+    assert formulas.tolist() == ["=E5", "=E7"]
+    assert render_formulas("=1", excel_rows(2)).tolist() == ["=1", "=1"]
+    assert render_formulas("=A{row}", excel_rows(0)).tolist() == []
+
+
+def test_excel_rows():
+    assert excel_rows(3).tolist() == [2, 3, 4]
+    assert excel_rows(2, first_row=5).tolist() == [5, 6]
+
+
+def test_formula_sheet_ranges_are_bounded_to_the_rows():
+    data = pd.DataFrame({"GROUP": ["a", "b", "c"], "QTY": [1, 2, 3]})
+    sheet = FormulaSheet("Supply confirmed", data)
+
+    assert sheet.range("QTY") == "Supply confirmed!$B$2:$B$4"
+    assert sheet.range("GROUP", absolute_column=False) == "Supply confirmed!A$2:A$4"
+    assert sheet.range_at(27) == "Supply confirmed!$AB$2:$AB$4"
+    assert sheet.name("QTY") == "Supply_confirmed_QTY"
+    assert column_letter(27) == "AB"
+
+
+def test_formula_sheet_of_an_empty_frame_gets_one_cell():
+    sheet = FormulaSheet("Stock", pd.DataFrame(columns=["GROUP"]))
+    assert sheet.range("GROUP") == "Stock!$A$2:$A$2"
+
+
+def test_define_names():
+    class Writer:
+        def __init__(self):
+            self.names = {}
+
+        def define_name(self, name, formula):
+            self.names[name] = formula
+
+    writer = Writer()
+    data = pd.DataFrame({"GROUP": ["a", "b"], "QTY": [1, 2]})
+    FormulaSheet("Stock", data).define_names(writer, ["QTY"])
+    assert writer.names == {"Stock_QTY": "=Stock!$B$2:$B$3"}
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from assistant_scripts.read_data.key_registry import (
+    KeyRegistry,
+    key_registry,
+    merge_on_key,
+)
+
+left = pd.DataFrame({"COMPONENT": ["A", "B", "C", None], "QTY": [1, 2, 3, 4]})
+right = pd.DataFrame(
+    {"COMPONENT": ["C", "A", "D", "A"], "GROUP": ["g1", "g2", "g3", "g4"]}
+)
+
+
+@pytest.mark.parametrize("how", ["left", "inner"])
+def test_merge_on_key_matches_pandas(how):
+    merged = merge_on_key(left, right, on="COMPONENT", how=how)
+    expected = pd.merge(left, right, on="COMPONENT", how=how)
+    pd.testing.assert_frame_equal(merged, expected)
+
+
+@pytest.mark.parametrize("how", ["right", "outer", "cross"])
+def test_merge_on_key_rejects_other_joins(how):
+    with pytest.raises(ValueError):
+        merge_on_key(left, right, on="COMPONENT", how=how)
+
+
+def test_codes_stay_valid_when_values_are_added():
+    registry = KeyRegistry()
+    first = registry.encode("SOI", pd.Series(["x", "y"]))
+    registry.register("SOI", ["z"])
+    assert registry.is_registered("SOI", first.dtype)
+    assert registry.codes("SOI", first).tolist() == [0, 1]
+    assert registry.codes("SOI", ["z", "x", None]).tolist() == [2, 0, -1]
+
+
+def test_registry_starts_over_when_full(monkeypatch):
+    registry = KeyRegistry()
+    monkeypatch.setattr(registry, "max_values", 3)
+    registry.encode("GROUP", pd.Series(["g"]))
+    registry.encode("SOI", pd.Series(["a", "b", "c"]))
+    left_codes, right_codes = registry.shared_codes("SOI", ["c", "a"], ["a"])
+    assert "GROUP" not in registry.categories
+    assert left_codes.tolist() == [0, 1]
+    assert right_codes.tolist() == [1]
+
+
+def test_reset_keeps_merges_right():
+    merge_on_key(left, right, on="COMPONENT")
+    key_registry.reset()
+    merged = merge_on_key(left, right, on="COMPONENT")
+    pd.testing.assert_frame_equal(
+        merged, pd.merge(left, right, on="COMPONENT", how="left")
+    )
@@ -0,0 +1,87 @@
+import sqlite3
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import build_groups, write_companion_db
+from assistant_scripts.read_data.read_companion_data import CompanionDbReader
+
+# comments out of time order, with missing text or timestamp and equal
+# timestamps, as (table, product_id, text, timestamp)
+tricky_comments = [
+    ("soi_comment", 1, "newest text, no time", None),
+    ("soi_comment", 1, None, "2030-01-01 00:00:00"),
+    ("soi_comment", 2, "old time, last rowid", "2020-01-01 00:00:00"),
+    ("component_comment", 3, None, None),
+    ("component_comment", 4, "future", "2031-01-01 00:00:00"),
+    ("component_comment", 4, "later rowid", "2024-06-01 00:00:00"),
+    ("my_group_comment", 1, "first of equal times", "2032-01-01 00:00:00"),
+    ("my_group_comment", 1, "second of equal times", "2032-01-01 00:00:00"),
+    ("my_group_comment", 2, "old time, last rowid", "2020-01-01 00:00:00"),
+]
+
+
+def add_comments(path_db, comments):
+    conn = sqlite3.connect(path_db)
+    conn.executemany(
+        "INSERT INTO {} (product_id, text, timestamp) VALUES (?, ?, ?)".format(
+            comments[0][0]
+        ),
+        [x[1:] for x in comments],
+    )
+    conn.commit()
+    conn.close()
+
+
+def add_tricky_comments(path_db):
+    for table in ["soi_comment", "component_comment", "my_group_comment"]:
+        add_comments(path_db, [x for x in tricky_comments if x[0] == table])
+
+
+@pytest.fixture
+def path_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH_CACHE", str(tmp_path / "cache"))
+    path_db = str(tmp_path / "companion.db")
+    write_companion_db(path_db, build_groups(40, 1, 20), comments=3)
+    add_tricky_comments(path_db)
+    return path_db
+
+
+def read(path_db, **kwargs):
+    reader = CompanionDbReader(path_db=path_db, **kwargs)
+    reader()
+    return reader
+
+
+def assert_same_data(reader, expected):
+    for name in ["groups", "products", "components"]:
+        pd.testing.assert_frame_equal(
+            getattr(reader, name).reset_index(drop=True),
+            getattr(expected, name).reset_index(drop=True),
+        )
+
+
+def test_sql_pushdown_keeps_latest_comments(path_db):
+    assert_same_data(read(path_db, sql_pushdown=True), read(path_db))
+
+
+def test_snapshot_sync_keeps_latest_comments(path_db):
+    assert_same_data(read(path_db, snapshot=True), read(path_db))
+    add_comments(
+        path_db,
+        [
+            ("soi_comment", 1, "text after sync", None),
+            ("soi_comment", 2, None, "2019-01-01 00:00:00"),
+        ],
+    )
+    add_comments(path_db, [("my_group_comment", 1, "older", "2001-01-01 00:00:00")])
+    assert_same_data(read(path_db, snapshot=True), read(path_db))
+
+
+def test_reader_adds_no_indexes(path_db):
+    read(path_db, sql_pushdown=True, snapshot=True)
+    conn = sqlite3.connect(path_db)
+    indexes = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    ).fetchall()
+    conn.close()
+    assert indexes == []
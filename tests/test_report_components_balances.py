@@ -0,0 +1,90 @@
+import datetime
+import pandas as pd
+
+from assistant_scripts.read_data.week_axis import WeekAxis
+from assistant_scripts.reports.report_components_balances import ComponentsBalances
+
+
+def components_balances():
+    # three weeks across the ISO year boundary, A is in G1 and B in G2
+    balances = ComponentsBalances("groups.xlsx", "components.xlsx", "supply.xlsx")
+    balances.week_axis = WeekAxis(start=datetime.date(2024, 12, 23), weeks=3)
+    balances.weeks = balances.week_axis.datetimes()
+    balances.groups = pd.DataFrame(
+        {
+            "COMPONENT": ["A", "B"],
+            "GROUP": ["G1", "G2"],
+            "GROUP_DESCRIPTION": ["first", "second"],
+        }
+    )
+    balances.orders = pd.DataFrame(
+        [["G1", "A", 10, 20, 30], ["G2", "B", 5, 5, 5]],
+        columns=["GROUP", "COMPONENT", "w1", "w2", "w3"],
+    )
+    balances.demand = pd.DataFrame(
+        [["G1", "A", 40, 40, 40, 40], ["G2", "B", 8, 8, 8, 8]],
+        columns=["GROUP", "COMPONENT", "w1", "w2", "w3", "w4"],
+    )
+    balances.stock = pd.DataFrame(
+        {"GROUP": ["G1", "G2"], "COMPONENT": ["A", "B"], "TOTAL_STOCK": [100, 50]}
+    )
+    balances.supply = pd.DataFrame(
+        {
+            "GROUP": ["G1", "G1", "G2", "G1"],
+            "ETD_DATE_WEEK": pd.to_datetime(
+                ["2024-12-25", "2025-01-08", "2025-01-01", "2025-02-01"]
+            ),
+            "QTY": [15, 25, 7, 1000],
+        }
+    )
+    return balances
+
+
+def test_balances_are_stock_plus_cumulated_supply_minus_demand():
+    balances = components_balances()
+    balances.prepare_groups_balances()
+    balances.compute_balances()
+    report = balances.groups_balances
+
+    assert report["Group"].tolist() == ["G1", "G2", "G1", "G2"]
+    assert report["Data"].tolist() == 2 * ["Stock vs. Real customer orders"] + 2 * [
+        "Stock vs. Forecast"
+    ]
+    assert report["Current stock"].tolist() == [100, 50, 100, 50]
+    # supply outside the weeks of the report is left out
+    assert report[balances.weeks].values.tolist() == [
+        [105, 85, 80],
+        [45, 47, 42],
+        [75, 35, 20],
+        [42, 41, 33],
+    ]
+
+
+def test_healthy_stock_is_one_and_a_half_four_weeks_of_demand():
+    balances = components_balances()
+    balances.prepare_groups_balances()
+    balances.compute_balances()
+
+    assert balances.demand["AVG"].tolist() == [160, 32]
+    healthy = balances.groups_balances["Healthy Stock Level vs. Forecast"]
+    assert healthy.tolist() == [240, 48, 240, 48]
+
+
+def test_groups_without_data_stay_at_zero():
+    balances = components_balances()
+    balances.groups = pd.concat(
+        [
+            balances.groups,
+            pd.DataFrame(
+                {"COMPONENT": ["C"], "GROUP": ["G3"], "GROUP_DESCRIPTION": ["third"]}
+            ),
+        ],
+        ignore_index=True,
+    )
+    balances.prepare_groups_balances()
+    balances.compute_balances()
+    report = balances.groups_balances.set_index(["Group", "Data"])
+
+    g3 = report.loc[("G3", "Stock vs. Forecast")]
+    assert g3["Current stock"] == 0
+    assert g3[balances.weeks].tolist() == [0, 0, 0]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from assistant_scripts.reports.report_groups_dispoview import GroupsDispoview
+
+weeks = ["W52.2024", "W1.2025", "W2.2025"]
+
+
+def groups_dispoview():
+    dispoview = GroupsDispoview("dispoview.xlsx", "groups.xlsx", "supply.xlsx")
+    dispoview.ready_groups = pd.DataFrame(
+        {
+            "GROUP": ["G1", "G1", "G2"],
+            "COMPONENT": ["A", "B", "C"],
+            "CODENUMBER": [1, 2, 3],
+            "GROUP_DESCRIPTION": ["first", "first", "second"],
+            "GROUP_STATUS": ["", "", ""],
+        }
+    )
+    figures = [
+        ["G1", "Stock", 60, 999, 999],
+        ["G1", "Stock", 40, 999, 999],
+        ["G1", "NetForecast", 10, 10, 10],
+        ["G1", "CustOrders", 5, 5, 5],
+        ["G2", "Stock", 20, 0, 0],
+        ["G2", "NetForecast", 2, 4, 6],
+        ["G2", "CustOrders", 0, 0, 0],
+    ]
+    dispoview.all_merged_data = pd.DataFrame(
+        [[0, group, "", data, *values] for group, data, *values in figures],
+        columns=["CODENUMBER", "GROUP", "GROUP_DESCRIPTION", "DATA"] + weeks,
+    )
+    dispoview.weeks = weeks
+    dispoview.supply_confirmed = pd.DataFrame(
+        {
+            "GROUP": ["G1", "G2", "G1"],
+            "ETD_DATE_WEEK": ["W1.2025", "W52.2024", "W9.2025"],
+            "QTY": [30, 1, 500],
+        }
+    )
+    dispoview.supply_requested = pd.DataFrame(
+        {"GROUP": ["G1"], "ETD_DATE_WEEK": ["W2.2025"], "QTY": [50]}
+    )
+    return dispoview
+
+
+def test_groups_balances():
+    dispoview = groups_dispoview()
+    dispoview._create_groups_balances()
+    dispoview._compute_groups_balances()
+    report = dispoview.groups_balances.set_index(["GROUP", "DATA"])[weeks]
+
+    # the stock of the first week, then supply minus demand week by week
+    assert report.loc[("G1", "Forecast_confirmed")].tolist() == [90, 110, 100]
+    assert report.loc[("G2", "Forecast_confirmed")].tolist() == [19, 15, 9]
+    assert report.loc[("G1", "Forecast_requested")].tolist() == [90, 110, 150]
+    assert report.loc[("G2", "Forecast_requested")].tolist() == [19, 15, 9]
+    assert report.loc[("G1", "Orders_confirmed")].tolist() == [95, 120, 115]
+    assert report.loc[("G2", "Orders_confirmed")].tolist() == [21, 21, 21]
+    assert report.loc[("G1", "Healthy_stock_forecast")].tolist() == [45, 30, 15]
+    assert report.loc[("G2", "Healthy_stock_forecast")].tolist() == [18, 15, 9]
+
+
+def test_next_weeks_sum_is_shorter_at_the_horizon_end():
+    dispoview = groups_dispoview()
+    values = np.array([[1, 2, 3, 4, 5, 6]])
+    assert dispoview._next_weeks_sum(values, 4).tolist() == [[10, 14, 18, 15, 11, 6]]
+
+
+def test_no_weeks_leaves_the_balances_empty():
+    dispoview = groups_dispoview()
+    dispoview.weeks = []
+    dispoview._create_groups_balances()
+    dispoview._compute_groups_balances()
+    report = dispoview.groups_balances
+    assert report.columns.tolist() == ["GROUP", "GROUP_DESCRIPTION", "DATA", "COMMENTS"]
+    assert len(report) == 8
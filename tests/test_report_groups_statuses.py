@@ -0,0 +1,125 @@
+import os, glob, shutil, zipfile
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_dataset
+from assistant_scripts.other_functions.report_manifest import sheet_parts
+from assistant_scripts.reports import report_groups_statuses
+from assistant_scripts.reports.report_groups_statuses import GroupsStatuses
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    return generate_dataset(
+        str(tmp_path_factory.mktemp("data")),
+        components=20,
+        product_files=1,
+        products_per_file=8,
+    )
+
+
+@pytest.fixture
+def paths(dataset, tmp_path, monkeypatch):
+    # every test starts from a folder without reports
+    monkeypatch.setenv("PATH_CACHE", str(tmp_path / "cache"))
+    monkeypatch.delenv("PATH_SNAPSHOTS", raising=False)
+    paths = dict(dataset)
+    for name in ["components", "supply_confirmed"]:
+        paths[name] = shutil.copy(paths[name], tmp_path)
+    return paths
+
+
+@pytest.fixture
+def written_groups(monkeypatch):
+    groups = []
+    prepare_one_group_data = GroupsStatuses.prepare_one_group_data
+
+    def prepare(self, group):
+        groups.append(group)
+        return prepare_one_group_data(self, group)
+
+    monkeypatch.setattr(GroupsStatuses, "prepare_one_group_data", prepare)
+    return groups
+
+
+def run_report(paths, incremental=True):
+    report = GroupsStatuses(
+        path_components=paths["components"],
+        path_products=paths["products"],
+        path_groups=paths["groups"],
+        path_supply=paths["supply_confirmed"],
+        path_db=paths["db"],
+        products_workers=1,
+        incremental=incremental,
+    )
+    report()
+    return report
+
+
+def read_sheets(report_path):
+    with zipfile.ZipFile(report_path) as archive:
+        return {name: archive.read(part) for name, part in sheet_parts(archive).items()}
+
+
+def change_group_supply(path, group):
+    sheets = pd.read_excel(path, sheet_name=None)
+    supply = sheets["supply_confirmed"]
+    supply.loc[supply["GROUP"] == group, "QTY"] += 1000
+    with pd.ExcelWriter(path) as writer:
+        for sheet, data in sheets.items():
+            data.to_excel(writer, sheet_name=sheet, index=False)
+
+
+def test_only_changed_group_is_rewritten(paths, written_groups):
+    first = run_report(paths)
+    first_sheets = read_sheets(first.report_file_path)
+    groups = [f"{x}" for x in first.unique_groups]
+    assert sorted(written_groups) == sorted(groups)
+
+    changed_group = groups[1]
+    change_group_supply(paths["supply_confirmed"], changed_group)
+    written_groups.clear()
+    second = run_report(paths)
+    second_sheets = read_sheets(second.report_file_path)
+
+    assert second.previous_manifest is not None
+    assert written_groups == [changed_group]
+    assert list(second_sheets) == list(first_sheets)
+    changed_sheets = {changed_group, "ALL_COMPONENTS_SUPPLY"}
+    for sheet in first_sheets:
+        if sheet in changed_sheets:
+            assert second_sheets[sheet] != first_sheets[sheet]
+        else:
+            assert second_sheets[sheet] == first_sheets[sheet], sheet
+
+
+def test_other_layout_version_is_not_reused(paths, written_groups, monkeypatch):
+    first = run_report(paths)
+    monkeypatch.setattr(GroupsStatuses, "layout_version", 2)
+    written_groups.clear()
+    second = run_report(paths)
+
+    assert second.previous_manifest is None
+    assert sorted(written_groups) == sorted(f"{x}" for x in first.unique_groups)
+
+
+def test_failed_copy_writes_whole_report(paths, written_groups, monkeypatch):
+    first = run_report(paths)
+    first_sheets = read_sheets(first.report_file_path)
+
+    def copy_sheets(source_path, target_path, sheet_names):
+        raise OSError("copy failed")
+
+    monkeypatch.setattr(report_groups_statuses, "copy_sheets", copy_sheets)
+    written_groups.clear()
+    second = run_report(paths)
+
+    assert sorted(written_groups) == sorted(f"{x}" for x in first.unique_groups)
+    assert read_sheets(second.report_file_path) == first_sheets
+
+
+def test_no_manifest_without_incremental(paths):
+    report = run_report(paths, incremental=False)
+
+    directory = os.path.dirname(report.report_file_path)
+    assert glob.glob(os.path.join(directory, "*.manifest.json")) == []
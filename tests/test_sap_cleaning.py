@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from assistant_scripts.read_data.sap_cleaning import (
+    parse_integers,
+    parse_suffix_stock,
+)
+
+
+@pytest.mark.parametrize(
+    "cell, expected",
+    [
+        ("'68", 68),
+        ("1,234", 1234),
+        (" 5 ", 5),
+        ("12.0", 12),
+        ("12.7", 12),
+        ("12.", 12),
+        ("'-3", -3),
+        ("-1,000.50", -1000),
+        ("007", 7),
+        ("999999999999999999", 999999999999999999),
+        (12.0, 12),
+        (1e16, 10**16),
+    ],
+)
+def test_parse_integers_reads_sap_numbers(cell, expected):
+    values = pd.Series(["0", cell], dtype=object)
+    assert parse_integers(values).tolist() == [0, expected]
+
+
+@pytest.mark.parametrize("cell", [None, np.nan, "", "  "])
+def test_parse_integers_reads_empty_cells_as_zero(cell):
+    values = pd.Series(["1", cell], dtype=object)
+    assert parse_integers(values).tolist() == [1, 0]
+
+
+@pytest.mark.parametrize(
+    "cell",
+    ["1-2", "12 34", "5-", "1.2.3", "abc", "-", "'", ".5", "99999999999999999999"],
+)
+def test_parse_integers_rejects_malformed_cells(cell):
+    values = pd.Series(["1", cell], dtype=object)
+    with pytest.raises(ValueError, match="1 cells"):
+        parse_integers(values)
+
+
+def test_parse_integers_numbers():
+    assert parse_integers(np.array([1.9, np.nan, -2.0])).tolist() == [1, 0, -2]
+    with pytest.raises(ValueError):
+        parse_integers(np.array([1.0, np.inf]))
+    with pytest.raises(ValueError):
+        parse_integers(np.array([1e20]))
+
+
+def test_parse_integers_keeps_shape_and_compacts():
+    values = pd.DataFrame({"a": ["'1", "2"], "b": ["3,000", None]})
+    parsed = parse_integers(values, compact=True)
+    assert parsed.dtype == np.int32
+    assert parsed.tolist() == [[1, 3000], [2, 0]]
+
+
+def test_parse_suffix_stock():
+    values = pd.Series(["PL01s1,200", "", None, "PL02s'-5"], dtype=object)
+    assert parse_suffix_stock(values).tolist() == [1200, 0, 0, -5]
+    with pytest.raises(ValueError):
+        parse_suffix_stock(pd.Series(["PL01s"]))
+    with pytest.raises(ValueError):
+        parse_suffix_stock(pd.Series(["PL01s12x"]))
@@ -0,0 +1,87 @@
+import datetime
+import pandas as pd
+
+from assistant_scripts.read_data.snapshot_store import (
+    SnapshotStore,
+    append_snapshot,
+    snapshot_week,
+    weeks_to_rows,
+)
+
+
+def orders(quantities: dict):
+    return pd.DataFrame(
+        {"COMPONENT": list(quantities), "QTY": list(quantities.values())}
+    )
+
+
+def test_snapshot_week_across_the_iso_year():
+    assert snapshot_week(datetime.date(2024, 12, 29)) == "2024-W52"
+    assert snapshot_week(datetime.date(2024, 12, 30)) == "2025-W01"
+
+
+def test_weeks_to_rows():
+    data = pd.DataFrame({"COMPONENT": ["A"], "12/30": [1], "1/6": [2], "W Total": [3]})
+    rows = weeks_to_rows(data, "COMPONENT", "2025-W01")
+    assert rows.values.tolist() == [
+        ["A", "12/30", "2024-12-30", 1],
+        ["A", "1/6", "2025-01-06", 2],
+        ["A", "W Total", None, 3],
+    ]
+
+
+def test_history_of_the_last_snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    for week, qty in [("2024-W51", 1), ("2024-W52", 2), ("2025-W01", 3)]:
+        store.append(
+            "components", {"orders": orders({"A": qty, "B": 10})}, "c.xlsx", week
+        )
+
+    history = store.component_history("A", last=2)
+    assert history[["SNAPSHOT", "COMPONENT", "QTY"]].values.tolist() == [
+        ["2024-W52", "A", 2],
+        ["2025-W01", "A", 3],
+    ]
+    history = store.history("components", "orders", columns=["QTY"])
+    assert history.columns.tolist() == ["SNAPSHOT", "QTY"]
+    assert history["QTY"].tolist() == [1, 10, 2, 10, 3, 10]
+
+
+def test_append_in_the_same_week_replaces_the_snapshot(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.append("components", {"orders": orders({"A": 1})}, "c.xlsx", "2025-W01")
+    store.append("components", {"orders": orders({"A": 2})}, "c.xlsx", "2025-W01")
+    assert store.history("components", "orders")["QTY"].tolist() == [2]
+
+
+def test_append_of_one_file_keeps_the_rows_of_other_files(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    for source_file, qty in [("a.xlsx", 1), ("b.xlsx", 2), ("a.xlsx", 3)]:
+        store.append(
+            "components",
+            {"orders": orders({"A": qty})},
+            source_file,
+            "2025-W01",
+            replace_partition=False,
+        )
+    history = store.history("components", "orders")
+    assert history[["SOURCE_FILE", "QTY"]].values.tolist() == [
+        ["b.xlsx", 2],
+        ["a.xlsx", 3],
+    ]
+
+
+def test_history_skips_snapshots_without_the_table(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.append("components", {"demand_plan": orders({"A": 1})}, "c.xlsx", "2024-W52")
+    store.append("components", {"orders": orders({"A": 2})}, "c.xlsx", "2025-W01")
+
+    assert store.history("components", "orders")["SNAPSHOT"].tolist() == ["2025-W01"]
+    assert store.history("products", "products_orders").empty
+
+
+def test_append_snapshot_does_not_raise(tmp_path, capsys):
+    blocking_file = tmp_path / "components"
+    blocking_file.write_text("")
+    append_snapshot(str(tmp_path), "components", {"orders": orders({"A": 1})}, "c")
+    assert "Error saving components snapshot" in capsys.readouterr().out
@@ -0,0 +1,65 @@
+import os
+import pytest
+
+from assistant_scripts.other_functions.sort_my_data import (
+    DataRouter,
+    file_type_of,
+    latest_file,
+    sort_my_data,
+)
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+    return path
+
+
+@pytest.mark.parametrize(
+    "file_name, file_type",
+    [
+        ("C711_PartsSupplyPlanDisp_0110.xlsx", "C711_PartsSupplyPlanDisp"),
+        ("x_C502_ProductsSupplyPlanDisp.xlsx", "C502_ProductsSupplyPlanDisp"),
+        ("zpp066_20241001.txt", "zpp066_"),
+        ("Report_groups_statuses_01102024_1000.xlsx", "Report_groups_statuses_"),
+        ("notes.txt", None),
+    ],
+)
+def test_file_type_of(file_name, file_type):
+    assert file_type_of(file_name) == file_type
+
+
+def test_route_moves_renames_and_skips_duplicates(tmp_path):
+    router = DataRouter(str(tmp_path))
+    sorted_path = tmp_path / "DOWNLOADS" / "Factory_data" / "zpp066_1.txt"
+
+    action, path = router.route(write(str(tmp_path / "zpp066_1.txt"), "a"))
+    assert (action, path) == ("moved", str(sorted_path))
+
+    action, path = router.route(write(str(tmp_path / "zpp066_1.txt"), "b"))
+    assert action == "renamed"
+    assert path == str(sorted_path.with_name("zpp066_1 (1).txt"))
+
+    # the same bytes under another name are the first file
+    source_path = write(str(tmp_path / "zpp066_2.txt"), "a")
+    assert router.route(source_path) == ("duplicate", str(sorted_path))
+    assert not os.path.exists(source_path)
+
+    assert router.route(write(str(tmp_path / "notes.txt"), "a")) == (None, None)
+    assert latest_file(str(tmp_path), "zpp066_") in [
+        str(sorted_path),
+        str(sorted_path.with_name("zpp066_1 (1).txt")),
+    ]
+
+
+def test_sort_my_data_reports_duplicates(tmp_path):
+    write(str(tmp_path / "zpp066_1.txt"), "a")
+    assert sort_my_data(str(tmp_path)) is None
+
+    write(str(tmp_path / "zpp066_copy.txt"), "a")
+    write(str(tmp_path / "products_files_to_report" / "plan.xlsx"), "c")
+    message = sort_my_data(str(tmp_path))
+    assert message.startswith("1 files were already sorted")
+    assert "zpp066_copy.txt: same as" in message
+    assert os.path.exists(tmp_path / "DOWNLOADS" / "Products_data" / "plan.xlsx")
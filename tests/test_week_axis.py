@@ -0,0 +1,65 @@
+import datetime
+import pandas as pd
+import pytest
+
+from assistant_scripts.read_data.week_axis import (
+    WeekAxis,
+    header_label,
+    key_monday,
+    label_date,
+    week_key,
+    week_year_labels,
+)
+
+date = datetime.date
+
+
+def test_week_keys_across_the_iso_year():
+    assert week_key(date(2024, 12, 29)) == 202452
+    assert week_key(date(2024, 12, 30)) == 202501
+    assert week_key(date(2021, 1, 3)) == 202053
+    assert key_monday(202501) == date(2024, 12, 30)
+    dates = pd.Series(pd.to_datetime(["2024-12-29", "2024-12-30", None]))
+    assert week_year_labels(dates).tolist()[:2] == ["W52.2024", "W1.2025"]
+
+
+@pytest.mark.parametrize(
+    "label, start, expected",
+    [
+        ("12/30", date(2025, 1, 6), date(2024, 12, 30)),
+        ("1/6", date(2024, 12, 30), date(2025, 1, 6)),
+        ("12/2", date(2024, 12, 30), date(2024, 12, 2)),
+        ("11/25", date(2024, 12, 30), date(2025, 11, 25)),
+        ("2/29", date(2024, 12, 30), None),
+        ("W Total", date(2024, 12, 30), None),
+    ],
+)
+def test_label_date(label, start, expected):
+    assert label_date(label, start) == expected
+
+
+def test_axis_across_the_year_end():
+    axis = WeekAxis(start=date(2024, 12, 25), weeks=3)
+    assert axis.keys == [202452, 202501, 202502]
+    assert axis.labels == ["12/23", "12/30", "1/6"]
+    assert axis.position(date(2025, 1, 1)) == 1
+    assert axis.position(pd.Timestamp("2025-01-08 10:00")) == 2
+    assert axis.position("1/6") == 2
+    assert axis.position(202501) == 1
+    assert axis.position(date(2025, 1, 13)) is None
+
+
+def test_select_headers_matches_whole_labels():
+    assert header_label("W Total 11/10)") == "11/10"
+    assert header_label("M Total 11/2026)") is None
+    headers = ["COLUMN_1", "W Total 12/16)", "W Total 12/30)", "W Total 1/1)"]
+    axis = WeekAxis(start=date(2024, 12, 31))
+    assert axis.select_headers(headers) == ["W Total 12/30)", "W Total 1/1)"]
+    assert WeekAxis(start=date(2025, 1, 1)).select_headers(["W Total 11/10)"]) == []
+
+
+def test_select_dates():
+    dates = [datetime.datetime(2024, 12, 23), datetime.datetime(2024, 12, 30)]
+    axis = WeekAxis(start=date(2025, 1, 2))
+    assert axis.select_dates(dates) == dates[1:]
+    assert WeekAxis(start=date(2025, 1, 9)).select_dates(dates) == []
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from assistant_scripts.read_data.week_folding import fold_weeks, get_fold_starts
+
+
+def test_fold_starts():
+    columns = ["W1", "x", "W2", "y", "z", "W3"]
+    assert get_fold_starts(columns, ["W1", "W2", "W3"]) == [0, 2, 5]
+    assert get_fold_starts(columns, ["W2"], keep_columns=["z"]) == [0, 2, 4]
+    # the first column always starts a bucket
+    assert get_fold_starts(["x", "W1"], ["W1"]) == [0, 1]
+
+
+def test_fold_weeks_sum_and_last():
+    data = pd.DataFrame(
+        [[1, 2, 3, 4, 5], [10, 20, 30, 40, 50]],
+        columns=["W1", "x", "W2", "y", "z"],
+        index=["a", "b"],
+    )
+
+    summed = fold_weeks(data, ["W1", "W2"])
+    assert summed.columns.tolist() == ["W1", "W2"]
+    assert summed.index.tolist() == ["a", "b"]
+    assert summed.values.tolist() == [[3, 12], [30, 120]]
+
+    last = fold_weeks(data, ["W1", "W2"], how="last")
+    assert last.values.tolist() == [[2, 5], [20, 50]]
+
+
+def test_fold_weeks_without_invalid_columns_keeps_the_data():
+    data = pd.DataFrame([[1, 2, 3]], columns=["W1", "W2", "W3"])
+    assert fold_weeks(data, ["W1", "W2", "W3"]).equals(data)
+
+
+def test_fold_weeks_unknown_method():
+    data = pd.DataFrame([[1, 2]], columns=["W1", "x"])
+    with pytest.raises(ValueError, match="Unknown fold method"):
+        fold_weeks(data, ["W1"], how="mean")